@@ -0,0 +1,62 @@
+"""Measures the overhead of reporting times to ``TimeSummary``.
+
+Usage::
+
+    python benchmarks/time_summary.py [--n 1000000] [--threads 1]
+"""
+import argparse
+import threading
+import time
+from typing import Callable
+
+from pytorch_pfn_extras.profiler import TimeSummary
+
+
+def _bench(fn: Callable[[int], None], n: int, n_threads: int) -> float:
+    threads = [threading.Thread(target=fn, args=(n,)) for _ in range(n_threads)]
+    begin = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return (time.perf_counter() - begin) / (n * n_threads)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=1000000)
+    parser.add_argument("--threads", type=int, default=1)
+    args = parser.parse_args()
+
+    summary = TimeSummary()
+
+    def complete_report(n: int) -> None:
+        begin = time.time()
+        for _ in range(n):
+            summary.complete_report("tag", False, None, begin)
+
+    def queue(n: int) -> None:
+        # The path used before the per-thread buffers
+        for _ in range(n):
+            summary._cpu_worker.put("tag", 0.0)
+
+    def report(n: int) -> None:
+        for _ in range(n):
+            with summary.report("tag"):
+                pass
+
+    for name, fn, n in [
+        ("buffer", complete_report, args.n),
+        ("queue", queue, args.n // 100),
+        ("report", report, args.n),
+    ]:
+        per_record = _bench(fn, n, args.threads)
+        summary.synchronize()
+        with summary.summary(clear=True) as (s, _):
+            assert s._summaries["tag"]._n == n * args.threads
+        print(f"{name:>8}: {per_record * 1e9:10.1f} ns/record")
+    summary.finalize()
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1,7 @@
+from pytorch_pfn_extras._dynamo._bucketing import ShapeBuckets  # NOQA
 from pytorch_pfn_extras._dynamo._compile import compile  # NOQA
+from pytorch_pfn_extras._dynamo._optimizer import (  # NOQA
+    init_adam_state,
+    lamb_step,
+    register_optimizer,
+)
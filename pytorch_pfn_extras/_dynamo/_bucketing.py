@@ -0,0 +1,148 @@
+import warnings
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import torch
+import torch.utils._pytree as pytree
+
+
+class ShapeBuckets:
+    """Policy padding the inputs of :func:`pytorch_pfn_extras.compile`.
+
+    Inputs with variable sizes (e.g., sequence lengths) make the module
+    be compiled again for every new shape. This policy pads the chosen
+    dimensions of the input tensors up to the next bucket size, so that
+    only one graph per bucket is compiled. The output tensors whose padded
+    dimensions have the padded size are sliced back to the original size.
+
+    .. warning::
+        The padded elements take part in the computation of the module,
+        including the loss and the gradients. The module must use the mask
+        passed as ``mask_argument`` to exclude them, e.g., from the
+        reductions over the padded dimensions.
+
+    Args:
+        dims: Dimensions of the input tensors to pad. Tensors with fewer
+            dimensions are left as they are. Defaults to the batch
+            dimension (``(0,)``), which requires ``mask_argument``.
+        sizes: Increasing bucket sizes. Sizes larger than the last bucket
+            are rounded up to a multiple of it. By default, sizes are
+            rounded up to the next power of two.
+        pad_value: Value used to fill the padding.
+        mask_argument: If given, the padding mask of the first padded
+            input is passed to the module as a keyword argument with this
+            name. The mask is a boolean tensor with the padded shape that
+            is ``True`` for the original elements.
+    """
+
+    def __init__(
+        self,
+        dims: Optional[Sequence[int]] = None,
+        sizes: Optional[Sequence[int]] = None,
+        pad_value: float = 0,
+        mask_argument: Optional[str] = None,
+    ) -> None:
+        if mask_argument is None:
+            if dims is None:
+                raise ValueError(
+                    "Padding the batch dimension requires mask_argument, "
+                    "pass dims explicitly to pad without a mask"
+                )
+            warnings.warn(
+                "ShapeBuckets pads the inputs without mask_argument, the "
+                "padded elements are included in the loss and the gradients "
+                "computed by the module"
+            )
+        if sizes is not None and (
+            not sizes
+            or sizes[0] <= 0
+            or any(s >= t for s, t in zip(sizes, sizes[1:]))
+        ):
+            raise ValueError("sizes must be positive and increasing")
+        self.dims = (0,) if dims is None else tuple(dims)
+        self.sizes = None if sizes is None else tuple(sizes)
+        self.pad_value = pad_value
+        self.mask_argument = mask_argument
+
+    def bucket(self, size: int) -> int:
+        """Returns the bucket size to pad ``size`` to."""
+        if self.sizes is None:
+            return 1 << max(size - 1, 0).bit_length()
+        for s in self.sizes:
+            if size <= s:
+                return s
+        last = self.sizes[-1]
+        return -(-size // last) * last
+
+    def pad(self, tensor: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Pads a tensor to its bucket shape.
+
+        Returns:
+            A tuple of the padded tensor and its padding mask.
+        """
+        # Amount of padding after each dimension, starting from the last one
+        pad = [0] * (2 * tensor.dim())
+        for d in self.dims:
+            if -tensor.dim() <= d < tensor.dim():
+                size = tensor.shape[d]
+                pad[2 * (tensor.dim() - 1 - d % tensor.dim()) + 1] = (
+                    self.bucket(size) - size
+                )
+        mask = torch.ones_like(tensor, dtype=torch.bool)
+        if not any(pad):
+            return tensor, mask
+        return (
+            torch.nn.functional.pad(tensor, pad, value=self.pad_value),
+            torch.nn.functional.pad(mask, pad, value=False),
+        )
+
+    def apply(
+        self, args: Tuple[Any, ...], kwargs: Dict[str, Any]
+    ) -> Tuple[Tuple[Any, ...], Dict[str, Any]]:
+        """Pads all the input tensors of a call."""
+        masks = []
+
+        def _pad(x: Any) -> Any:
+            if not isinstance(x, torch.Tensor):
+                return x
+            padded, mask = self.pad(x)
+            masks.append(mask)
+            return padded
+
+        args, kwargs = pytree.tree_map(_pad, (args, kwargs))
+        if self.mask_argument is not None and masks:
+            kwargs = dict(kwargs, **{self.mask_argument: masks[0]})
+        return args, kwargs
+
+    def unpad(self, outputs: Any, args: Tuple[Any, ...], kwargs: Any) -> Any:
+        """Slices the outputs of a call back to the unpadded sizes.
+
+        The sizes are taken from the first input tensor that is padded by
+        :meth:`apply`, and only the output dimensions that have its padded
+        size are sliced.
+
+        Args:
+            outputs: Outputs of the module called with the padded inputs.
+            args: Positional arguments of the call before padding.
+            kwargs: Keyword arguments of the call before padding.
+        """
+        sizes = {}
+        for x in pytree.tree_flatten((args, kwargs))[0]:
+            if not isinstance(x, torch.Tensor):
+                continue
+            for d in self.dims:
+                if -x.dim() <= d < x.dim():
+                    size = x.shape[d]
+                    if self.bucket(size) != size:
+                        sizes[d] = (size, self.bucket(size))
+            if sizes:
+                break
+
+        def _unpad(y: Any) -> Any:
+            if not isinstance(y, torch.Tensor):
+                return y
+            for d, (size, padded) in sizes.items():
+                if -y.dim() <= d < y.dim() and y.shape[d] == padded:
+                    y = y.narrow(d, 0, size)
+            return y
+
+        return pytree.tree_map(_unpad, outputs) if sizes else outputs
@@ -0,0 +1,177 @@
+import hashlib
+import inspect
+import os
+import tempfile
+from typing import Any, Callable, Dict, Optional
+
+import torch
+import torch.utils._pytree as pytree
+from pytorch_pfn_extras._dynamo import _optimizer
+
+# Version of the layout of the cached graphs
+_CACHE_VERSION = 2
+# Number of entries kept in a cache directory, the least recently used
+# ones are removed when a new entry is saved
+_MAX_CACHE_ENTRIES = 128
+
+
+def _source(obj: Any) -> str:
+    try:
+        return inspect.getsource(obj)
+    except (OSError, TypeError):
+        return ""
+
+
+def _module_fingerprint(module: torch.nn.Module) -> str:
+    parts = []
+    for name, m in module.named_modules():
+        cls = type(m)
+        parts.append(f"{name}:{cls.__module__}.{cls.__qualname__}")
+        parts.append(_source(cls.forward))
+    for name, t in list(module.named_parameters()) + list(
+        module.named_buffers()
+    ):
+        parts.append(f"{name}:{tuple(t.shape)}:{t.dtype}:{t.requires_grad}")
+    return "\n".join(parts)
+
+
+def _optimizer_fingerprint(optimizer: Optional[torch.optim.Optimizer]) -> str:
+    if optimizer is None:
+        return "None"
+    cls = type(optimizer)
+    parts = [f"{cls.__module__}.{cls.__qualname__}"]
+    for group in optimizer.param_groups:
+        parts.append(repr([tuple(p.shape) for p in group["params"]]))
+    return "\n".join(parts)
+
+
+def _is_nonzero(value: Any) -> Any:
+    if isinstance(value, (tuple, list)):
+        return tuple(_is_nonzero(v) for v in value)
+    return bool(value != 0)
+
+
+def _hyperparameters(optimizer: Optional[torch.optim.Optimizer]) -> str:
+    """Returns a key of the optimizer hyperparameters at the current step."""
+    if optimizer is None:
+        return "None"
+    # Hyperparameters are constants in the traced graph unless they are
+    # passed as tensors, and can be changed between steps (e.g., by a
+    # learning rate scheduler). Only whether the ones passed as tensors are
+    # zero can change the traced computation
+    tensors = _optimizer._tensor_hyperparameters(optimizer)
+    return "\n".join(
+        repr(
+            sorted(
+                (k, repr(_is_nonzero(v) if k in tensors else v))
+                for k, v in group.items()
+                if k != "params"
+            )
+        )
+        for group in optimizer.param_groups
+    )
+
+
+def _backend_fingerprint(backend: Optional[Callable[..., Any]]) -> str:
+    if backend is None:
+        return "None"
+    cache_key = getattr(backend, "cache_key", None)
+    if cache_key is not None:
+        return str(cache_key)
+    name = getattr(backend, "__qualname__", type(backend).__qualname__)
+    return f"{backend.__module__}.{name}"
+
+
+def _signature(training: bool, args: Any, kwargs: Any) -> str:
+    """Returns a key of the inputs that the traced graph depends on."""
+    leaves, spec = pytree.tree_flatten((args, kwargs))
+    parts = [str(training), str(spec)]
+    for x in leaves:
+        if isinstance(x, torch.Tensor):
+            parts.append(
+                f"{tuple(x.shape)}:{x.dtype}:{x.device}:{x.requires_grad}"
+            )
+        else:
+            # Non tensor values are constants in the traced graph
+            parts.append(repr(x))
+    return "\n".join(parts)
+
+
+class _CompileCache:
+    """A directory keeping the graphs traced by :func:`compile`.
+
+    An entry is keyed by the structure of the module, the optimizer
+    configuration, the backend and the signature of the inputs, together
+    with the PyTorch version. The signature includes the optimizer
+    hyperparameters that are constants in the graph, so the values of
+    the ones passed as tensors (e.g., the learning rate) do not make new
+    entries. At most ``max_entries`` entries are kept in the directory.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        module: torch.nn.Module,
+        optimizer: Optional[torch.optim.Optimizer],
+        backend: Optional[Callable[..., Any]],
+        max_entries: int = _MAX_CACHE_ENTRIES,
+    ) -> None:
+        self._cache_dir = cache_dir
+        self._max_entries = max_entries
+        self._base_key = "\n".join(
+            [
+                str(_CACHE_VERSION),
+                torch.__version__,
+                _module_fingerprint(module),
+                _optimizer_fingerprint(optimizer),
+                _backend_fingerprint(backend),
+            ]
+        )
+
+    def path(self, signature: str) -> str:
+        key = self._base_key + "\n" + signature
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        return os.path.join(self._cache_dir, f"{digest}.pt")
+
+    def load(self, path: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(path, "rb") as f:
+                entry = torch.load(f)
+            # Mark the entry as recently used so that it is not pruned
+            os.utime(path)
+        except FileNotFoundError:
+            # Not cached yet, or pruned by another process
+            return None
+        return entry  # type: ignore[no-any-return]
+
+    def save(self, path: str, entry: Dict[str, Any]) -> None:
+        os.makedirs(self._cache_dir, exist_ok=True)
+        # Write to a temporary file first so that concurrent processes
+        # never read a partially written entry
+        fd, tmp_path = tempfile.mkstemp(dir=self._cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                torch.save(entry, f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        self._prune()
+
+    def _prune(self) -> None:
+        entries = []
+        for name in os.listdir(self._cache_dir):
+            if not name.endswith(".pt"):
+                continue
+            path = os.path.join(self._cache_dir, name)
+            try:
+                entries.append((os.stat(path).st_mtime, path))
+            except FileNotFoundError:
+                continue
+        entries.sort()
+        for _, path in entries[: max(0, len(entries) - self._max_entries)]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                # Removed by another process sharing the directory
+                pass
@@ -1,10 +1,13 @@
-from typing import Any, Callable, List, Optional, cast
+import warnings
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence, cast
 
 import torch
 import torch.fx
 import torch.utils._pytree as pytree
 from functorch.compile import make_boxed_func
-from pytorch_pfn_extras._dynamo import _optimizer, _splitter
+from pytorch_pfn_extras import profiler
+from pytorch_pfn_extras._dynamo import _bucketing, _cache, _optimizer, _splitter
 from torch._decomp import core_aten_decompositions  # type: ignore[attr-defined]
 from torch._dynamo.backends.common import aot_autograd
 from torch._functorch.partitioners import _is_primal
@@ -97,16 +100,19 @@ def _join_graphs(
             continue
         if node.op == "output":
             # Combine model and optimizer outputs
-            outputs.extend(pytree.tree_flatten(node.args)[0])
+            outputs.extend(
+                opt_to_model[out] for out in pytree.tree_flatten(node.args)[0]
+            )
             continue
 
         module_graph.inserting_after(last_node)
-        args = tuple(
-            opt_to_model[arg] if arg in opt_to_model else arg
-            for arg in node.args
+        # Hyperparameters passed as tensors may also be in the kwargs
+        args, kwargs = torch.fx.node.map_arg(
+            (node.args, node.kwargs),
+            lambda arg: opt_to_model.get(arg, arg),
         )
         res = module_graph.create_node(
-            node.op, node.target, args, node.kwargs, node.name
+            node.op, node.target, args, kwargs, node.name
         )
         res.meta = node.meta
         opt_to_model[node] = res
@@ -123,20 +129,73 @@ def _normalize_name(name: str) -> str:
     return name.replace("param_out_", "").replace("__dot__", ".")
 
 
+def _supports_inplace(backend: Callable[..., Any]) -> bool:
+    # Backends declare that they write the updated parameters and optimizer
+    # state into the input buffers (buffer donation) with this attribute
+    return bool(getattr(backend, "supports_inplace", False))
+
+
+def _input_output_aliases(graph: torch.fx.Graph) -> Dict[int, int]:
+    placeholders = {
+        node.name: i
+        for i, node in enumerate(
+            n for n in graph.nodes if n.op == "placeholder"
+        )
+    }
+    outputs = pytree.tree_flatten(
+        [node.args for node in graph.nodes if node.op == "output"]
+    )[0]
+    aliases = {}
+    for i, node in enumerate(outputs):
+        if isinstance(node, torch.fx.Node) and node.name.startswith(
+            "param_out_"
+        ):
+            name = node.name[len("param_out_") :]
+            if name in placeholders:
+                aliases[i] = placeholders[name]
+    return aliases
+
+
+def _write_back(
+    targets: Sequence[torch.Tensor], outs: Sequence[torch.Tensor]
+) -> None:
+    for target, out in zip(targets, outs):
+        # Outputs that alias the input buffers are already up to date
+        if out is not target and out.data_ptr() != target.data_ptr():
+            target.data.copy_(out)
+
+
+def _optimizer_state_tensors(
+    module: torch.nn.Module, optimizer: torch.optim.Optimizer
+) -> List[torch.Tensor]:
+    states = []
+    for p in module.parameters():
+        for state_tensor in optimizer.state[p].values():  # type: ignore[index]
+            if isinstance(state_tensor, torch.Tensor):
+                states.append(state_tensor)
+    return states
+
+
 def _compile_module(
     module: torch.nn.Module,
     optimizer: Optional[torch.optim.Optimizer],
     user_backend: Optional[Callable[..., Any]],
+    graph_hook: Optional[Callable[..., None]] = None,
 ) -> Callable[..., Any]:
     if not isinstance(module, torch.nn.Module):
         raise TypeError("module needs to be a torch.nn.Module instance")
 
     names = []
     parameters_and_buffers = []
+    hyperparameters = (
+        None
+        if optimizer is None
+        else _optimizer._HyperparameterInputs(optimizer)
+    )
 
     def _graph_getter(gm, inputs):  # type: ignore[no-untyped-def]
         parameters_optimizer = []
-        state_optimizer = []
+        state_optimizer: List[torch.Tensor] = []
         # TODO(ecastill) call the optimizer compiler here!
         if optimizer is not None:
             opt_graph, opt_outputs = _optimizer._compile_optimizer(
@@ -150,40 +209,36 @@ def _compile_module(
                     if _normalize_name(node.name) == n:
                         parameters_optimizer.append(p)
 
-            for n, p in module.named_parameters():
-                for p_n in optimizer.state[p]:  # type: ignore[index]
-                    state_tensor = optimizer.state[p][p_n]  # type: ignore[index]
-                    if state_tensor is not None:
-                        state_optimizer.append(state_tensor)
+            state_optimizer = _optimizer_state_tensors(module, optimizer)
 
         # Create the function that deals with the optimizer outputs
-        # TODO(set this as arg)
         supports_inplace = True
         gm.recompile()  # Sync the module to the graph changes
         if user_backend is None:
             func = gm
         else:
+            gm.meta["input_output_aliases"] = _input_output_aliases(gm.graph)
             func = user_backend(gm, inputs)
-            supports_inplace = False
-        n_params = len(parameters_optimizer)
+            supports_inplace = _supports_inplace(user_backend)
+        opt_targets = parameters_optimizer + state_optimizer
+        hooks = [] if graph_hook is None else [graph_hook]
 
         def _model_opt_func(*args, **kwargs):  # type: ignore[no-untyped-def]
-            # Need to retrieve the optimizer state and concat it to the
-            # arguments
-            outs = func(*(args + tuple(state_optimizer)), **kwargs)
+            # Need to retrieve the optimizer state and hyperparameters and
+            # concat them to the arguments
+            opt_args = tuple(state_optimizer)
+            if hyperparameters is not None:
+                opt_args += tuple(hyperparameters())
+            outs = func(*(args + opt_args), **kwargs)
+            while hooks:
+                # Called once with the first inputs and outputs of the graph
+                hooks.pop()(gm, func, supports_inplace, args, outs, opt_targets)
             # Iterate the returned parameters and copy them into the
             # Model real ones (sync)
             if optimizer is not None:
-                opt_outs = outs[-n_opt_outs:]
                 if not supports_inplace:
-                    for i in range(n_opt_outs):
-                        if i < n_params:
-                            parameters_optimizer[i].data.copy_(opt_outs[i])
-                        else:
-                            state_optimizer[i - n_params].data.copy_(
-                                opt_outs[i]
-                            )
-                return outs[:n_opt_outs]
+                    _write_back(opt_targets, outs[-n_opt_outs:])
+                return outs[:-n_opt_outs]
             return outs
 
         return make_boxed_func(_model_opt_func)
@@ -207,10 +262,449 @@ def _compile_module(
     return cast(Callable[..., Any], module_opt)  # type: ignore[redundant-cast]
 
 
+def _compile_optimizer_step(
+    module: torch.nn.Module,
+    optimizer: torch.optim.Optimizer,
+    user_backend: Optional[Callable[..., Any]],
+) -> Callable[[], None]:
+    opt_graph, opt_outputs = _optimizer._compile_optimizer(module, optimizer)
+    # Feed the gradients as inputs instead of reading the `grad` attributes
+    # so that the update is a pure function of its inputs
+    last_input = None
+    for node in opt_graph.nodes:
+        if node.op == "placeholder":
+            last_input = node
+    grad_params = []
+    for node in list(opt_graph.nodes):
+        if node.op == "call_function" and node.target is getattr:
+            if "grad" in node.args:
+                param_name = node.args[0].name
+                with opt_graph.inserting_after(last_input):
+                    grad = opt_graph.placeholder(f"grad_{param_name}")
+                grad.meta = node.meta
+                node.replace_all_uses_with(grad)
+                opt_graph.erase_node(node)
+                grad_params.append(param_name)
+                last_input = grad
+    opt_module = torch.fx.GraphModule(torch.nn.Module(), opt_graph)
+
+    named_params = dict(module.named_parameters())
+    params = [
+        named_params[_normalize_name(node.name)]
+        for node in opt_outputs
+        if _normalize_name(node.name) in named_params
+    ]
+    states = []
+    for p_group in optimizer.param_groups:
+        for p in p_group["params"]:
+            for state_tensor in optimizer.state[p].values():  # type: ignore[index]
+                if isinstance(state_tensor, torch.Tensor):
+                    states.append(state_tensor)
+    grad_sources = [named_params[_normalize_name(n)] for n in grad_params]
+    targets = params + states
+    hyperparameters = _optimizer._HyperparameterInputs(optimizer)
+
+    def _inputs() -> List[torch.Tensor]:
+        grads = [
+            p.grad if p.grad is not None else torch.zeros_like(p)
+            for p in grad_sources
+        ]
+        return params + states + hyperparameters() + grads
+
+    func = opt_module
+    supports_inplace = True
+    if user_backend is not None:
+        opt_module.meta["input_output_aliases"] = _input_output_aliases(
+            opt_graph
+        )
+        with torch.no_grad():
+            func = user_backend(opt_module, _inputs())
+        supports_inplace = _supports_inplace(user_backend)
+
+    def _step() -> None:
+        with torch.no_grad():
+            outs = func(*_inputs())
+            if not supports_inplace:
+                _write_back(targets, outs)
+        for p in grad_sources:
+            p.grad = None
+
+    return _step
+
+
+def _boxed_backend(
+    user_backend: Optional[Callable[..., Any]]
+) -> Callable[..., Any]:
+    def compiler(
+        gm: torch.fx.GraphModule, example_inputs: List[torch.Tensor]
+    ) -> Any:
+        if user_backend is None:
+            return make_boxed_func(gm)
+        # The forward and backward graphs do not update their inputs
+        gm.meta["input_output_aliases"] = {}
+        return make_boxed_func(user_backend(gm, example_inputs))
+
+    return compiler
+
+
+class _SegmentedModule:
+    """Runs a module split in several graphs by graph breaks.
+
+    Each graph is compiled with its own forward and backward through
+    the default AOT autograd partitioning, so the gradients flow across
+    the graphs with autograd. As the gradients of the first graphs are
+    only known after the backward pass of the whole module completes,
+    the optimizer update is compiled as a separate graph and run once
+    after it.
+    """
+
+    def __init__(
+        self,
+        module: torch.nn.Module,
+        optimizer: Optional[torch.optim.Optimizer],
+        user_backend: Optional[Callable[..., Any]],
+    ) -> None:
+        self._module = module
+        self._optimizer = optimizer
+        self._user_backend = user_backend
+        backend = _boxed_backend(user_backend)
+        aot_backend = aot_autograd(  # type: ignore[no-untyped-call]
+            fw_compiler=backend,
+            bw_compiler=backend,
+            decompositions=core_aten_decompositions(),
+        )
+        self._compiled = torch.compile(module, backend=aot_backend)  # type: ignore[attr-defined]
+        self._step: Optional[Callable[[], None]] = None
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        outs = self._compiled(*args, **kwargs)
+        if self._optimizer is None:
+            return outs
+        if self._step is None:
+            self._step = _compile_optimizer_step(
+                self._module, self._optimizer, self._user_backend
+            )
+        # Same as the joint graph, the gradients of all the outputs that
+        # require them are computed
+        to_backward = [
+            t
+            for t in pytree.tree_flatten(outs)[0]
+            if isinstance(t, torch.Tensor) and t.requires_grad
+        ]
+        torch.autograd.backward(  # type: ignore[no-untyped-call]
+            to_backward, [torch.ones_like(t) for t in to_backward]
+        )
+        self._step()
+        return outs
+
+
+def _module_tensors(module: torch.nn.Module) -> List[torch.Tensor]:
+    return list(module.parameters()) + list(module.buffers())
+
+
+class _CachedGraph:
+    """Runs a joint graph restored from the compile cache.
+
+    The graph is called directly with the module parameters, the
+    inputs and the optimizer state, without tracing the module or the
+    optimizer again. Although the backward computation is already part of
+    the graph, the outputs require gradients as the ones of the traced
+    graph do.
+    """
+
+    def __init__(
+        self,
+        module: torch.nn.Module,
+        optimizer: torch.optim.Optimizer,
+        user_backend: Optional[Callable[..., Any]],
+        entry: Dict[str, Any],
+        func: Optional[Callable[..., Any]] = None,
+        supports_inplace: bool = True,
+    ) -> None:
+        self._module = module
+        self._optimizer = optimizer
+        self._user_backend = user_backend
+        self._entry = entry
+        self._func = func
+        self._supports_inplace = supports_inplace
+        self._hyperparameters = _optimizer._HyperparameterInputs(optimizer)
+
+    def _compile(self, inputs: List[torch.Tensor]) -> None:
+        gm = self._entry["graph"]
+        backend = self._user_backend
+        self._supports_inplace = True
+        if backend is None:
+            self._func = gm
+            return
+        gm.meta["input_output_aliases"] = self._entry["input_output_aliases"]
+        artifact = self._entry.get("backend_artifact")
+        if artifact is not None:
+            self._func = backend.deserialize_compiled(gm, artifact)  # type: ignore[attr-defined]
+        else:
+            self._func = backend(gm, inputs)
+        self._supports_inplace = _supports_inplace(backend)
+
+    def __call__(self, args: Any, kwargs: Any) -> Any:
+        entry = self._entry
+        if self._func is None:
+            # Sets up the optimizer state as the traced step does
+            with _optimizer._initialize_optimizer(
+                self._optimizer, self._module
+            ):
+                pass
+        named_params = dict(self._module.named_parameters())
+        sources = (
+            _module_tensors(self._module)
+            + pytree.tree_flatten((args, kwargs))[0]
+        )
+        states = _optimizer_state_tensors(self._module, self._optimizer)
+        inputs = (
+            [sources[i] for i in entry["input_indices"]]
+            + states
+            + self._hyperparameters()
+        )
+        if self._func is None:
+            self._compile(inputs)
+        assert self._func is not None
+        with torch.no_grad():
+            outs = self._func(*inputs)
+            if not self._supports_inplace:
+                targets = [named_params[n] for n in entry["updated_params"]]
+                _write_back(targets + states, outs[-len(targets + states) :])
+        fwd_outs = list(outs[: entry["num_fwd_outputs"]])
+        for out, requires_grad in zip(fwd_outs, entry.get("requires_grad", [])):
+            if requires_grad and not out.requires_grad:
+                out.requires_grad_()
+        return pytree.tree_unflatten(fwd_outs, entry["out_spec"])
+
+
+# Number of graphs kept in memory when the graphs are cached in a directory
+_DEFAULT_MAX_VARIANTS = 16
+
+
+class _CompiledModule:
+    def __init__(
+        self,
+        module: torch.nn.Module,
+        optimizer: Optional[torch.optim.Optimizer],
+        user_backend: Optional[Callable[..., Any]],
+        fullgraph: bool = False,
+        cache_dir: Optional[str] = None,
+        shape_buckets: Optional[_bucketing.ShapeBuckets] = None,
+        max_variants: Optional[int] = None,
+    ) -> None:
+        if max_variants is not None and max_variants < 1:
+            raise ValueError("max_variants must be a positive number")
+        self._module = module
+        self._optimizer = optimizer
+        self._user_backend = user_backend
+        self._fullgraph = fullgraph
+        self._shape_buckets = shape_buckets
+        if max_variants is None and cache_dir is not None:
+            max_variants = _DEFAULT_MAX_VARIANTS
+        self._max_variants = max_variants
+        self._cache: Optional[_cache._CompileCache] = None
+        if cache_dir is not None and optimizer is not None:
+            self._cache = _cache._CompileCache(
+                cache_dir, module, optimizer, user_backend
+            )
+        # Graphs joined with the optimizer are run without dynamo once
+        # they are traced, keeping the most recently used ones
+        self._capture = optimizer is not None and (
+            cache_dir is not None or max_variants is not None
+        )
+        self._variants: "OrderedDict[str, _CachedGraph]" = OrderedDict()
+        self._traced: Optional[Sequence[Any]] = None
+        self._joint: Optional[Callable[..., Any]] = None
+        self._segmented: Optional[_SegmentedModule] = None
+        self.recompiles = 0
+
+    def _record_graph(self, *traced: Any) -> None:
+        self.recompiles += 1
+        self._traced = traced
+
+    def _add_variant(self, signature: str, graph: _CachedGraph) -> None:
+        self._variants[signature] = graph
+        if (
+            self._max_variants is not None
+            and len(self._variants) > self._max_variants
+        ):
+            self._variants.popitem(last=False)
+
+    def _capture_failed(self, reason: str) -> None:
+        message = (
+            "The graph joined with the optimizer is run through dynamo, "
+            "without cache_dir, max_variants and shape_buckets taking "
+            f"effect: {reason}"
+        )
+        if self._fullgraph:
+            raise RuntimeError(message)
+        warnings.warn(message)
+
+    def _capture_graph(
+        self, signature: str, args: Any, kwargs: Any, result: Any
+    ) -> None:
+        assert self._optimizer is not None
+        traced, self._traced = self._traced, None
+        if traced is None:
+            return
+        gm, func, supports_inplace, inputs, outs, opt_targets = traced
+        # Locate each graph input in the module tensors or the user inputs
+        sources = (
+            _module_tensors(self._module)
+            + pytree.tree_flatten((args, kwargs))[0]
+        )
+        input_indices = []
+        for x in inputs:
+            index = [i for i, s in enumerate(sources) if s is x]
+            if not index:
+                self._capture_failed(
+                    "the graph inputs cannot be mapped to the module tensors "
+                    "or the call arguments"
+                )
+                return
+            input_indices.append(index[0])
+        output_names = [
+            n.name
+            for n in pytree.tree_flatten(
+                [node.args for node in gm.graph.nodes if node.op == "output"]
+            )[0]
+        ]
+        num_fwd_outputs = sum(n.startswith("fwd_out_") for n in output_names)
+        results, out_spec = pytree.tree_flatten(result)
+        if len(results) != num_fwd_outputs or not all(
+            isinstance(r, torch.Tensor) and r.shape == o.shape
+            for r, o in zip(results, outs)
+        ):
+            self._capture_failed(
+                "the graph outputs cannot be mapped to the module outputs"
+            )
+            return
+        param_names = {p: n for n, p in self._module.named_parameters()}
+        n_params = len(opt_targets) - len(
+            _optimizer_state_tensors(self._module, self._optimizer)
+        )
+        entry = {
+            "graph": gm,
+            "input_indices": input_indices,
+            "input_output_aliases": _input_output_aliases(gm.graph),
+            "updated_params": [param_names[p] for p in opt_targets[:n_params]],
+            "num_fwd_outputs": num_fwd_outputs,
+            "out_spec": out_spec,
+            "requires_grad": [r.requires_grad for r in results],
+        }
+        backend = self._user_backend
+        if self._cache is not None:
+            if backend is not None and hasattr(backend, "serialize_compiled"):
+                entry["backend_artifact"] = backend.serialize_compiled(func)
+            self._cache.save(self._cache.path(signature), entry)
+        self._add_variant(
+            signature,
+            _CachedGraph(
+                self._module,
+                self._optimizer,
+                backend,
+                entry,
+                func,
+                supports_inplace,
+            ),
+        )
+        # The graph is run from the variants from now on; drop the dynamo
+        # cache entry so that evicted variants are traced again
+        torch._dynamo.eval_frame.remove_from_cache(self._module)  # type: ignore[no-untyped-call]
+
+    def _variant(self, signature: str) -> Optional[_CachedGraph]:
+        assert self._optimizer is not None
+        graph = self._variants.get(signature)
+        if graph is not None:
+            self._variants.move_to_end(signature)
+            return graph
+        if self._cache is None:
+            return None
+        entry = self._cache.load(self._cache.path(signature))
+        if entry is None:
+            return None
+        graph = _CachedGraph(
+            self._module, self._optimizer, self._user_backend, entry
+        )
+        self._add_variant(signature, graph)
+        return graph
+
+    def _run_joint(self, *args: Any, **kwargs: Any) -> Any:
+        if self._joint is None:
+            self._joint = _compile_module(
+                self._module,
+                self._optimizer,
+                self._user_backend,
+                self._record_graph,
+            )
+        recompiles = self.recompiles
+        with profiler.record("ppe.compile.recompile") as ntf:
+            # Only the calls compiling a new graph are reported
+            ntf.defer()
+            result = self._joint(*args, **kwargs)
+            if self.recompiles > recompiles:
+                ntf.complete()
+        if self.recompiles > recompiles:
+            profiler.get_time_summary().add(
+                "ppe.compile.recompiles", self.recompiles
+            )
+        return result
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        if self._shape_buckets is None:
+            return self._call(*args, **kwargs)
+        padded_args, padded_kwargs = self._shape_buckets.apply(args, kwargs)
+        return self._shape_buckets.unpad(
+            self._call(*padded_args, **padded_kwargs), args, kwargs
+        )
+
+    def _call(self, *args: Any, **kwargs: Any) -> Any:
+        if self._segmented is not None:
+            return self._segmented(*args, **kwargs)
+        signature = None
+        if self._capture:
+            # Computed at every step, as the graph is traced with the
+            # hyperparameters that are not passed as tensors of the step it
+            # is first run in
+            signature = "\n".join(
+                [
+                    _cache._signature(self._module.training, args, kwargs),
+                    _cache._hyperparameters(self._optimizer),
+                ]
+            )
+            graph = self._variant(signature)
+            if graph is not None:
+                return graph(args, kwargs)
+        try:
+            result = self._run_joint(*args, **kwargs)
+        except torch._dynamo.exc.Unsupported:
+            if self._fullgraph:
+                raise
+            # Graph breaks are found while tracing, before the
+            # parameters or the optimizer state are modified
+            self._segmented = _SegmentedModule(
+                self._module, self._optimizer, self._user_backend
+            )
+            with warnings.catch_warnings():
+                # The joint graph failed and did not cache anything
+                warnings.filterwarnings(
+                    "ignore", message="changing options to `torch.compile"
+                )
+                return self._segmented(*args, **kwargs)
+        if signature is not None:
+            self._capture_graph(signature, args, kwargs, result)
+        return result
+
+
 def compile(
     module: torch.nn.Module,
     optimizer: Optional[torch.optim.Optimizer] = None,
     backend: Optional[Callable[..., Any]] = None,
+    fullgraph: bool = False,
+    cache_dir: Optional[str] = None,
+    shape_buckets: Optional[_bucketing.ShapeBuckets] = None,
+    max_variants: Optional[int] = None,
 ) -> Callable[..., Any]:
     """Compiles a module and an optimizer in a single graph using the provided backend.
 
@@ -220,8 +714,26 @@ def compile(
         https://pytorch.org/docs/2.0/dynamo/custom-backends.html#custom-backends
 
     .. note::
-        Modules that are split in multiple graphs are not supported. ``torch.compiled``
-        is called with the ``fullgraph=True`` argument.
+        By default, the updated parameters and optimizer state returned by
+        the backend are copied back to the module and the optimizer.
+        Backends writing them into the input buffers instead (buffer
+        donation) can declare it with a ``supports_inplace = True``
+        attribute to skip the copies. The ``meta["input_output_aliases"]``
+        attribute of the graph passed to the backend maps the index of each
+        updated output to the index of the input it overwrites.
+
+    .. note::
+        A graph is compiled for every new input shape. The number of
+        compilations is reported to :mod:`pytorch_pfn_extras.profiler`:
+        the time taken by each of them under ``ppe.compile.recompile``, and
+        the running count under ``ppe.compile.recompiles``. It is also
+        available as the ``recompiles`` attribute of the returned object.
+
+    .. note::
+        Modules that are split in multiple graphs (e.g., by data-dependent
+        control flow) are compiled in several graphs, each with its forward
+        and backward computation. In this case, the optimizer update is
+        compiled in a separate graph that runs after the backward pass.
 
     Args:
         module:
@@ -230,10 +742,51 @@ def compile(
             Optimizer object associated to the module. It will be traced and its
             operations included in the module graph. Some dry run operations
             may be performed to fully initialize the optimizer status.
+            ``SGD``, ``Adam``, ``AdamW``, ``RMSprop`` and ``Adagrad`` are
+            supported, and other optimizers can be made traceable with
+            :func:`pytorch_pfn_extras._dynamo.register_optimizer`.
         backend (optional):
             Object to process the graph and compile it for custom devices, will
             use PyTorch dynamo by default if not specified.
+        fullgraph:
+            If ``True``, modules that cannot be captured in a single graph
+            raise an error instead of being compiled in several graphs, and
+            so do the graphs that cannot be run without dynamo once traced.
+        cache_dir (optional):
+            Directory to keep the traced graphs of the module and the
+            optimizer in. The graphs are keyed by the module structure,
+            the input shapes, the optimizer configuration and the backend,
+            so that later runs load them instead of tracing again.
+            Backends providing ``serialize_compiled(compiled)`` and
+            ``deserialize_compiled(gm, data)`` also have their compiled
+            artifacts cached, and a ``cache_key`` attribute of the backend
+            is used to tell apart backend configurations. Only graphs
+            joining the module and the optimizer are cached, and the
+            least recently used files are removed beyond 128 entries. The
+            cache files are pickled, so only use directories that are
+            trusted.
+        shape_buckets (optional):
+            A :class:`pytorch_pfn_extras._dynamo.ShapeBuckets` policy padding
+            the input tensors to a few bucket shapes before calling the
+            module, so that inputs with variable sizes share compiled
+            graphs. The outputs with the padded sizes are sliced back to
+            the sizes of the inputs.
+        max_variants (optional):
+            Maximum number of graphs joined with the optimizer (one per
+            input shape) to keep. Graphs are run directly once traced, and
+            the least recently used one is dropped and traced again when
+            needed. Defaults to 16 when ``cache_dir`` is given, otherwise
+            the graphs are left to dynamo. Note that dropping the graphs of
+            dynamo makes other compiled instances of the same module class
+            trace again.
     """
 
-    module_opt = _compile_module(module, optimizer, backend)
-    return module_opt
+    return _CompiledModule(
+        module,
+        optimizer,
+        backend,
+        fullgraph,
+        cache_dir,
+        shape_buckets,
+        max_variants,
+    )
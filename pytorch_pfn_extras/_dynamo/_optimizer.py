@@ -1,10 +1,130 @@
 import contextlib
 import types
-from typing import Any, Dict, Generator, List, Tuple
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+)
 
 import torch
 import torch.fx
 
+_InitState = Callable[[Dict[str, Any], torch.Tensor], Dict[str, Any]]
+_Step = Callable[[torch.optim.Optimizer], None]
+
+# Optimizers whose update is traced from a functional implementation
+# instead of `optimizer.step()`
+_traceable_optimizers: Dict[
+    Type[torch.optim.Optimizer],
+    Tuple[_Step, Optional[_InitState], Tuple[str, ...]],
+] = {}
+
+
+def register_optimizer(
+    optimizer_cls: Type[torch.optim.Optimizer],
+    step: _Step,
+    init_state: Optional[_InitState] = None,
+    hyperparameters: Sequence[str] = (),
+) -> None:
+    """Registers a traceable update of an optimizer for :func:`compile`.
+
+    ``optimizer.step()`` usually branches on the values of the tensors or
+    calls ``.item()``, which cannot be traced. The registered ``step`` is
+    traced instead; it receives the optimizer whose parameters and state
+    tensors are replaced with ``torch.fx.Proxy`` objects. Every parameter
+    and state tensor must be updated with in-place tensor methods (e.g.,
+    ``add_``), chaining each in-place call on the result of the previous
+    one.
+
+    Args:
+        optimizer_cls: The optimizer class. Subclasses are also handled.
+        step: A function performing the update of all the parameters.
+        init_state: A function taking a parameter group and a parameter
+            and returning the initial state of the parameter. If ``None``,
+            the state is initialized by running ``optimizer.step()`` with
+            zero gradients.
+        hyperparameters: Names of the entries of the parameter groups
+            (e.g., ``"lr"``) passed to the graph as tensor inputs instead of
+            being constants in it, so that changing them (e.g., with a
+            learning rate scheduler) does not need tracing again. ``step``
+            receives them as ``torch.fx.Proxy`` objects (a tuple of them for
+            tuple values), so it can only use them in tensor arithmetic, not
+            in control flow or as the ``alpha`` or ``value`` arguments.
+    """
+    _traceable_optimizers[optimizer_cls] = (
+        step,
+        init_state,
+        tuple(hyperparameters),
+    )
+
+
+def _get_traceable(
+    optimizer: torch.optim.Optimizer,
+) -> Optional[Tuple[_Step, Optional[_InitState], Tuple[str, ...]]]:
+    for cls in type(optimizer).__mro__:
+        if cls in _traceable_optimizers:
+            return _traceable_optimizers[cls]
+    return None
+
+
+def _tensor_hyperparameters(
+    optimizer: torch.optim.Optimizer,
+) -> Tuple[str, ...]:
+    traceable = _get_traceable(optimizer)
+    return () if traceable is None else traceable[2]
+
+
+def _hyperparameter_values(
+    optimizer: torch.optim.Optimizer,
+) -> List[Tuple[Any, torch.device]]:
+    # The values passed to the graph as tensors, in the order of its inputs
+    values: List[Tuple[Any, torch.device]] = []
+    names = _tensor_hyperparameters(optimizer)
+    for group in optimizer.param_groups:
+        device = group["params"][0].device
+        for name in names:
+            value = group[name]
+            if isinstance(value, (tuple, list)):
+                values.extend((v, device) for v in value)
+            else:
+                values.append((value, device))
+    return values
+
+
+class _HyperparameterInputs:
+    """The hyperparameters of an optimizer as the inputs of a graph.
+
+    The tensors are kept across the calls and only updated when the
+    hyperparameters change.
+    """
+
+    def __init__(self, optimizer: torch.optim.Optimizer) -> None:
+        self._optimizer = optimizer
+        self._values: List[Any] = []
+        self._tensors: List[torch.Tensor] = []
+
+    def __call__(self) -> List[torch.Tensor]:
+        values = _hyperparameter_values(self._optimizer)
+        if len(values) != len(self._tensors):
+            self._tensors = [
+                torch.tensor(float(v), device=device) for v, device in values
+            ]
+        else:
+            with torch.no_grad():
+                for tensor, old, (new, _) in zip(
+                    self._tensors, self._values, values
+                ):
+                    if isinstance(new, torch.Tensor) or new != old:
+                        tensor.fill_(new)
+        self._values = [v for v, _ in values]
+        return self._tensors
+
 
 # patch the torch.optim.SGD._init_group function to avoid the
 # symbolically traced variables cannot be used as inputs to control flow error
@@ -46,6 +166,8 @@ def _initialize_optimizer(
 ) -> Generator[Dict[torch.Tensor, str], None, None]:
     if isinstance(optimizer, torch.optim.SGD):
         optimizer._init_group = types.MethodType(_sgd_init_group, optimizer)  # type: ignore[attr-defined]
+    traceable = _get_traceable(optimizer)
+    init_state = traceable[1] if traceable is not None else None
 
     # Replace the optimizer parameters with zero tensors so that the step functions
     # will initialize the state but doesn"t modify the module real weights
@@ -58,26 +180,43 @@ def _initialize_optimizer(
         for p_group in optimizer.param_groups:
             param_groups.append([])
             for i, param in enumerate(p_group["params"]):
+                if init_state is not None and not optimizer.state[param]:  # type: ignore[index]
+                    optimizer.state[param] = init_state(p_group, param)  # type: ignore[index]
                 dummy = torch.zeros_like(param)
                 dummy.grad = torch.zeros_like(param)
                 param_groups[-1].append(param)
                 names[dummy] = names[param]
                 param_to_dummy[param] = dummy
                 p_group["params"][i] = dummy
+                # When compiling again (e.g., for new input shapes) the
+                # optimizer already holds the training state; step a copy
+                # of it so that the real state is left untouched
+                state = optimizer.state[param]  # type: ignore[index]
+                optimizer.state[dummy] = {  # type: ignore[index]
+                    k: v.clone() if isinstance(v, torch.Tensor) else v
+                    for k, v in state.items()
+                }
 
         # This call will initialize the `.state` values so fx can trace its ops
-        optimizer.step()
+        if init_state is None:
+            optimizer.step()
 
     yield names
 
     with torch.fx.experimental.proxy_tensor.maybe_disable_fake_tensor_mode():  # type: ignore[attr-defined,no-untyped-call]
         # Reset the optimizer original parameters
         for i, p_group in enumerate(optimizer.param_groups):
-            for j, _ in enumerate(p_group["params"]):
+            for j, traced in enumerate(p_group["params"]):
                 param = param_groups[i][j]
                 p_group["params"][j] = param
+                # Drop the entries of the dummy and traced parameters so that
+                # `optimizer.state_dict()` keeps working
                 dummy = param_to_dummy[param]
-                optimizer.state[param] = optimizer.state[dummy]  # type: ignore[index]
+                if traced is not dummy:
+                    optimizer.state.pop(traced, None)  # type: ignore[call-overload]
+                dummy_state = optimizer.state.pop(dummy)  # type: ignore[call-overload]
+                if not optimizer.state[param]:  # type: ignore[index]
+                    optimizer.state[param] = dummy_state  # type: ignore[index]
 
 
 def _create_meta(tensor: torch.Tensor) -> Dict[str, Any]:
@@ -113,7 +252,7 @@ def _get_shape_inference_inputs_and_metadata(
                 param_tensor = param
                 optimizer_state: Dict[Any, Any] = optimizer.state[param_tensor]
                 for state_tensor in optimizer_state.values():
-                    if state_tensor is not None:
+                    if isinstance(state_tensor, torch.Tensor):
                         params_meta[state_tensor] = _create_meta(state_tensor)
                         inputs.append(state_tensor)
 
@@ -156,7 +295,8 @@ def _create_placeholders_for_parameters_and_state(
             proxy = params_to_proxy[param_tensor]
             for p in optimizer.state[proxy]:  # type: ignore[index]
                 state_tensor = optimizer.state[param_tensor][p]
-                if state_tensor is not None:
+                # Non tensor values such as step counts are kept as constants
+                if isinstance(state_tensor, torch.Tensor):
                     state.append(opt_graph.placeholder(f"state_{p}_{p_name}"))
                     optimizer.state[proxy][p] = torch.fx.Proxy(  # type: ignore[index]
                         state[-1], tracer
@@ -167,6 +307,36 @@ def _create_placeholders_for_parameters_and_state(
     return placeholders, state
 
 
+@contextlib.contextmanager
+def _trace_hyperparameters(
+    optimizer: torch.optim.Optimizer,
+    opt_graph: torch.fx.Graph,
+    tracer: torch.fx.proxy.GraphAppendingTracer,
+    inputs: List[torch.Tensor],
+) -> Generator[None, None, None]:
+    # Replaces the hyperparameters passed as tensors with the proxies of new
+    # graph inputs while the step is traced
+    originals = []
+    tensors = iter(inputs)
+    names = _tensor_hyperparameters(optimizer)
+    for i, group in enumerate(optimizer.param_groups):
+        for name in names:
+            value = group[name]
+            is_tuple = isinstance(value, (tuple, list))
+            proxies = []
+            for j in range(len(value) if is_tuple else 1):
+                node = opt_graph.placeholder(f"hyperparameter_{i}_{name}_{j}")
+                node.meta = _create_meta(next(tensors))
+                proxies.append(torch.fx.Proxy(node, tracer))
+            originals.append((group, name, value))
+            group[name] = tuple(proxies) if is_tuple else proxies[0]
+    try:
+        yield
+    finally:
+        for group, name, value in originals:
+            group[name] = value
+
+
 def _is_inplace(node: torch.fx.Node, arg: torch.fx.Node) -> bool:
     # There is no easy way to detect inplace ops in torch, but they are
     # defined as tensor methods with a "_" suffix. ("add_", "mul_")
@@ -237,6 +407,9 @@ def _compile_optimizer(
         params_meta, inputs = _get_shape_inference_inputs_and_metadata(
             optimizer
         )
+        with torch.fx.experimental.proxy_tensor.maybe_disable_fake_tensor_mode():  # type: ignore[attr-defined,no-untyped-call]
+            hyperparameters = _HyperparameterInputs(optimizer)()
+        inputs += hyperparameters
         (
             param_placeholders,
             state_placeholders,
@@ -245,7 +418,14 @@ def _compile_optimizer(
         )
 
         # Trace the computation
-        optimizer.step()
+        traceable = _get_traceable(optimizer)
+        with _trace_hyperparameters(
+            optimizer, opt_graph, tracer, hyperparameters
+        ):
+            if traceable is not None:
+                traceable[0](optimizer)
+            else:
+                optimizer.step()
         # Look for the parameters and return their last known value
         outputs = []
 
@@ -280,3 +460,244 @@ def _compile_optimizer(
             torch.fx.passes.shape_prop.ShapeProp(opt_module).propagate(*inputs)  # type: ignore[attr-defined, no-untyped-call]
 
     return opt_graph, outputs
+
+
+# Traceable implementations of the optimizers in `torch.optim`. They follow
+# the single tensor (for-loop) implementations in PyTorch 2.0, with the
+# hyperparameters that can be scheduled (e.g., the learning rate) passed as
+# tensors.
+
+
+def _grad(group: Dict[str, Any], param: torch.Tensor) -> torch.Tensor:
+    grad = param.grad
+    assert grad is not None
+    return -grad if group.get("maximize", False) else grad
+
+
+def _sgd(optimizer: torch.optim.Optimizer) -> None:
+    for group in optimizer.param_groups:
+        weight_decay = group["weight_decay"]
+        for param in group["params"]:
+            grad = _grad(group, param)
+            state = optimizer.state[param]  # type: ignore[index]
+            if weight_decay != 0:
+                grad = grad.add(param, alpha=weight_decay)
+            # The buffer is only created when the momentum is not zero
+            buf = state.get("momentum_buffer")
+            if buf is not None:
+                buf = buf.mul_(group["momentum"]).add_(
+                    grad * (1 - group["dampening"])
+                )
+                if group["nesterov"]:
+                    grad = grad + buf * group["momentum"]
+                else:
+                    grad = buf
+            param.sub_(group["lr"] * grad)
+
+
+def init_adam_state(
+    group: Dict[str, Any], param: torch.Tensor
+) -> Dict[str, Any]:
+    """Returns the initial state of ``torch.optim.Adam``-like optimizers."""
+    state = {
+        "step": torch.zeros((), dtype=torch.float, device=param.device),
+        "exp_avg": torch.zeros_like(param, memory_format=torch.preserve_format),
+        "exp_avg_sq": torch.zeros_like(
+            param, memory_format=torch.preserve_format
+        ),
+    }
+    if group.get("amsgrad", False):
+        state["max_exp_avg_sq"] = torch.zeros_like(
+            param, memory_format=torch.preserve_format
+        )
+    return state
+
+
+def _adam_step(optimizer: torch.optim.Optimizer, decoupled: bool) -> None:
+    for group in optimizer.param_groups:
+        beta1, beta2 = group["betas"]
+        lr = group["lr"]
+        weight_decay = group["weight_decay"]
+        for param in group["params"]:
+            grad = _grad(group, param)
+            state = optimizer.state[param]  # type: ignore[index]
+            if weight_decay != 0 and not decoupled:
+                grad = grad.add(param, alpha=weight_decay)
+            exp_avg = state["exp_avg"].mul_(beta1).add_(grad * (1 - beta1))
+            exp_avg_sq = (
+                state["exp_avg_sq"].mul_(beta2).add_(grad * grad * (1 - beta2))
+            )
+            step = state["step"].add_(1)
+            bias_correction1 = 1 - beta1**step
+            bias_correction2_sqrt = (1 - beta2**step).sqrt()
+            if group["amsgrad"]:
+                exp_avg_sq = state["max_exp_avg_sq"].copy_(
+                    torch.maximum(state["max_exp_avg_sq"], exp_avg_sq)
+                )
+            denom = exp_avg_sq.sqrt() / bias_correction2_sqrt + group["eps"]
+            if weight_decay != 0 and decoupled:
+                # Applied after the gradient is read in the graph, as the
+                # `grad` attribute is only recorded when it is first used
+                param = param.mul_(1 - lr * weight_decay)
+            param.sub_(lr / bias_correction1 * exp_avg / denom)
+
+
+def _adam(optimizer: torch.optim.Optimizer) -> None:
+    _adam_step(optimizer, decoupled=False)
+
+
+def _adamw(optimizer: torch.optim.Optimizer) -> None:
+    _adam_step(optimizer, decoupled=True)
+
+
+def _init_rmsprop_state(
+    group: Dict[str, Any], param: torch.Tensor
+) -> Dict[str, Any]:
+    state: Dict[str, Any] = {
+        "step": 0,
+        "square_avg": torch.zeros_like(
+            param, memory_format=torch.preserve_format
+        ),
+    }
+    if group["momentum"] > 0:
+        state["momentum_buffer"] = torch.zeros_like(
+            param, memory_format=torch.preserve_format
+        )
+    if group["centered"]:
+        state["grad_avg"] = torch.zeros_like(
+            param, memory_format=torch.preserve_format
+        )
+    return state
+
+
+def _rmsprop(optimizer: torch.optim.Optimizer) -> None:
+    # The `step` count of RMSprop is a Python integer that is not used by
+    # the update; it is not advanced by the compiled graph
+    for group in optimizer.param_groups:
+        alpha = group["alpha"]
+        for param in group["params"]:
+            grad = _grad(group, param)
+            state = optimizer.state[param]  # type: ignore[index]
+            if group["weight_decay"] != 0:
+                grad = grad.add(param, alpha=group["weight_decay"])
+            square_avg = (
+                state["square_avg"].mul_(alpha).add_(grad * grad * (1 - alpha))
+            )
+            if group["centered"]:
+                grad_avg = (
+                    state["grad_avg"].mul_(alpha).add_(grad * (1 - alpha))
+                )
+                avg = square_avg.addcmul(grad_avg, grad_avg, value=-1).sqrt()
+            else:
+                avg = square_avg.sqrt()
+            avg = avg + group["eps"]
+            # The buffer is only created when the momentum is positive
+            if "momentum_buffer" in state:
+                buf = (
+                    state["momentum_buffer"]
+                    .mul_(group["momentum"])
+                    .addcdiv_(grad, avg)
+                )
+                param.sub_(group["lr"] * buf)
+            else:
+                param.sub_(group["lr"] * grad / avg)
+
+
+def _init_adagrad_state(
+    group: Dict[str, Any], param: torch.Tensor
+) -> Dict[str, Any]:
+    # Adagrad initializes the state in the constructor
+    return {
+        "step": torch.tensor(0.0),
+        "sum": torch.full_like(
+            param,
+            group["initial_accumulator_value"],
+            memory_format=torch.preserve_format,
+        ),
+    }
+
+
+def _adagrad(optimizer: torch.optim.Optimizer) -> None:
+    for group in optimizer.param_groups:
+        for param in group["params"]:
+            grad = _grad(group, param)
+            state = optimizer.state[param]  # type: ignore[index]
+            step = state["step"].add_(1)
+            if group["weight_decay"] != 0:
+                grad = grad.add(param, alpha=group["weight_decay"])
+            clr = group["lr"] / (1 + (step - 1) * group["lr_decay"])
+            state_sum = state["sum"].addcmul_(grad, grad, value=1)
+            std = state_sum.sqrt() + group["eps"]
+            param.sub_(clr * grad / std)
+
+
+def lamb_step(optimizer: torch.optim.Optimizer) -> None:
+    """Traceable update of LAMB (https://arxiv.org/abs/1904.00962).
+
+    The Adam update with decoupled weight decay is scaled by the trust
+    ratio ``||param|| / ||update||`` of each parameter. Parameter groups
+    need ``lr``, ``betas``, ``eps`` and ``weight_decay`` and the state
+    is the one of :func:`init_adam_state`. LAMB implementations having
+    this layout can be compiled by registering them::
+
+        register_optimizer(
+            Lamb,
+            lamb_step,
+            init_adam_state,
+            hyperparameters=("lr", "betas", "eps"),
+        )
+    """
+    for group in optimizer.param_groups:
+        beta1, beta2 = group["betas"]
+        for param in group["params"]:
+            grad = _grad(group, param)
+            state = optimizer.state[param]  # type: ignore[index]
+            exp_avg = state["exp_avg"].mul_(beta1).add_(grad * (1 - beta1))
+            exp_avg_sq = (
+                state["exp_avg_sq"].mul_(beta2).add_(grad * grad * (1 - beta2))
+            )
+            step = state["step"].add_(1)
+            update = (exp_avg / (1 - beta1**step)) / (
+                (exp_avg_sq / (1 - beta2**step)).sqrt() + group["eps"]
+            )
+            if group["weight_decay"] != 0:
+                update = update + group["weight_decay"] * param
+            weight_norm = param.norm()
+            update_norm = update.norm()
+            trust_ratio = torch.where(
+                (weight_norm > 0) & (update_norm > 0),
+                weight_norm / update_norm,
+                torch.ones_like(weight_norm),
+            )
+            param.sub_(group["lr"] * trust_ratio * update)
+
+
+register_optimizer(
+    torch.optim.SGD,
+    _sgd,
+    hyperparameters=("lr", "momentum", "dampening"),
+)
+register_optimizer(
+    torch.optim.Adam,
+    _adam,
+    init_adam_state,
+    hyperparameters=("lr", "betas", "eps"),
+)
+register_optimizer(
+    torch.optim.AdamW,
+    _adamw,
+    init_adam_state,
+    hyperparameters=("lr", "betas", "eps"),
+)
+register_optimizer(
+    torch.optim.RMSprop,
+    _rmsprop,
+    _init_rmsprop_state,
+    hyperparameters=("lr", "alpha", "eps", "momentum"),
+)
+register_optimizer(
+    torch.optim.Adagrad,
+    _adagrad,
+    _init_adagrad_state,
+    hyperparameters=("lr", "lr_decay", "eps"),
+)
@@ -1,9 +1,19 @@
 from pytorch_pfn_extras.distributed._dataset_util import (  # NOQA
     create_distributed_subset_indices,
 )
+from pytorch_pfn_extras.distributed._distributed_subset_sampler import (  # NOQA
+    DistributedSubsetSampler,
+    iterate_distributed_subset_indices,
+)
 from pytorch_pfn_extras.distributed._distributed_validation_sampler import (  # NOQA
     DistributedValidationSampler,
 )
+from pytorch_pfn_extras.distributed._hierarchical import (  # NOQA
+    HierarchicalGroups,
+    hierarchical_all_gather_object,
+    hierarchical_all_reduce,
+    hierarchical_broadcast,
+)
 from pytorch_pfn_extras.distributed._initialize import (  # NOQA
     initialize_ompi_environment,
 )
@@ -0,0 +1,191 @@
+from typing import Any, Dict, Iterator, Optional, Sized
+
+import torch
+import torch.distributed as dist
+from pytorch_pfn_extras.distributed._dataset_util import _shared_random_seed
+
+_MASK64 = (1 << 64) - 1
+
+
+def _mix64(x: int) -> int:
+    # SplitMix64 finalizer
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return x ^ (x >> 31)
+
+
+class _FeistelPermutation:
+    """A keyed pseudo-random permutation of ``range(n)``.
+
+    A balanced Feistel network permutes ``range(2 ** (2 * half_bits))`` and
+    values outside of ``range(n)`` are mapped again ("cycle walking"), so
+    any position can be evaluated independently in O(1) memory.
+    """
+
+    def __init__(self, n: int, key: int, rounds: int = 4) -> None:
+        bits = max((n - 1).bit_length(), 2)
+        self._n = n
+        self._half_bits = (bits + 1) // 2
+        self._mask = (1 << self._half_bits) - 1
+        self._keys = [_mix64((key + r) & _MASK64) for r in range(rounds)]
+
+    def _encrypt(self, x: int) -> int:
+        left, right = x >> self._half_bits, x & self._mask
+        for k in self._keys:
+            left, right = right, left ^ (_mix64(right ^ k) & self._mask)
+        return (left << self._half_bits) | right
+
+    def __call__(self, i: int) -> int:
+        x = self._encrypt(i)
+        while x >= self._n:
+            x = self._encrypt(x)
+        return x
+
+
+def _subset_range(
+    num_total_samples: int, num_replicas: int, rank: int
+) -> "range":
+    n_sub_samples = (num_total_samples + num_replicas - 1) // num_replicas
+    b = num_total_samples * rank // num_replicas
+    e = min(b + n_sub_samples, num_total_samples)
+    return range(b, e)
+
+
+def _epoch_key(seed: int, epoch: int) -> int:
+    return _mix64((_mix64(seed & _MASK64) + epoch) & _MASK64)
+
+
+def iterate_distributed_subset_indices(
+    num_total_samples: int,
+    num_replicas: Optional[int] = None,
+    rank: Optional[int] = None,
+    shuffle: bool = True,
+    seed: Optional[int] = None,
+    epoch: int = 0,
+    start: int = 0,
+) -> Iterator[int]:
+    """Lazily yields indices of a dataset to be used for the current process.
+
+    This is a streaming counterpart of
+    :func:`create_distributed_subset_indices`. Instead of materializing and
+    shuffling the whole index list, the indices are generated on demand
+    from a keyed pseudo-random permutation, so it takes O(1) memory
+    regardless of the dataset size. Note that the shuffled order differs
+    from the one of :func:`create_distributed_subset_indices`.
+
+    Args:
+        num_total_samples: The size of the dataset.
+        num_replicas: Number of processes participating in the training.
+            By default, ``torch.distributed.get_world_size()`` is used.
+        rank: Rank of the current process within `num_replicas`.
+            By default, ``torch.distributed.get_rank()`` is used.
+        shuffle: If ``True`` (default), shuffle the indices.
+        seed: Random seed used to shuffle.
+        epoch: Epoch number mixed into the seed, so that each epoch has
+            a different but deterministic order.
+        start: Number of leading indices of this process to skip, e.g.,
+            to resume in the middle of an epoch.
+    """
+    if num_replicas is None:
+        num_replicas = torch.distributed.get_world_size()  # type: ignore
+    if rank is None:
+        rank = torch.distributed.get_rank()  # type: ignore
+
+    positions = _subset_range(num_total_samples, num_replicas, rank)[start:]
+    if not shuffle:
+        return iter(positions)
+    if seed is None:
+        seed = _shared_random_seed()
+    perm = _FeistelPermutation(num_total_samples, _epoch_key(seed, epoch))
+    return (perm(i) for i in positions)
+
+
+class DistributedSubsetSampler(torch.utils.data.Sampler):
+    """Distributed sampler generating indices lazily in O(1) memory
+
+    This sampler splits the dataset to each process in the same manner as
+    :func:`create_distributed_subset_indices` while producing the indices
+    on demand with :func:`iterate_distributed_subset_indices`. The order is
+    deterministic for a given ``seed`` and epoch (see :meth:`set_epoch`).
+
+    The position in the current epoch can be saved with :meth:`state_dict`
+    and restored with :meth:`load_state_dict`; the next iteration then
+    resumes from the restored position without generating the skipped
+    indices. Note that the position counts the indices handed out by the
+    sampler, which may run ahead of the batches actually consumed when
+    ``DataLoader`` prefetches. :class:`~pytorch_pfn_extras.training.Trainer`
+    instead restores the exact position of the next unseen batch through
+    :meth:`set_start` when resuming from a snapshot.
+    """
+
+    def __init__(
+        self,
+        dataset: Sized,
+        num_replicas: Optional[int] = None,
+        rank: Optional[int] = None,
+        shuffle: bool = True,
+        seed: int = 0,
+    ) -> None:
+        if num_replicas is None:
+            if not dist.is_available():  # type: ignore[no-untyped-call]
+                raise RuntimeError(
+                    "Requires distributed package to be available"
+                )
+            num_replicas = dist.get_world_size()  # type: ignore[no-untyped-call]
+        if rank is None:
+            if not dist.is_available():  # type: ignore[no-untyped-call]
+                raise RuntimeError(
+                    "Requires distributed package to be available"
+                )
+            rank = dist.get_rank()  # type: ignore[no-untyped-call]
+        if rank >= num_replicas or rank < 0:
+            raise ValueError(
+                "Invalid rank {}, rank should be in the interval"
+                " [0, {}]".format(rank, num_replicas - 1)
+            )
+        self.num_replicas = num_replicas
+        self.rank = rank
+        self.shuffle = shuffle
+        self.seed = seed
+        self.epoch = 0
+
+        self.dataset_len = len(dataset)
+        self.num_samples = len(
+            _subset_range(self.dataset_len, num_replicas, rank)
+        )
+        self._offset = 0
+
+    def set_epoch(self, epoch: int) -> None:
+        """Sets the epoch used to shuffle and rewinds the position."""
+        self.epoch = epoch
+        self._offset = 0
+
+    def set_start(self, start: int) -> None:
+        """Skips the first ``start`` indices of the next iteration."""
+        self._offset = start
+
+    def __iter__(self) -> Iterator[int]:
+        start = self._offset
+        indices = iterate_distributed_subset_indices(
+            self.dataset_len,
+            self.num_replicas,
+            self.rank,
+            shuffle=self.shuffle,
+            seed=self.seed,
+            epoch=self.epoch,
+            start=start,
+        )
+        for i, index in enumerate(indices, start + 1):
+            self._offset = i
+            yield index
+        self._offset = 0
+
+    def __len__(self) -> int:
+        return self.num_samples
+
+    def state_dict(self) -> Dict[str, Any]:
+        return {"epoch": self.epoch, "offset": self._offset}
+
+    def load_state_dict(self, to_load: Dict[str, Any]) -> None:
+        self.epoch = to_load["epoch"]
+        self._offset = to_load["offset"]
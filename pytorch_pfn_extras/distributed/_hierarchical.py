@@ -0,0 +1,174 @@
+import os
+from typing import Any, List, Optional
+
+import torch
+import torch.distributed as dist
+
+
+def _get_local_size() -> int:
+    e = os.environ
+    for name in ("LOCAL_WORLD_SIZE", "OMPI_COMM_WORLD_LOCAL_SIZE"):
+        if name in e:
+            return int(e[name])
+    raise RuntimeError(
+        "Cannot determine the number of processes per node. "
+        "Set LOCAL_WORLD_SIZE or pass local_size explicitly."
+    )
+
+
+class HierarchicalGroups:
+    """Process groups for two-level (intra-node / inter-node) collectives.
+
+    Ranks are assumed to be assigned contiguously per node, i.e., the
+    processes ``[n * local_size, (n + 1) * local_size)`` run on node ``n``.
+    This is the default mapping of ``mpirun`` and ``torchrun``.
+
+    Creating the groups is a collective operation; all the processes in
+    the default process group must construct this object in the same order.
+
+    Args:
+        local_size: The number of processes per node. By default, it is
+            taken from the ``LOCAL_WORLD_SIZE`` or
+            ``OMPI_COMM_WORLD_LOCAL_SIZE`` environment variables.
+    """
+
+    def __init__(self, local_size: Optional[int] = None) -> None:
+        if not dist.is_initialized():  # type: ignore[no-untyped-call]
+            raise RuntimeError("PyTorch distributed module is not initialized.")
+        if local_size is None:
+            local_size = _get_local_size()
+        world_size = dist.get_world_size()  # type: ignore[no-untyped-call]
+        rank = dist.get_rank()  # type: ignore[no-untyped-call]
+        if local_size <= 0 or world_size % local_size != 0:
+            raise ValueError(
+                "world size {} is not divisible by local size {}".format(
+                    world_size, local_size
+                )
+            )
+
+        self.local_size = local_size
+        self.num_nodes = world_size // local_size
+        self.local_rank = rank % local_size
+        self.node_rank = rank // local_size
+        self.leader_rank = self.node_rank * local_size
+
+        # `new_group` must be called by every process for every group.
+        self.intra_group: Optional[dist.ProcessGroup] = None
+        for node in range(self.num_nodes):
+            ranks = list(range(node * local_size, (node + 1) * local_size))
+            group = dist.new_group(ranks)  # type: ignore[no-untyped-call]
+            if node == self.node_rank:
+                self.intra_group = group
+        # Processes that have the same local rank across the nodes.
+        # The group for local rank 0 connects the node leaders.
+        self.inter_group: Optional[dist.ProcessGroup] = None
+        for local_rank in range(local_size):
+            ranks = list(range(local_rank, world_size, local_size))
+            group = dist.new_group(ranks)  # type: ignore[no-untyped-call]
+            if local_rank == self.local_rank:
+                self.inter_group = group
+
+    @property
+    def is_leader(self) -> bool:
+        return self.local_rank == 0
+
+    @property
+    def is_flat(self) -> bool:
+        """``True`` if the hierarchy degenerates into a single level."""
+        return self.num_nodes == 1 or self.local_size == 1
+
+
+def hierarchical_all_reduce(
+    tensor: torch.Tensor, groups: HierarchicalGroups
+) -> None:
+    """Sums ``tensor`` over all the processes in place.
+
+    With NCCL, the tensor is reduce-scattered inside the node, each shard
+    is all-reduced with the processes of the same local rank on the other
+    nodes, and the shards are all-gathered inside the node again, so every
+    process sends only ``1 / local_size`` of the data across the nodes.
+    Backends without reduce-scatter support (e.g., Gloo) reduce to the node
+    leader, all-reduce among the leaders and broadcast inside the node.
+    """
+    if groups.is_flat:
+        dist.all_reduce(tensor)  # type: ignore[no-untyped-call]
+        return
+
+    if dist.get_backend(groups.intra_group) == "nccl":  # type: ignore[no-untyped-call]
+        flat = tensor.reshape(-1)
+        numel = flat.numel()
+        chunk_size = (numel + groups.local_size - 1) // groups.local_size
+        padded = flat.new_zeros(chunk_size * groups.local_size)
+        padded[:numel].copy_(flat)
+        chunk = flat.new_empty(chunk_size)
+        dist.reduce_scatter_tensor(  # type: ignore[no-untyped-call]
+            chunk, padded, group=groups.intra_group
+        )
+        dist.all_reduce(chunk, group=groups.inter_group)  # type: ignore[no-untyped-call]
+        dist.all_gather_into_tensor(  # type: ignore[no-untyped-call]
+            padded, chunk, group=groups.intra_group
+        )
+        tensor.copy_(padded[:numel].view_as(tensor))
+        return
+
+    dist.reduce(  # type: ignore[no-untyped-call]
+        tensor, groups.leader_rank, group=groups.intra_group
+    )
+    if groups.is_leader:
+        dist.all_reduce(tensor, group=groups.inter_group)  # type: ignore[no-untyped-call]
+    dist.broadcast(  # type: ignore[no-untyped-call]
+        tensor, groups.leader_rank, group=groups.intra_group
+    )
+
+
+def hierarchical_broadcast(
+    tensor: torch.Tensor, groups: HierarchicalGroups
+) -> None:
+    """Broadcasts ``tensor`` from rank 0 to all the processes in place.
+
+    The data is first sent to the node leaders and then broadcast inside
+    each node.
+    """
+    if groups.is_flat:
+        dist.broadcast(tensor, 0)  # type: ignore[no-untyped-call]
+        return
+
+    if groups.is_leader:
+        dist.broadcast(tensor, 0, group=groups.inter_group)  # type: ignore[no-untyped-call]
+    dist.broadcast(  # type: ignore[no-untyped-call]
+        tensor, groups.leader_rank, group=groups.intra_group
+    )
+
+
+def hierarchical_all_gather_object(
+    obj: Any, groups: HierarchicalGroups
+) -> List[Any]:
+    """Gathers picklable objects from all the processes.
+
+    Returns:
+        A list of the objects ordered by rank.
+    """
+    if groups.is_flat:
+        world_size = dist.get_world_size()  # type: ignore[no-untyped-call]
+        gathered: List[Any] = [None] * world_size
+        dist.all_gather_object(gathered, obj)  # type: ignore[no-untyped-call]
+        return gathered
+
+    local_objs: Optional[List[Any]] = None
+    if groups.is_leader:
+        local_objs = [None] * groups.local_size
+    dist.gather_object(  # type: ignore[no-untyped-call]
+        obj, local_objs, dst=groups.leader_rank, group=groups.intra_group
+    )
+
+    result: List[Any] = [None]
+    if groups.is_leader:
+        node_objs: List[Any] = [None] * groups.num_nodes
+        dist.all_gather_object(  # type: ignore[no-untyped-call]
+            node_objs, local_objs, group=groups.inter_group
+        )
+        result[0] = [o for objs in node_objs for o in objs]
+    dist.broadcast_object_list(  # type: ignore[no-untyped-call]
+        result, src=groups.leader_rank, group=groups.intra_group
+    )
+    return result[0]  # type: ignore[no-any-return]
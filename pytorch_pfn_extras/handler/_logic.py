@@ -1,9 +1,21 @@
 import contextlib
 import dataclasses
 import warnings
-from typing import Any, Dict, Generator, Iterable, Mapping, Optional
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generator,
+    Hashable,
+    Iterable,
+    Mapping,
+    Optional,
+    Tuple,
+)
 
 import torch
+import torch.utils._pytree as pytree
+from pytorch_pfn_extras._torch_version import requires
 from pytorch_pfn_extras.handler._code_block import forward, update_parameters
 from pytorch_pfn_extras.runtime import _autocast
 
@@ -32,6 +44,18 @@ def _normalize_outputs(outputs: Any) -> Dict[str, Any]:
     return target
 
 
+def _batch_signature(batch: Any) -> Hashable:
+    # Shapes and dtypes of the inputs decide whether a compiled graph
+    # can be reused; other values are guarded by dynamo itself
+    leaves, spec = pytree.tree_flatten(batch)
+    return str(spec), tuple(
+        (tuple(x.shape), x.dtype, x.device, x.requires_grad)
+        if isinstance(x, torch.Tensor)
+        else type(x)
+        for x in leaves
+    )
+
+
 class BaseLogic:
     def __init__(self, options: Optional[Dict[str, Any]] = None):
         super().__init__()
@@ -178,9 +202,36 @@ class Logic(BaseLogic):
                     If dict, options are passed to ``torch.autocast``.
                 * ``'grad_scaler'`` (torch.cuda.amp.GradScaler):
                     A gradient scaler that outputs are applied to.
+                * ``'compile_step'`` (bool or dict):
+                    If ``True``, the forward, backward and optimizer step
+                    of ``train_step`` and ``train_step_optimizers`` are run
+                    as a single callable built by
+                    :func:`pytorch_pfn_extras.compile`. A dict is passed
+                    to it as keyword arguments (e.g., ``{"backend": ...}``).
+                    A graph is compiled for each shape and dtype
+                    signature of the batch. When compiling with
+                    ``{"fullgraph": True}`` and the model cannot be
+                    captured in a single graph, a warning is emitted and
+                    the step runs eagerly for that signature. The gradients
+                    of all the outputs requiring them are computed.
+                    The hyperparameters of the optimizers registered with
+                    :func:`pytorch_pfn_extras._dynamo.register_optimizer`
+                    (e.g., the learning rate of ``SGD`` and ``Adam``) are
+                    inputs of the graph, so they can
+                    be changed by a scheduler at every step. The other
+                    hyperparameters are constants in the graph, and the
+                    step is compiled again with a warning when they
+                    change.
+                    Requires PyTorch 2.0 or later and cannot be combined
+                    with ``'backward_outputs'``, ``'backward_function'``
+                    or ``'grad_scaler'``.
         """
         super().__init__(options)
         self.model_name = model_name
+        self._compiled_step: Optional[Callable[..., Any]] = None
+        self._compiled_signatures: Dict[Hashable, bool] = {}
+        self._compiled_hyperparameters: Optional[str] = None
+        self._step_compiled = False
 
     def consume_options(self, options: Dict[str, Any]) -> None:
         super().consume_options(options)
@@ -206,6 +257,71 @@ class Logic(BaseLogic):
                     "torch.cuda.amp.GradScaler object"
                 )
 
+        compile_step = options.pop("compile_step", False)
+        if isinstance(compile_step, bool):
+            compile_step = {} if compile_step else None
+        self._compile_options: Optional[Dict[str, Any]] = compile_step
+        if self._compile_options is not None:
+            if not requires("2.0.0"):
+                raise RuntimeError("compile_step requires PyTorch 2.0 or later")
+            if (
+                self.backward_outputs is not None
+                or self._backward_fn is not None
+                or self._grad_scaler is not None
+            ):
+                raise ValueError(
+                    "compile_step cannot be used with backward_outputs, "
+                    "backward_function or grad_scaler"
+                )
+
+    def _compiled_train_step(
+        self,
+        model: torch.nn.Module,
+        optimizer: torch.optim.Optimizer,
+        batch: Any,
+    ) -> Tuple[bool, Any]:
+        from pytorch_pfn_extras._dynamo import _cache, compile
+        from torch._dynamo.exc import Unsupported
+
+        assert self._compile_options is not None
+        key = _batch_signature(batch)
+        if not self._compiled_signatures.get(key, True):
+            return False, None
+        hyperparameters = _cache._hyperparameters(optimizer)
+        if hyperparameters != self._compiled_hyperparameters:
+            if self._compiled_step is not None:
+                warnings.warn(
+                    "The optimizer hyperparameters changed and the training "
+                    "step is compiled again"
+                )
+                # Dynamo would reuse the graph traced with the old constants
+                torch._dynamo.eval_frame.remove_from_cache(model)  # type: ignore[no-untyped-call]
+                self._compiled_step = None
+                # Signatures with graph breaks still run eagerly
+                self._compiled_signatures = {
+                    k: v for k, v in self._compiled_signatures.items() if not v
+                }
+            self._compiled_hyperparameters = hyperparameters
+        if self._compiled_step is None:
+            # Dynamo keeps a graph for each input signature of the callable
+            self._compiled_step = compile(
+                model, optimizer, **self._compile_options
+            )
+        try:
+            with self._autocast.autocast():
+                outs = self._forward(self._compiled_step, batch)  # type: ignore[arg-type]
+        except Unsupported as e:
+            # Graph breaks are detected while tracing, before any
+            # parameter or optimizer state is updated
+            warnings.warn(
+                "The training step could not be compiled into a single "
+                f"graph and runs eagerly for this input signature: {e}"
+            )
+            self._compiled_signatures[key] = False
+            return False, None
+        self._compiled_signatures[key] = True
+        return True, outs
+
     def _forward(self, model: torch.nn.Module, batch: Any) -> Any:
         if isinstance(batch, tuple) and hasattr(batch, "_fields"):
             # namedtuple
@@ -307,6 +423,12 @@ class Logic(BaseLogic):
             batch (torch.Tensor, list of torch.Tensor, dict of torch.Tensor):
                 Input tensors feeded to the model of the current step.
         """
+        if self._compile_options is not None:
+            self._step_compiled, outs = self._compiled_train_step(
+                models[self.model_name], optimizers[self.model_name], batch
+            )
+            if self._step_compiled:
+                return outs
         with self._autocast.autocast():
             optimizers[self.model_name].zero_grad()
             outs = self._forward(models[self.model_name], batch)
@@ -330,6 +452,10 @@ class Logic(BaseLogic):
             batch_idx (int):
                 Number of steps already finished.
         """
+        if self._step_compiled:
+            # The update already ran as a part of the compiled step
+            self._step_compiled = False
+            return
         optimizer = optimizers[self.model_name]
         if self._grad_scaler is not None:
             self._grad_scaler.step(optimizer)
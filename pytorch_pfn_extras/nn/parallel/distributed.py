@@ -1,3 +1,4 @@
+import functools
 import logging
 import threading
 from collections import OrderedDict
@@ -17,6 +18,7 @@ from typing import (
 )
 
 import torch
+from pytorch_pfn_extras import distributed as ppe_dist
 from pytorch_pfn_extras.profiler import record
 from torch import distributed as dist
 from torch import nn
@@ -87,6 +89,7 @@ def get_foreach_wrapper() -> _ForEachWrapper:
 def _reduce(
     values: Sequence[torch.Tensor],
     group: Optional[dist.ProcessGroup],
+    hierarchical_groups: Optional[ppe_dist.HierarchicalGroups] = None,
 ) -> None:
     size = sum([v.numel() for v in values])
 
@@ -102,7 +105,10 @@ def _reduce(
     with record(
         "torch.distributed.all_reduce", use_cuda=torch.cuda.is_available()
     ):
-        dist.all_reduce(coalesced, group=group)  # type: ignore[no-untyped-call]
+        if hierarchical_groups is None:
+            dist.all_reduce(coalesced, group=group)  # type: ignore[no-untyped-call]
+        else:
+            ppe_dist.hierarchical_all_reduce(coalesced, hierarchical_groups)
 
     # unflatten values
     get_foreach_wrapper().multi_tensor_scale(
@@ -113,7 +119,9 @@ def _reduce(
 
 
 def _broadcast(
-    values: Sequence[torch.Tensor], group: Optional[dist.ProcessGroup]
+    values: Sequence[torch.Tensor],
+    group: Optional[dist.ProcessGroup],
+    hierarchical_groups: Optional[ppe_dist.HierarchicalGroups] = None,
 ) -> None:
     with torch.no_grad():  # type: ignore[no-untyped-call]
         coalesced = get_foreach_wrapper().flatten(  # type: ignore[no-untyped-call]
@@ -122,7 +130,10 @@ def _broadcast(
         with record(
             "torch.distributed.broadcast", use_cuda=torch.cuda.is_available()
         ):
-            dist.broadcast(coalesced, 0, group=group)  # type: ignore[no-untyped-call]
+            if hierarchical_groups is None:
+                dist.broadcast(coalesced, 0, group=group)  # type: ignore[no-untyped-call]
+            else:
+                ppe_dist.hierarchical_broadcast(coalesced, hierarchical_groups)
         src = get_foreach_wrapper().unflatten(  # type: ignore[no-untyped-call]
             coalesced, values
         )
@@ -165,6 +176,15 @@ class DistributedDataParallel(nn.Module):
             (default: `torch.distributed.group.WORLD`)
         reduce_function: All-reduce function
         broadcast_function: Broadcast function
+        hierarchical: Boolean flag to use two-level collectives, i.e.,
+            communication inside each node followed by communication across
+            the nodes, which reduces the inter-node traffic.
+            The number of processes per node is taken from the
+            ``LOCAL_WORLD_SIZE`` or ``OMPI_COMM_WORLD_LOCAL_SIZE``
+            environment variables, or can be given by passing
+            :class:`~pytorch_pfn_extras.distributed.HierarchicalGroups`.
+            Only the default process group is supported.
+            (default: `False`)
     """
 
     _unused_parameters = [
@@ -184,6 +204,7 @@ class DistributedDataParallel(nn.Module):
         process_group: Optional[dist.ProcessGroup] = None,
         reduce_function: Optional[DistFunc] = None,
         broadcast_function: Optional[DistFunc] = None,
+        hierarchical: Union[bool, ppe_dist.HierarchicalGroups] = False,
         **kwargs: Any,
     ) -> None:
         """
@@ -200,6 +221,16 @@ class DistributedDataParallel(nn.Module):
                     " ignores {}".format(name)
                 )
 
+        hierarchical_groups: Optional[ppe_dist.HierarchicalGroups] = None
+        if isinstance(hierarchical, ppe_dist.HierarchicalGroups):
+            hierarchical_groups = hierarchical
+        elif hierarchical:
+            hierarchical_groups = ppe_dist.HierarchicalGroups()
+        if hierarchical_groups is not None and process_group is not None:
+            raise ValueError(
+                "hierarchical collectives cannot be used with process_group"
+            )
+
         if process_group is None:
             process_group = dist.group.WORLD
 
@@ -207,8 +238,13 @@ class DistributedDataParallel(nn.Module):
         self._broadcast_buffers = broadcast_buffers
         self._negotiate_grads = negotiate_grads
         self._process_group = process_group
-        self._reduce_function = reduce_function or _reduce
-        self._broadcast_function = broadcast_function or _broadcast
+        self._hierarchical_groups = hierarchical_groups
+        self._reduce_function = reduce_function or functools.partial(
+            _reduce, hierarchical_groups=hierarchical_groups
+        )
+        self._broadcast_function = broadcast_function or functools.partial(
+            _broadcast, hierarchical_groups=hierarchical_groups
+        )
 
         self._device = list(self.parameters())[0].device
 
@@ -231,7 +267,9 @@ class DistributedDataParallel(nn.Module):
         if dist.is_initialized():  # type: ignore[no-untyped-call]
             groups = _group_by_type(values)
             for group in groups:
-                _broadcast(group, self._process_group)
+                _broadcast(
+                    group, self._process_group, self._hierarchical_groups
+                )
         else:
             logger.warning("torch.distributed is not initialized")
 
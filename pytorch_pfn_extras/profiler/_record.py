@@ -1,4 +1,5 @@
 import inspect
+import time
 import types
 from contextlib import contextmanager
 from typing import (
@@ -12,7 +13,7 @@ from typing import (
 )
 
 import torch
-from pytorch_pfn_extras.profiler import _time_summary
+from pytorch_pfn_extras.profiler import _time_summary, _trace
 from pytorch_pfn_extras.runtime import runtime_registry
 
 if TYPE_CHECKING:
@@ -64,6 +65,11 @@ def record(
     runtime_cls = runtime_registry.get_runtime_class_for_device_spec(device)
     runtime_tracer = runtime_cls.trace
 
+    recorder = _trace._active_recorder
+    if recorder is not None:
+        begin = time.perf_counter_ns()
+        if use_cuda:
+            begin_event = recorder.cuda_event()
     if use_cuda:
         torch.cuda.nvtx.range_push(tag)  # type: ignore[no-untyped-call]
     try:
@@ -74,6 +80,10 @@ def record(
     finally:
         if use_cuda:
             torch.cuda.nvtx.range_pop()  # type: ignore[no-untyped-call]
+        if recorder is not None:
+            recorder.add(tag, begin, time.perf_counter_ns())
+            if use_cuda:
+                recorder.add_cuda(tag, begin_event, recorder.cuda_event())
 
 
 _T = TypeVar("_T")
@@ -0,0 +1,125 @@
+import math
+from typing import Any, Dict, List, Sequence, Tuple, Union
+
+import numpy
+
+
+class QuantileSketch:
+    """Streaming quantile sketch with a bounded relative error.
+
+    Values are counted in buckets whose bounds grow geometrically, so that
+    any quantile is estimated within ``relative_accuracy`` of a value in
+    the stream. Memory is bounded by ``max_buckets`` regardless of the
+    number of values, and sketches with the same accuracy can be merged.
+
+    Args:
+        relative_accuracy: Maximum relative error of the quantiles.
+        max_buckets: Maximum number of buckets. When exceeded, the buckets
+            of the smallest values are merged, losing accuracy in the
+            lowest quantiles first.
+    """
+
+    def __init__(
+        self, relative_accuracy: float = 0.01, max_buckets: int = 2048
+    ) -> None:
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be in (0, 1)")
+        if max_buckets < 1:
+            raise ValueError("max_buckets must be a positive number")
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self._buckets: Dict[int, int] = {}
+        self._zero_count = 0
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float, count: int = 1) -> None:
+        """Adds ``count`` occurrences of ``value``."""
+        if value > 0:
+            i = math.ceil(math.log(value) / self._log_gamma)
+            self._buckets[i] = self._buckets.get(i, 0) + count
+            if len(self._buckets) > self.max_buckets:
+                self._collapse()
+        else:
+            self._zero_count += count
+        self.count += count
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def add_values(
+        self, values: Union[Sequence[float], "numpy.ndarray[Any, Any]"]
+    ) -> None:
+        """Adds several values at once."""
+        array = numpy.asarray(values, dtype=numpy.float64)
+        if array.size == 0:
+            return
+        positive = array[array > 0]
+        if positive.size:
+            indices, counts = numpy.unique(
+                numpy.ceil(numpy.log(positive) / self._log_gamma),
+                return_counts=True,
+            )
+            for i, c in zip(indices.astype(int).tolist(), counts.tolist()):
+                self._buckets[i] = self._buckets.get(i, 0) + c
+            if len(self._buckets) > self.max_buckets:
+                self._collapse()
+        self._zero_count += array.size - positive.size
+        self.count += array.size
+        self.min = min(self.min, float(array.min()))
+        self.max = max(self.max, float(array.max()))
+
+    def merge(self, other: "QuantileSketch") -> None:
+        """Adds the values counted in another sketch."""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Sketches with different accuracy cannot merge")
+        for i, c in other._buckets.items():
+            self._buckets[i] = self._buckets.get(i, 0) + c
+        if len(self._buckets) > self.max_buckets:
+            self._collapse()
+        self._zero_count += other._zero_count
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def _collapse(self) -> None:
+        indices = sorted(self._buckets)
+        n_merged = len(indices) - self.max_buckets
+        merged = sum(self._buckets.pop(i) for i in indices[:n_merged])
+        target = indices[n_merged]
+        self._buckets[target] += merged
+
+    def quantile(self, q: float) -> float:
+        """Returns the estimated ``q``-quantile, ``q`` being in [0, 1]."""
+        if not 0 <= q <= 1:
+            raise ValueError("q must be in [0, 1]")
+        if self.count == 0:
+            return math.nan
+        if q == 1:
+            return self.max
+        rank = q * (self.count - 1)
+        cumulative = self._zero_count
+        value = 0.0
+        if cumulative <= rank:
+            for i in sorted(self._buckets):
+                cumulative += self._buckets[i]
+                if cumulative > rank:
+                    value = 2 * self._gamma**i / (self._gamma + 1)
+                    break
+        return min(max(value, self.min), self.max)
+
+    def histogram(self) -> List[Tuple[float, float, int]]:
+        """Returns the ``(lower, upper, count)`` bounds and count of the
+        non-empty buckets in increasing order."""
+        hist = []
+        if self._zero_count:
+            hist.append((0.0, 0.0, self._zero_count))
+        for i in sorted(self._buckets):
+            hist.append(
+                (self._gamma ** (i - 1), self._gamma**i, self._buckets[i])
+            )
+        return hist
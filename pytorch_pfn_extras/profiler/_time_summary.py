@@ -1,4 +1,6 @@
+import array
 import atexit
+import copy
 import multiprocessing as mp
 import os
 import queue
@@ -6,9 +8,11 @@ import threading
 import time
 import weakref
 from contextlib import contextmanager
-from typing import Callable, Dict, Generator, Optional, Tuple
+from typing import Callable, Dict, Generator, List, Optional, Sequence, Tuple
 
+import numpy
 import torch
+from pytorch_pfn_extras.profiler._sketch import QuantileSketch
 from pytorch_pfn_extras.reporting import DictSummary
 
 Events = Tuple[torch.cuda.Event, torch.cuda.Event]
@@ -196,6 +200,67 @@ class _CUDAWorker:
             return self._events.get()
 
 
+# Incremented in the child processes after `fork` so that the per-thread
+# buffers inherited from the parent process are not used there
+_fork_generation = 0
+
+
+def _after_fork_in_child() -> None:
+    global _fork_generation
+    _fork_generation += 1
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+class _RingBuffer:
+    """Preallocated buffer of times reported from a single thread.
+
+    The owner thread appends with :meth:`put` and a consumer holding the
+    summary lock takes the values with :meth:`drain`. Each index is only
+    written by one side, so no lock is needed between them.
+    """
+
+    __slots__ = ("_capacity", "_names", "_values", "_head", "_tail", "thread")
+
+    def __init__(self, capacity: int) -> None:
+        self._capacity = capacity
+        self._names: List[str] = [""] * capacity
+        self._values = array.array("d", bytes(8 * capacity))
+        self._head = 0  # Written by the owner thread
+        self._tail = 0  # Written by the consumer
+        self.thread = threading.current_thread()
+
+    def put(self, name: str, value: float) -> bool:
+        head = self._head
+        if head - self._tail == self._capacity:
+            return False
+        i = head % self._capacity
+        self._names[i] = name
+        self._values[i] = value
+        self._head = head + 1
+        return True
+
+    def drain(self, values: Dict[str, List[float]]) -> None:
+        """Moves the buffered values to lists keyed by name."""
+        head, tail, capacity = self._head, self._tail, self._capacity
+        begin, end = tail % capacity, head % capacity
+        if head - tail == capacity or (head != tail and end <= begin):
+            # The values wrap around the end of the buffer
+            ranges = [(begin, capacity), (0, end)]
+        else:
+            ranges = [(begin, end)]
+        for b, e in ranges:
+            for name, value in zip(self._names[b:e], self._values[b:e]):
+                name_values = values.get(name)
+                if name_values is None:
+                    values[name] = [value]
+                else:
+                    name_values.append(value)
+        self._tail = head
+
+
 class _Finalizer:
     def __init__(self, ts: "TimeSummary") -> None:
         self._ts = weakref.ref(ts)
@@ -217,14 +282,28 @@ class TimeSummary:
             reported time info until they are summarized.
         auto_init (bool): Whether to automatically call `initialize()`
             when the instance is created.
+        buffer_size (int): Number of CPU times each thread keeps before
+            they are summarized. Times reported in the process that
+            created the instance are appended to a buffer of the reporting
+            thread and summarized when the summary is read, while times
+            reported from other processes go through a queue.
     """
 
     def __init__(
-        self, *, max_queue_size: int = 1000, auto_init: bool = True
+        self,
+        *,
+        max_queue_size: int = 1000,
+        auto_init: bool = True,
+        buffer_size: int = 4096,
     ) -> None:
         self._summary_lock = threading.Lock()
         self._summary = DictSummary()
         self._additional_stats: Dict[str, float] = {}
+        self._buffer_size = buffer_size
+        self._local = threading.local()
+        self._fork_generation = _fork_generation
+        self._buffers: List[_RingBuffer] = []
+        self._sketches: Dict[str, QuantileSketch] = {}
 
         self._cpu_worker = _CPUWorker(self._add_from_worker, max_queue_size)
         self._cuda_worker: Optional[_CUDAWorker] = None
@@ -285,6 +364,65 @@ class TimeSummary:
             self._additional_stats[f"{name}.min"] = min(value, min_value)
             max_value = self._additional_stats.get(f"{name}.max", value)
             self._additional_stats[f"{name}.max"] = max(value, max_value)
+            self._sketch_for(name).add(value)
+
+    def _sketch_for(self, name: str) -> QuantileSketch:
+        # Must be called with `_summary_lock` held
+        sketch = self._sketches.get(name)
+        if sketch is None:
+            sketch = self._sketches[name] = QuantileSketch()
+        return sketch
+
+    def sketch(self, name: str) -> Optional[QuantileSketch]:
+        """Returns a copy of the quantile sketch of the times of a tag.
+
+        The sketch gives the percentiles and the histogram of the times
+        reported since the summary was last cleared.
+        """
+        with self.summary():
+            return copy.deepcopy(self._sketches.get(name))
+
+    def _drain_buffers(self) -> None:
+        # Must be called with `_summary_lock` held
+        # Threads finished before draining will not add more values
+        finished = [b for b in self._buffers if not b.thread.is_alive()]
+        values: Dict[str, List[float]] = {}
+        for buffer in self._buffers:
+            buffer.drain(values)
+        for name, name_values in values.items():
+            array = numpy.asarray(name_values, dtype=numpy.float64)
+            summary = self._summary._summaries[name]
+            summary._x += float(array.sum())
+            summary._x2 += float(numpy.dot(array, array))
+            summary._n += array.size
+            min_value = float(array.min())
+            self._additional_stats[f"{name}.min"] = min(
+                min_value,
+                self._additional_stats.get(f"{name}.min", min_value),
+            )
+            max_value = float(array.max())
+            self._additional_stats[f"{name}.max"] = max(
+                max_value,
+                self._additional_stats.get(f"{name}.max", max_value),
+            )
+            self._sketch_for(name).add_values(array)
+        self._buffers = [b for b in self._buffers if b not in finished]
+
+    def _put(self, name: str, value: float) -> None:
+        if _fork_generation != self._fork_generation:
+            # Forked processes report to the main one through the queue
+            self._cpu_worker.put(name, value)
+            return
+        buffer: Optional[_RingBuffer] = getattr(self._local, "buffer", None)
+        if buffer is None:
+            buffer = _RingBuffer(self._buffer_size)
+            self._local.buffer = buffer
+            with self._summary_lock:
+                self._buffers.append(buffer)
+        if not buffer.put(name, value):
+            with self._summary_lock:
+                self._drain_buffers()
+            buffer.put(name, value)
 
     def add(self, name: str, value: float) -> None:
         self._add_from_worker(name, value)
@@ -293,15 +431,40 @@ class TimeSummary:
     def summary(
         self,
         clear: bool = False,
+        percentiles: Sequence[float] = (),
     ) -> Generator[Tuple[DictSummary, Dict[str, float]], None, None]:
+        """Context manager to access the summarized times.
+
+        Args:
+            clear (bool): Whether to reset the summary after it is used.
+            percentiles (sequence of floats): Percentiles (between 0 and
+                100) of the times to add to the additional statistics,
+                e.g., ``foo.p99`` for the 99th percentile of ``foo``.
+                They are estimated by a streaming sketch within 1% of
+                relative error.
+
+        Yields:
+            A tuple of the :class:`~pytorch_pfn_extras.reporting.DictSummary`
+            of the times and a dictionary of additional statistics.
+        """
         self.initialize()
         try:
             with self._summary_lock:
-                yield self._summary, self._additional_stats
+                self._drain_buffers()
+                additional_stats = self._additional_stats
+                if percentiles:
+                    additional_stats = dict(additional_stats)
+                    for name, sketch in self._sketches.items():
+                        for p in percentiles:
+                            additional_stats[
+                                f"{name}.p{p:g}"
+                            ] = sketch.quantile(p / 100)
+                yield self._summary, additional_stats
         finally:
             if clear:
                 self._summary = DictSummary()
                 self._additional_stats = {}
+                self._sketches = {}
 
     def complete_report(
         self,
@@ -311,8 +474,7 @@ class TimeSummary:
         begin: float,
     ) -> None:
         end = time.time()
-        assert self._cpu_worker._queue is not None
-        self._cpu_worker._queue.put((tag, end - begin))
+        self._put(tag, end - begin)
         if use_cuda:
             assert self._cuda_worker is not None
             assert self._cuda_worker._queue is not None
@@ -0,0 +1,178 @@
+import collections
+import json
+import os
+import threading
+import time
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import torch
+
+# The recorder receiving the regions of `ppe.profiler.record`
+_active_recorder: Optional["TraceRecorder"] = None
+
+_CUDA_TID_BASE = 1 << 20
+
+
+class _ChromeTraceSaveFunc:
+    def __call__(self, target: Dict[str, Any], file_o: Any) -> None:
+        file_o.write(json.dumps(target).encode("utf-8"))
+
+
+class TraceRecorder:
+    """Records a timeline of the regions of :func:`record`.
+
+    While the recorder is active (see :meth:`start` or use it as a context
+    manager), the begin and end times of every region reported with
+    :func:`~pytorch_pfn_extras.profiler.record`,
+    :func:`~pytorch_pfn_extras.profiler.record_function` and
+    :func:`~pytorch_pfn_extras.profiler.record_iterable` are kept in
+    memory, and :meth:`flush` writes them as a Chrome trace that can be
+    opened in ``chrome://tracing`` or Perfetto. Regions recorded with
+    ``use_cuda=True`` also get the time spent in the CUDA device.
+
+    Args:
+        max_events (int): Maximum number of regions kept. When exceeded,
+            the oldest regions are discarded.
+    """
+
+    def __init__(self, max_events: int = 100000) -> None:
+        self._events: Deque[Tuple[str, int, int, int]] = collections.deque(
+            maxlen=max_events
+        )
+        self._cuda_events: Deque[
+            Tuple[str, torch.cuda.Event, torch.cuda.Event]
+        ] = collections.deque(maxlen=max_events)
+        self._cuda_origin: Optional[Tuple[torch.cuda.Event, int]] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """Starts recording the regions of this process."""
+        global _active_recorder
+        _active_recorder = self
+
+    def stop(self) -> None:
+        """Stops recording the regions."""
+        global _active_recorder
+        if _active_recorder is self:
+            _active_recorder = None
+
+    def __enter__(self) -> "TraceRecorder":
+        self.start()
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.stop()
+
+    def add(self, name: str, begin_ns: int, end_ns: int) -> None:
+        """Adds a region of the current thread.
+
+        Args:
+            name (str): Name of the region.
+            begin_ns (int): Begin time given by ``time.perf_counter_ns()``.
+            end_ns (int): End time given by ``time.perf_counter_ns()``.
+        """
+        self._events.append((name, begin_ns, end_ns, threading.get_ident()))
+
+    def cuda_event(self) -> torch.cuda.Event:
+        """Returns a CUDA event recorded in the current stream."""
+        if self._cuda_origin is None:
+            with self._lock:
+                if self._cuda_origin is None:
+                    # Align the device clock with the host one
+                    origin = torch.cuda.Event(  # type: ignore[no-untyped-call]
+                        enable_timing=True
+                    )
+                    torch.cuda.synchronize()  # type: ignore[no-untyped-call]
+                    origin.record()  # type: ignore[no-untyped-call]
+                    origin.synchronize()  # type: ignore[no-untyped-call]
+                    self._cuda_origin = (origin, time.perf_counter_ns())
+        event = torch.cuda.Event(enable_timing=True)  # type: ignore[no-untyped-call]
+        event.record()  # type: ignore[no-untyped-call]
+        return event
+
+    def add_cuda(
+        self, name: str, begin: torch.cuda.Event, end: torch.cuda.Event
+    ) -> None:
+        """Adds a region measured in the device with :meth:`cuda_event`."""
+        self._cuda_events.append((name, begin, end))
+
+    def to_chrome_trace(self, clear: bool = True) -> Dict[str, Any]:
+        """Returns the recorded regions in the Chrome trace format.
+
+        Args:
+            clear (bool): Whether to discard the returned regions.
+        """
+        with self._lock:
+            events = list(self._events)
+            cuda_events = list(self._cuda_events)
+            if clear:
+                self._events.clear()
+                self._cuda_events.clear()
+        pid = os.getpid()
+        trace: List[Dict[str, Any]] = [
+            {
+                "name": name,
+                "ph": "X",
+                "cat": "cpu",
+                "ts": begin / 1000,
+                "dur": (end - begin) / 1000,
+                "pid": pid,
+                "tid": tid,
+            }
+            for name, begin, end, tid in events
+        ]
+        devices = set()
+        for name, begin_event, end_event in cuda_events:
+            assert self._cuda_origin is not None
+            origin, origin_ns = self._cuda_origin
+            end_event.synchronize()  # type: ignore[no-untyped-call]
+            # Elapsed times are given in milliseconds
+            begin_us = origin_ns / 1000 + origin.elapsed_time(begin_event) * 1000  # type: ignore[no-untyped-call]
+            dur_us = begin_event.elapsed_time(end_event) * 1000  # type: ignore[no-untyped-call]
+            device = begin_event.device.index  # type: ignore[attr-defined]
+            devices.add(device)
+            trace.append(
+                {
+                    "name": name,
+                    "ph": "X",
+                    "cat": "cuda",
+                    "ts": begin_us,
+                    "dur": dur_us,
+                    "pid": pid,
+                    "tid": _CUDA_TID_BASE + device,
+                }
+            )
+        for device in sorted(devices):
+            trace.append(
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": pid,
+                    "tid": _CUDA_TID_BASE + device,
+                    "args": {"name": f"cuda:{device}"},
+                }
+            )
+        return {"traceEvents": trace, "displayTimeUnit": "ms"}
+
+    def flush(
+        self, writer: Any, filename: str = "trace.json", clear: bool = True
+    ) -> None:
+        """Writes the recorded regions as a Chrome trace JSON file.
+
+        Args:
+            writer: A writer in :mod:`pytorch_pfn_extras.writing`, the file
+                is written in its output directory.
+            filename (str): Name of the file.
+            clear (bool): Whether to discard the written regions.
+        """
+        writer(
+            filename,
+            writer.out_dir,
+            self.to_chrome_trace(clear),
+            savefun=_ChromeTraceSaveFunc(),
+        )
+
+
+def get_trace_recorder() -> Optional[TraceRecorder]:
+    """Returns the active :class:`TraceRecorder` if any."""
+    return _active_recorder
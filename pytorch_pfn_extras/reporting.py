@@ -456,6 +456,62 @@ class DictSummary:
 
         return stats
 
+    def keys(self) -> List[str]:
+        """Returns the sorted names of the entries in the summary."""
+        return sorted(self._summaries.keys())
+
+    def to_tensor(
+        self,
+        keys: Optional[Sequence[str]] = None,
+        device: Optional[torch.device] = None,
+    ) -> torch.Tensor:
+        """Packs the statistics into a tensor.
+
+        The packed form can be summed element-wise to combine summaries,
+        e.g., with a single ``torch.distributed.all_reduce``.
+
+        Args:
+            keys: Names of the entries to pack. Entries not in the summary
+                are filled with zeros. Defaults to :meth:`keys`.
+            device: Device of the returned tensor.
+
+        Returns:
+            A ``float64`` tensor of shape ``(len(keys), 3)`` whose rows hold
+            the weighted sum, the weighted sum of squares and the total
+            weight of each entry.
+
+        """
+        if keys is None:
+            keys = self.keys()
+        rows = []
+        for key in keys:
+            if key in self._summaries:
+                summ = self._summaries[key]
+                summ._add_deferred_values()
+                rows.append([float(summ._x), float(summ._x2), float(summ._n)])
+            else:
+                rows.append([0.0, 0.0, 0.0])
+        return torch.tensor(rows, dtype=torch.float64, device=device).reshape(
+            len(keys), 3
+        )
+
+    @classmethod
+    def from_tensor(
+        cls, keys: Sequence[str], tensor: torch.Tensor
+    ) -> "DictSummary":
+        """Creates a summary from the packed form made by :meth:`to_tensor`.
+
+        Args:
+            keys: Names of the entries given to :meth:`to_tensor`.
+            tensor: The packed statistics.
+
+        """
+        ds = cls()
+        for key, (x, x2, n) in zip(keys, tensor.tolist()):
+            summ = ds._summaries[key]
+            summ._x, summ._x2, summ._n = x, x2, n
+        return ds
+
     def state_dict(self) -> Dict[str, Any]:
         return {
             name: summ.state_dict() for name, summ in self._summaries.items()
@@ -14,7 +14,7 @@ from typing import (
 
 import torch
 import torch.distributed
-from pytorch_pfn_extras import reporting
+from pytorch_pfn_extras import distributed, reporting
 from pytorch_pfn_extras.training.extensions import evaluator
 from pytorch_pfn_extras.training.metrics import Batch as DictBatch
 
@@ -176,15 +176,22 @@ class DistributedEvaluator(Evaluator):
         *,
         progress_bar: bool = False,
         metrics: Optional[Sequence["MetricType"]] = None,
+        hierarchical: Union[bool, distributed.HierarchicalGroups] = False,
     ):
         super().__init__(
             handler, models, progress_bar=progress_bar, metrics=metrics
         )
         if not torch.distributed.is_initialized():  # type: ignore[no-untyped-call]
             raise RuntimeError("PyTorch distributed module is not initialized.")
+        self._hierarchical_groups: Optional[distributed.HierarchicalGroups]
+        if isinstance(hierarchical, distributed.HierarchicalGroups):
+            self._hierarchical_groups = hierarchical
+        elif hierarchical:
+            self._hierarchical_groups = distributed.HierarchicalGroups()
+        else:
+            self._hierarchical_groups = None
 
     def _gather_summaries(self) -> None:
-        world_size = torch.distributed.get_world_size()  # type: ignore[no-untyped-call]
-        summaries = [reporting.DictSummary() for _ in range(world_size)]
-        torch.distributed.all_gather_object(summaries, self._summary)  # type: ignore[no-untyped-call]
-        self._summary = sum(summaries, reporting.DictSummary())
+        self._summary = evaluator._dist_all_reduce_summary(
+            self._summary, self._hierarchical_groups
+        )
@@ -88,3 +88,22 @@ class StateObjectProtocol(Protocol):
 
     def load_state_dict(self, state_dict: Dict[str, Any]) -> None:
         ...
+
+
+@runtime_checkable
+class ResumableSamplerProtocol(Protocol):
+    """A sampler (or loader) that can resume in the middle of an epoch.
+
+    :class:`~pytorch_pfn_extras.training.Trainer` calls :meth:`set_epoch`
+    at the beginning of every epoch, and then :meth:`set_start`
+    when resuming from a snapshot taken in the middle of an epoch, so
+    that the next iteration continues from the first unseen element
+    instead of replaying (or iterating through) the consumed ones.
+    """
+
+    def set_epoch(self, epoch: int) -> None:
+        ...
+
+    def set_start(self, start: int) -> None:
+        """Skips the first ``start`` elements of the next iteration."""
+        ...
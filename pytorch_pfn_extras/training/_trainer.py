@@ -24,6 +24,7 @@ from pytorch_pfn_extras.training import extension as extension
 from pytorch_pfn_extras.training import trigger as trigger_module
 from pytorch_pfn_extras.training._manager_protocol import (
     ExtensionsManagerProtocol,
+    ResumableSamplerProtocol,
 )
 from pytorch_pfn_extras.training.trigger import Trigger, TriggerLike
 
@@ -194,6 +195,43 @@ class Trainer:
     ) -> None:
         self.manager.optimizers[name] = optimizer  # type: ignore[index]
 
+    def _resumable_sampler(
+        self, loader: Iterable[Any]
+    ) -> Tuple[Optional[ResumableSamplerProtocol], int]:
+        # Returns the sampler of the loader and the number of its elements
+        # in a batch.
+        if isinstance(loader, ResumableSamplerProtocol):
+            return loader, 1
+        if isinstance(loader, torch.utils.data.DataLoader):
+            batch_sampler: Any = loader.batch_sampler
+            if isinstance(batch_sampler, ResumableSamplerProtocol):
+                return batch_sampler, 1
+            if loader.batch_size is not None and isinstance(
+                loader.sampler, ResumableSamplerProtocol
+            ):
+                return loader.sampler, loader.batch_size
+        return None, 1
+
+    def _start_data_iterator(self, loader: Iterable[Any], resume: bool) -> int:
+        # Sets the epoch of the sampler, and returns the number of batches
+        # already consumed in this epoch if the loader can restart right
+        # after them.
+        sampler, batch_size = self._resumable_sampler(loader)
+        if sampler is None:
+            return 0
+        # So that the sampler shuffles differently in every epoch
+        sampler.set_epoch(self.epoch)
+        state = self.manager._data_iterator_state
+        if (
+            not resume
+            or state is None
+            or state["epoch"] != self.epoch
+            or not 0 < state["iteration"] < self.manager._iters_per_epoch
+        ):
+            return 0
+        sampler.set_start(state["iteration"] * batch_size)
+        return state["iteration"]
+
     def is_epoch_last_iter(self, idx: int) -> bool:
         return (idx + 1) == (self.manager._iters_per_epoch)
 
@@ -304,9 +342,12 @@ class Trainer:
                 for _, (evaluator, _) in self._evaluators.items():
                     evaluator.handler.eval_setup(evaluator, val_loader)
 
+        resume = True
         with self._profile or _nullcontext() as prof:
             while not self.manager.stop_trigger:
                 self.handler.train_epoch_begin(self, train_loader)
+                start_idx = self._start_data_iterator(train_loader, resume)
+                resume = False
 
                 # When iterations are completed in the callback
                 # This is needed to avoid being constantly passing parameters
@@ -322,7 +363,7 @@ class Trainer:
                 self._profile_records: "queue.Queue[List[_ReportNotification]]" = (
                     queue.Queue()
                 )
-                for idx in range(train_len):
+                for idx in range(start_idx, train_len):
                     with record(
                         "pytorch_pfn_extras.training.Trainer:iteration",
                         use_cuda=torch.cuda.is_available(),
@@ -345,6 +386,10 @@ class Trainer:
                             ):
                                 x = next(loader_iter)
                         begin = time.time()
+                        self.manager._data_iterator_state = {
+                            "epoch": self.epoch,
+                            "iteration": idx + 1,
+                        }
                         self._idxs.put(idx)
                         self._inputs.put(x)
                         self._times.put(begin)
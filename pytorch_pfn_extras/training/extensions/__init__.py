@@ -37,10 +37,16 @@ from pytorch_pfn_extras.training.extensions.profile_report import (  # NOQA
 from pytorch_pfn_extras.training.extensions.progress_bar import (
     ProgressBar as ProgressBarCLI,  # NOQA
 )
+from pytorch_pfn_extras.training.extensions.sampling_profiler import (  # NOQA
+    SamplingProfiler,
+)
 from pytorch_pfn_extras.training.extensions.slack import (  # NOQA
     Slack,
     SlackWebhook,
 )
+from pytorch_pfn_extras.training.extensions.straggler_report import (  # NOQA
+    StragglerReport,
+)
 from pytorch_pfn_extras.training.extensions.value_observation import (  # NOQA
     observe_lr,
     observe_value,
@@ -1,6 +1,6 @@
 import os
 import types
-from typing import Any, Generator, List, Optional, Tuple
+from typing import Any, Dict, Generator, List, Optional, Tuple
 
 import torch
 import torch.distributed
@@ -9,12 +9,17 @@ from pytorch_pfn_extras.training import extension
 from pytorch_pfn_extras.training._manager_protocol import (
     ExtensionsManagerProtocol,
 )
+from pytorch_pfn_extras.writing._compression import _GZIP_MAGIC, load_compressed
+from pytorch_pfn_extras.writing._sharded_writer import (
+    _is_sharded,
+    _restore_sharded,
+)
 
 logger = logging._get_root_logger()
 
 
 def _find_snapshot_files(
-    fmt: str, path: str, fs: Any
+    fmt: str, path: str, fs: Any, manifest: Optional[Dict[str, float]] = None
 ) -> List[Tuple[float, str]]:
     """Only prefix and suffix match
 
@@ -29,6 +34,9 @@ def _find_snapshot_files(
             only examined. Also, files' staleness is judged
             by timestamps. The default is metime.
         path (str): a directory path to search for snapshot files.
+        manifest (dict): files recorded by the writer with their mtime, in
+            the order they were recorded. If given, the files are looked up
+            in it instead of listing ``path``.
 
     Returns:
         A sorted list of pair of ``mtime, filename``, whose file
@@ -38,6 +46,17 @@ def _find_snapshot_files(
     prefix = fmt.split("{")[0]
     suffix = fmt.split("}")[-1]
 
+    if manifest is not None:
+        # The order of recording breaks mtime ties
+        return sorted(
+            (
+                (t, file)
+                for file, t in manifest.items()
+                if file.startswith(prefix) and file.endswith(suffix)
+            ),
+            key=lambda entry: entry[0],
+        )
+
     matched_files = (
         file
         for file in fs.list(path)
@@ -51,7 +70,9 @@ def _find_snapshot_files(
     return sorted(_prepend_mtime(file) for file in matched_files)
 
 
-def _find_latest_snapshot(fmt: str, path: str, fs: Any) -> Optional[str]:
+def _find_latest_snapshot(
+    fmt: str, path: str, fs: Any, manifest: Optional[Dict[str, float]] = None
+) -> Optional[str]:
     """Finds the latest snapshots in a directory
 
     Args:
@@ -60,6 +81,8 @@ def _find_latest_snapshot(fmt: str, path: str, fs: Any) -> Optional[str]:
             only examined. Also, files' staleness is judged
             by timestamps. The default is metime.
         path (str): a directory path to search for snapshot files.
+        manifest (dict): files recorded by the writer with their mtime. The
+            directory is listed if the latest file in it does not exist.
 
     Returns:
         Latest snapshot file, in terms of a file that has newest
@@ -67,16 +90,23 @@ def _find_latest_snapshot(fmt: str, path: str, fs: Any) -> Optional[str]:
         ``path``. If no such file found, it returns ``None``.
 
     """
-    snapshot_files = _find_snapshot_files(fmt, path, fs)
+    snapshot_files = _find_snapshot_files(fmt, path, fs, manifest)
     logger.debug("found snapshot files {}".format(snapshot_files))
     if len(snapshot_files) > 0:
         _, filename = snapshot_files[-1]
+        if manifest is not None and not fs.exists(os.path.join(path, filename)):
+            # The manifest is inconsistent with the directory
+            return _find_latest_snapshot(fmt, path, fs)
         return filename
     return None
 
 
 def _find_stale_snapshots(
-    fmt: str, path: str, n_retains: int, fs: Any
+    fmt: str,
+    path: str,
+    n_retains: int,
+    fs: Any,
+    manifest: Optional[Dict[str, float]] = None,
 ) -> Generator[str, None, None]:
     """Finds stale snapshots in a directory, retaining several files
 
@@ -89,6 +119,7 @@ def _find_stale_snapshots(
         n_retains (int): Number of snapshot files to retain
             through the cleanup. Must be a positive integer for any cleanup to
             take place.
+        manifest (dict): files recorded by the writer with their mtime.
 
     Returns:
         Generator that yields stale files that matches format
@@ -96,7 +127,7 @@ def _find_stale_snapshots(
         excluding newest ``n_retains`` files.
 
     """
-    snapshot_files = _find_snapshot_files(fmt, path, fs)
+    snapshot_files = _find_snapshot_files(fmt, path, fs, manifest)
     num_remove = len(snapshot_files) - n_retains
     if num_remove > 0:
         for _, filename in snapshot_files[:num_remove]:
@@ -104,6 +135,33 @@ def _find_stale_snapshots(
     return
 
 
+def _load_snapshot(fs: Any, path: str) -> Any:
+    with fs.open(path, "rb") as snapshot_file:
+        compressed = snapshot_file.read(len(_GZIP_MAGIC)) == _GZIP_MAGIC
+        snapshot_file.seek(0)
+        if compressed:
+            # Written with `CompressedSaveFunc`
+            state = load_compressed(
+                snapshot_file, map_location=torch.device("cpu")
+            )
+        else:
+            state = torch.load(
+                snapshot_file,  # type: ignore[no-untyped-call]
+                map_location=torch.device("cpu"),
+            )
+    if _is_sharded(state):
+        # The index of a snapshot written by `ShardedWriter`
+        state = _restore_sharded(state, os.path.dirname(path), fs, 8, None)
+    return state
+
+
+def _read_manifest(writer: Any, fmt: str) -> Optional[Dict[str, float]]:
+    # Writers other than the built-in ones do not maintain a manifest
+    if not hasattr(writer, "_read_manifest"):
+        return None
+    return writer._read_manifest(fmt)  # type: ignore[no-any-return]
+
+
 def snapshot_object(
     target: Any, filename: str, savefun: Any = None, **kwargs: Any
 ) -> "_Snapshot":
@@ -362,6 +420,16 @@ class _Snapshot(extension.Extension):
         self.writer = writer
         loaded_fn = None
         assert writer is not None
+        if (
+            hasattr(writer, "_track_snapshots")
+            and isinstance(self.filename, str)
+            and "{" in self.filename
+            and (self.autoload or self.n_retains > 0)
+        ):
+            # The manifest is used to find the latest and the stale
+            # snapshots without listing the directory. A snapshot with a
+            # fixed file name is just overwritten
+            writer._track_snapshots(self.filename)
         if self.autoload:
             # If ``autoload`` is on, this code scans the ``writer.out_dir``
             # for potential snapshot files by matching the file names
@@ -369,27 +437,25 @@ class _Snapshot(extension.Extension):
             # terms of mtime, and tries to load it it the target or
             # manager.
             loaded_fn = _find_latest_snapshot(
-                self.filename, writer.out_dir, writer.fs
+                self.filename,
+                writer.out_dir,
+                writer.fs,
+                _read_manifest(writer, self.filename),
             )
             if loaded_fn:
-                snapshot_file = writer.fs.open(
-                    os.path.join(writer.out_dir, loaded_fn), "rb"
-                )
                 # As described above (at ``autoload`` option),
                 # snapshot files to be autoloaded must be saved by
                 # ``save_npz`` . In order to support general format,
                 # we nned to first reconstruct the design of savefun
                 # and loadfun.
-                state = torch.load(
-                    snapshot_file,  # type: ignore[no-untyped-call]
-                    map_location=torch.device("cpu"),
+                state = _load_snapshot(
+                    writer.fs, os.path.join(writer.out_dir, loaded_fn)
                 )
                 if type(target) is dict:
                     for k in target:
                         target[k].load_state_dict(state[k])
                 else:
                     target.load_state_dict(state)
-                snapshot_file.close()
 
         self._add_cleanup_hook(writer)
 
@@ -408,11 +474,23 @@ class _Snapshot(extension.Extension):
             # triggered right after creation of new snapshot file, is
             # injected here.
             def _cleanup() -> None:
-                files = _find_stale_snapshots(
-                    self.filename, writer.out_dir, self.n_retains, writer.fs
+                manifest = _read_manifest(writer, self.filename)
+                files = list(
+                    _find_stale_snapshots(
+                        self.filename,
+                        writer.out_dir,
+                        self.n_retains,
+                        writer.fs,
+                        manifest,
+                    )
                 )
                 for file in files:
-                    writer.fs.remove(os.path.join(writer.out_dir, file))
+                    path = os.path.join(writer.out_dir, file)
+                    # Files in the manifest may have been removed since
+                    if manifest is None or writer.fs.exists(path):
+                        writer.fs.remove(path)
+                if manifest is not None and files:
+                    writer._forget_files(files)
 
             writer._add_cleanup_hook(_cleanup)
 
@@ -1,5 +1,6 @@
 import contextlib
 import datetime
+import hashlib
 from typing import (
     TYPE_CHECKING,
     Any,
@@ -9,6 +10,7 @@ from typing import (
     Iterable,
     List,
     Optional,
+    Sequence,
     TextIO,
     Union,
 )
@@ -16,7 +18,7 @@ from typing import (
 import numpy
 import torch
 import torch.distributed
-from pytorch_pfn_extras import reporting
+from pytorch_pfn_extras import distributed, reporting
 from pytorch_pfn_extras.training import extension
 from pytorch_pfn_extras.training._manager_protocol import (
     ExtensionsManagerProtocol,
@@ -261,11 +263,49 @@ class Evaluator(extension.Extension):
         return summary.compute_mean()
 
 
-def _dist_gather(obj: Any) -> List[Any]:
+def _key_signature(keys: Sequence[str]) -> List[float]:
+    digest = hashlib.sha1("\0".join(keys).encode("utf-8")).digest()
+    # Small integers keep the sums of squares exact in float64
+    h1 = int.from_bytes(digest[:4], "little") % (1 << 20)
+    h2 = int.from_bytes(digest[4:8], "little") % (1 << 20)
+    return [float(len(keys)), float(h1), float(h2)]
+
+
+def _dist_all_reduce_summary(
+    summary: reporting.DictSummary,
+    hierarchical_groups: Optional[distributed.HierarchicalGroups] = None,
+) -> reporting.DictSummary:
+    def all_reduce(tensor: torch.Tensor) -> None:
+        if hierarchical_groups is None:
+            torch.distributed.all_reduce(tensor)  # type: ignore[no-untyped-call]
+        else:
+            distributed.hierarchical_all_reduce(tensor, hierarchical_groups)
+
+    device = None
+    if torch.distributed.get_backend() == "nccl":  # type: ignore[no-untyped-call]
+        device = torch.device("cuda", torch.cuda.current_device())
     world_size = torch.distributed.get_world_size()  # type: ignore[no-untyped-call]
-    placeholder = [object() for _ in range(world_size)]
-    torch.distributed.all_gather_object(placeholder, obj)  # type: ignore[no-untyped-call]
-    return placeholder
+
+    # Check that every process has the same keys: the sum of the
+    # signatures and of their squares matches only if all are equal.
+    keys = summary.keys()
+    sig = torch.tensor(_key_signature(keys), dtype=torch.float64)
+    check = torch.cat([sig, sig * sig]).to(device)
+    all_reduce(check)
+    if not torch.equal(check.cpu(), torch.cat([sig, sig * sig]) * world_size):
+        # Fall back to negotiating the union of the keys
+        if hierarchical_groups is None:
+            all_keys: List[Any] = [None] * world_size
+            torch.distributed.all_gather_object(all_keys, keys)  # type: ignore[no-untyped-call]
+        else:
+            all_keys = distributed.hierarchical_all_gather_object(
+                keys, hierarchical_groups
+            )
+        keys = sorted(set(k for ks in all_keys for k in ks))
+
+    packed = summary.to_tensor(keys, device=device)
+    all_reduce(packed)
+    return reporting.DictSummary.from_tensor(keys, packed)
 
 
 class DistributedEvaluator(Evaluator):
@@ -282,7 +322,7 @@ class DistributedEvaluator(Evaluator):
     This extension basically behaves similarly to :class:`~Evaluator`,
     but adds an aggregation step in :func:`Evaluator.evaluate`.
     A summary of evaluation (:class:`~DictSummary`) in each worker process
-    is collected in "all-gather" manner and then accumulated.
+    is packed into a tensor and accumulated with "all-reduce".
     Therefore all the worker processes must attend the evaluation,
     i.e., make sure all the processes have a :class:`~Evaluator` extension object
     configured in the :class:`~ExtensionManager` with the same trigger.
@@ -296,6 +336,11 @@ class DistributedEvaluator(Evaluator):
     For evaluation purpose it distorts the evaluation result,
     hence it is recommended to use :class:`~DistributedValidationSampler` instead.
 
+    Passing ``hierarchical=True`` (or a
+    :class:`~pytorch_pfn_extras.distributed.HierarchicalGroups` object) gathers
+    the summaries inside each node first and exchanges them only among
+    the node leaders, which reduces the inter-node traffic.
+
     """
 
     def __init__(
@@ -320,12 +365,21 @@ class DistributedEvaluator(Evaluator):
             rank = torch.distributed.get_rank()  # type: ignore[no-untyped-call]
             kwargs["progress_bar"] &= rank == 0
 
+        hierarchical = kwargs.pop("hierarchical", False)
+        self._hierarchical_groups: Optional[distributed.HierarchicalGroups]
+        if isinstance(hierarchical, distributed.HierarchicalGroups):
+            self._hierarchical_groups = hierarchical
+        elif hierarchical:
+            self._hierarchical_groups = distributed.HierarchicalGroups()
+        else:
+            self._hierarchical_groups = None
+
         super().__init__(iterator, target, eval_hook, eval_func, **kwargs)
 
     def _gather_summaries(
         self, summary: reporting.DictSummary
     ) -> reporting.DictSummary:
-        return sum(_dist_gather(summary), reporting.DictSummary())
+        return _dist_all_reduce_summary(summary, self._hierarchical_groups)
 
 
 @contextlib.contextmanager
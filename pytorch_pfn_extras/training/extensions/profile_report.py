@@ -1,6 +1,6 @@
 import json
 from collections import OrderedDict
-from typing import Any, Dict, Iterable, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Sequence
 
 from pytorch_pfn_extras import reporting
 from pytorch_pfn_extras.profiler._time_summary import get_time_summary
@@ -33,6 +33,10 @@ class ProfileReport(extension.Extension):
             does not output the log to any file.
         append (bool, optionsl): If the file is JSON Lines or YAML, contents
             will be appended instead of rewriting the file every call.
+        percentiles (sequence of floats): Percentiles (between 0 and 100) of
+            the times to write, e.g., ``iter-time.p99`` for the 99th
+            percentile of ``iter-time``. No percentiles are written by
+            default.
         format (str, optional): accepted values are `'json'`, `'json-lines'`
             and `'yaml'`.
         writer (writer object, optional): must be callable.
@@ -55,6 +59,7 @@ class ProfileReport(extension.Extension):
         filename: Optional[str] = None,
         append: bool = False,
         format: Optional[str] = None,
+        percentiles: Sequence[float] = (),
         **kwargs: Any,
     ):
         self.time_summary = get_time_summary()
@@ -67,7 +72,11 @@ class ProfileReport(extension.Extension):
             self._store_keys = list(store_keys) + [
                 key + ".std" for key in store_keys
             ]
+            self._store_keys += [
+                f"{key}.p{p:g}" for key in store_keys for p in percentiles
+            ]
         self._report_keys = report_keys
+        self._percentiles = tuple(percentiles)
         self._trigger = trigger_module.get_trigger(trigger)
         self._log: List[Any] = []
 
@@ -91,7 +100,9 @@ class ProfileReport(extension.Extension):
 
     def __call__(self, manager: ExtensionsManagerProtocol) -> None:
         if manager.is_before_training or self._trigger(manager):
-            with self.time_summary.summary(clear=True) as s:
+            with self.time_summary.summary(
+                clear=True, percentiles=self._percentiles
+            ) as s:
                 st, additional = s
                 stats = st.make_statistics()
                 stats.update(additional)
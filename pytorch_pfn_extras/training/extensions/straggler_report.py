@@ -0,0 +1,145 @@
+import statistics
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import torch.distributed as dist
+from pytorch_pfn_extras import distributed, reporting
+from pytorch_pfn_extras.profiler._time_summary import get_time_summary
+from pytorch_pfn_extras.training import extension
+from pytorch_pfn_extras.training import trigger as trigger_module
+from pytorch_pfn_extras.training._manager_protocol import (
+    ExtensionsManagerProtocol,
+)
+
+
+class StragglerReport(extension.Extension):
+    """Reports the skew of the profiled times across processes.
+
+    In distributed training, a single slow process stalls every other
+    one at the next synchronization, but the times reported by
+    :class:`~pytorch_pfn_extras.training.extensions.ProfileReport` are
+    local to each process. This extension gathers a compact summary of
+    the times of each tag of
+    :class:`~pytorch_pfn_extras.profiler.TimeSummary` from all the
+    processes and reports, for each tag:
+
+    * ``straggler/<tag>.skew``: ratio of the slowest time to the median
+      time among the processes.
+    * ``straggler/<tag>.slowest_rank``: rank of the slowest process.
+    * ``straggler/<tag>.max`` and ``straggler/<tag>.median``: the slowest
+      and the median time among the processes.
+
+    The times are those reported since the time summary was last cleared,
+    e.g., by ``ProfileReport`` at the same trigger. This extension must be
+    registered in all the processes with the same trigger.
+
+    Args:
+        keys (iterable of strs): Tags to report, e.g.,
+            ``"pytorch_pfn_extras.training.Trainer:get_data"`` or
+            ``"DistributedDataParallel:reduce_gradient"``. By default, all
+            the tags reported in any process are used.
+        trigger: Trigger that decides when to gather the times. If it is a
+            tuple in the form ``<int>, 'epoch'`` or ``<int>, 'iteration'``,
+            it is passed to :class:`IntervalTrigger`.
+        percentile (float, optional): Percentile (between 0 and 100) of the
+            times compared across processes. By default, the mean time is
+            compared.
+        clear (bool): Whether to reset the time summary after gathering, so
+            that every report covers only the last interval. Leave it
+            disabled when ``ProfileReport`` already clears it.
+        hierarchical (bool or HierarchicalGroups): Gathers the times inside
+            each node first, see
+            :func:`~pytorch_pfn_extras.distributed.hierarchical_all_gather_object`.
+    """
+
+    priority = extension.PRIORITY_WRITER
+
+    def __init__(
+        self,
+        keys: Optional[Iterable[str]] = None,
+        trigger: trigger_module.TriggerLike = (1, "epoch"),
+        percentile: Optional[float] = None,
+        clear: bool = False,
+        hierarchical: Union[bool, distributed.HierarchicalGroups] = False,
+    ) -> None:
+        if percentile is not None and not 0 <= percentile <= 100:
+            raise ValueError("percentile must be in [0, 100]")
+        self.time_summary = get_time_summary()
+        # Initializes global TimeSummary.
+        self.time_summary.initialize()
+        self._keys = None if keys is None else list(keys)
+        self._trigger = trigger_module.get_trigger(trigger)
+        self._percentile = percentile
+        self._clear = clear
+        self._hierarchical = hierarchical
+
+    def _local_times(self) -> Dict[str, Tuple[int, float]]:
+        percentiles = () if self._percentile is None else (self._percentile,)
+        with self.time_summary.summary(
+            clear=self._clear, percentiles=percentiles
+        ) as (st, additional):
+            times: Dict[str, Tuple[int, float]] = {}
+            for name, summary in st._summaries.items():
+                if self._keys is not None and name not in self._keys:
+                    continue
+                if summary._n == 0:
+                    continue
+                if self._percentile is None:
+                    value = float(summary._x) / summary._n
+                else:
+                    value = additional[f"{name}.p{self._percentile:g}"]
+                times[name] = (int(summary._n), float(value))
+        return times
+
+    def _gather(self, obj: Any) -> List[Any]:
+        if not dist.is_initialized():  # type: ignore[no-untyped-call]
+            return [obj]
+        if self._hierarchical is True:
+            self._hierarchical = distributed.HierarchicalGroups()
+        if isinstance(self._hierarchical, distributed.HierarchicalGroups):
+            return distributed.hierarchical_all_gather_object(
+                obj, self._hierarchical
+            )
+        gathered: List[Any] = [None] * dist.get_world_size()  # type: ignore[no-untyped-call]
+        dist.all_gather_object(gathered, obj)  # type: ignore[no-untyped-call]
+        return gathered
+
+    def compute(self) -> Dict[str, float]:
+        """Gathers the times of all the processes and computes the skews.
+
+        This is a collective operation that all the processes must call.
+        """
+        all_times: List[Dict[str, Tuple[int, float]]] = self._gather(
+            self._local_times()
+        )
+        names = sorted(set(name for times in all_times for name in times))
+        stats = {}
+        for name in names:
+            values = {
+                rank: times[name][1]
+                for rank, times in enumerate(all_times)
+                if name in times
+            }
+            slowest_rank = max(values, key=lambda rank: values[rank])
+            max_value = values[slowest_rank]
+            median = statistics.median(values.values())
+            stats[f"straggler/{name}.skew"] = (
+                max_value / median if median > 0 else 1.0
+            )
+            stats[f"straggler/{name}.slowest_rank"] = slowest_rank
+            stats[f"straggler/{name}.max"] = max_value
+            stats[f"straggler/{name}.median"] = median
+        return stats
+
+    def __call__(self, manager: ExtensionsManagerProtocol) -> None:
+        if self._trigger(manager):
+            reporting.report(self.compute())
+
+    def state_dict(self) -> Dict[str, Any]:
+        state: Dict[str, Any] = {}
+        if hasattr(self._trigger, "state_dict"):
+            state["_trigger"] = self._trigger.state_dict()
+        return state
+
+    def load_state_dict(self, to_load: Dict[str, Any]) -> None:
+        if hasattr(self._trigger, "load_state_dict"):
+            self._trigger.load_state_dict(to_load["_trigger"])
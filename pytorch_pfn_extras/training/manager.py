@@ -184,6 +184,9 @@ class _BaseExtensionsManager:
 
         self._enable_profile = enable_profile
         self._state_objects = state_objects
+        # Position of the training data iterator in the current epoch,
+        # maintained by the training loop (e.g., `Trainer`).
+        self._data_iterator_state: Optional[Dict[str, int]] = None
         # Initialize the writer
         self.writer.initialize(self.out)
 
@@ -507,6 +510,8 @@ class _BaseExtensionsManager:
             name: self._extensions[name].state_dict()
             for name in self._extensions
         }
+        if self._data_iterator_state is not None:
+            to_save["data_iterator"] = dict(self._data_iterator_state)
         to_save["ppe_version"] = pytorch_pfn_extras.__version__
         return to_save
 
@@ -557,6 +562,8 @@ class _BaseExtensionsManager:
         for name in self._extensions:
             self._extensions[name].load_state_dict(to_load["extensions"][name])
 
+        self._data_iterator_state = to_load.get("data_iterator", None)
+
 
 class ExtensionsManager(_BaseExtensionsManager):
     """Manages the extensions and the current status.
@@ -1,11 +1,26 @@
+from pytorch_pfn_extras.writing._async_writer import AsyncFileSystem  # NOQA
+from pytorch_pfn_extras.writing._async_writer import AsyncWriter  # NOQA
+from pytorch_pfn_extras.writing._bounded_queue_writer import (  # NOQA
+    BoundedQueueWriter,
+)
+from pytorch_pfn_extras.writing._compression import (  # NOQA
+    CompressedSaveFunc,
+    load_compressed,
+)
 from pytorch_pfn_extras.writing._parallel_writer import ProcessWriter  # NOQA
 from pytorch_pfn_extras.writing._parallel_writer import ThreadWriter  # NOQA
 from pytorch_pfn_extras.writing._queue_writer import ProcessQueueWriter  # NOQA
 from pytorch_pfn_extras.writing._queue_writer import QueueWriter  # NOQA
 from pytorch_pfn_extras.writing._queue_writer import ThreadQueueWriter  # NOQA
+from pytorch_pfn_extras.writing._sharded_writer import ShardedWriter  # NOQA
+from pytorch_pfn_extras.writing._sharded_writer import load_sharded  # NOQA
+from pytorch_pfn_extras.writing._shared_memory import SharedMemoryPool  # NOQA
 from pytorch_pfn_extras.writing._simple_writer import SimpleWriter  # NOQA
 from pytorch_pfn_extras.writing._tensorboard_writer import (  # NOQA
+    BufferedTensorBoardWriter,
     TensorBoardWriter,
 )
+from pytorch_pfn_extras.writing._throttle import ThrottledFileSystem  # NOQA
+from pytorch_pfn_extras.writing._tiered_writer import TieredWriter  # NOQA
 from pytorch_pfn_extras.writing._writer_base import StandardWriter  # NOQA
 from pytorch_pfn_extras.writing._writer_base import Writer  # NOQA
@@ -0,0 +1,319 @@
+import asyncio
+import concurrent.futures
+import io
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import torch
+from pytorch_pfn_extras.writing._writer_base import (
+    Writer,
+    _FileSystem,
+    _PosixFileSystem,
+    _SaveFun,
+    _TargetType,
+)
+
+
+class _AsyncFile:
+    """File object whose blocking calls run in the pool of the file system."""
+
+    def __init__(self, afs: "AsyncFileSystem", file_o: Any) -> None:
+        self._afs = afs
+        self._file_o = file_o
+
+    async def write(self, data: Any) -> Any:
+        return await self._afs._run(self._file_o.write, data)
+
+    async def read(self, size: int = -1) -> Any:
+        return await self._afs._run(self._file_o.read, size)
+
+    async def close(self) -> None:
+        await self._afs._run(self._file_o.close)
+
+    async def __aenter__(self) -> "_AsyncFile":
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        await self.close()
+
+
+class AsyncFileSystem:
+    """Asynchronous interface of a file system.
+
+    The operations are coroutines, which run the blocking calls of the
+    wrapped file system (e.g., the local file system, or a PFIO file system
+    of an object store) in a pool of threads, so that many files are written
+    concurrently from a single event loop. File systems with a native
+    asynchronous API can subclass this class and override the coroutines.
+
+    Args:
+        fs: File system to wrap. Defaults to the local file system.
+        max_workers: Number of threads running the blocking calls.
+    """
+
+    def __init__(self, fs: _FileSystem = None, max_workers: int = 8) -> None:
+        self.fs = fs or _PosixFileSystem()
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers)
+
+    async def _run(self, fn: Any, *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    async def open(self, file_path: str, mode: str = "rb") -> _AsyncFile:
+        return _AsyncFile(self, await self._run(self.fs.open, file_path, mode))
+
+    async def list(self, path_or_prefix: Optional[str] = None) -> List[str]:
+        return await self._run(  # type: ignore[no-any-return]
+            lambda: list(self.fs.list(path_or_prefix))
+        )
+
+    async def stat(self, path: str) -> Any:
+        return await self._run(self.fs.stat, path)
+
+    async def exists(self, file_path: str) -> bool:
+        return bool(await self._run(self.fs.exists, file_path))
+
+    async def makedirs(self, file_path: str, exist_ok: bool = False) -> None:
+        await self._run(lambda: self.fs.makedirs(file_path, exist_ok=exist_ok))
+
+    async def rename(self, src: str, dst: str) -> None:
+        await self._run(self.fs.rename, src, dst)
+
+    async def remove(self, file_path: str, recursive: bool = False) -> None:
+        await self._run(self.fs.remove, file_path, recursive)
+
+    def close(self) -> None:
+        """Shuts down the pool of threads."""
+        self._executor.shutdown()
+
+
+class AsyncWriter(Writer):
+    """Snapshot writer that writes files concurrently from an event loop.
+
+    Every call serializes the target into memory and writes it through an
+    :class:`AsyncFileSystem` from a background event loop, so that up to
+    ``max_concurrency`` files are written at the same time, e.g., the many
+    small files of logs and test cases, or snapshots to an object store
+    whose requests have a high latency. Calls writing the same file name
+    are written in order.
+
+    Since the serialized target is held in memory until it is written,
+    prefer :class:`ThreadWriter` for snapshots larger than the available
+    memory.
+
+    Args:
+        savefun: Callable object. It takes three arguments: the output file
+            path, the serialized dictionary object, and the optional keyword
+            arguments.
+        fs: FileSystem abstracting interface to implement all the operations.
+            Ignored if ``async_fs`` is given. optional, defaults to None
+        out_dir: str. Specifies the directory this writer will use.
+            It takes precedence over the one specified in `__call__`
+            optional, defaults to ``''``
+        max_concurrency: Maximum number of files written at the same time.
+        async_fs: File system used to write the files. Defaults to an
+            :class:`AsyncFileSystem` of ``fs``.
+        kwds: Keyword arguments for the ``savefun``.
+
+    .. seealso::
+
+        - :meth:`pytorch_pfn_extras.training.extensions.snapshot`
+    """
+
+    _chunk_size = 8 * 1024 * 1024
+
+    def __init__(
+        self,
+        savefun: _SaveFun = torch.save,
+        fs: _FileSystem = None,
+        out_dir: str = "",
+        max_concurrency: int = 8,
+        async_fs: Optional[AsyncFileSystem] = None,
+        **kwds: Any,
+    ) -> None:
+        # Nothing to finalize until the event loop is started
+        self._finalized = True
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be a positive number")
+        self._owns_async_fs = async_fs is None
+        self.async_fs = async_fs or AsyncFileSystem(fs, max_concurrency)
+        super().__init__(fs=self.async_fs.fs, out_dir=out_dir)
+        self._savefun = savefun
+        self._kwds = kwds
+        self._max_concurrency = max_concurrency
+        self._error: Optional[Exception] = None
+        self._pending: "List[concurrent.futures.Future[None]]" = []
+        # Latest write of each file, awaited by the next write of the file
+        self._latest: Dict[str, "asyncio.Future[None]"] = {}
+        # Completed once the latest call has replaced its file
+        self._turn: Optional["asyncio.Future[None]"] = None
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_loop, daemon=True)
+        self._thread.start()
+        self._semaphore = asyncio.run_coroutine_threadsafe(
+            self._create_semaphore(), self._loop
+        ).result()
+        self._finalized = False
+
+    def _run_loop(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    async def _create_semaphore(self) -> asyncio.Semaphore:
+        # Created in the loop, as older versions of Python bind it then
+        return asyncio.Semaphore(self._max_concurrency)
+
+    def __call__(
+        self,
+        filename: str,
+        out_dir: str,
+        target: _TargetType,
+        *,
+        savefun: Optional[_SaveFun] = None,
+        append: bool = False,
+    ) -> None:
+        assert not self._finalized
+        if savefun is None:
+            savefun = self._savefun
+        future = asyncio.run_coroutine_threadsafe(
+            self._save_in_order(filename, target, savefun, append),
+            self._loop,
+        )
+        self._pending = [f for f in self._pending if not f.done()]
+        self._pending.append(future)
+
+    async def _save_in_order(
+        self,
+        filename: str,
+        target: _TargetType,
+        savefun: _SaveFun,
+        append: bool,
+    ) -> None:
+        previous = self._latest.get(filename)
+        turn, self._turn = self._turn, self._loop.create_future()
+        current = asyncio.ensure_future(
+            self._save_after(
+                previous, turn, self._turn, filename, target, savefun, append
+            )
+        )
+        self._latest[filename] = current
+        try:
+            await current
+        finally:
+            if self._latest.get(filename) is current:
+                del self._latest[filename]
+
+    async def _save_after(
+        self,
+        previous: Optional["asyncio.Future[None]"],
+        turn: Optional["asyncio.Future[None]"],
+        next_turn: "asyncio.Future[None]",
+        filename: str,
+        target: _TargetType,
+        savefun: _SaveFun,
+        append: bool,
+    ) -> None:
+        try:
+            if previous is not None:
+                # Failures are reported by the previous write itself
+                await asyncio.wait([previous])
+            async with self._semaphore:
+                path, stats = await self._write(
+                    filename, target, savefun, append
+                )
+            # Files are replaced in the order of the calls, so that the
+            # cleanup of stale snapshots sees them in that order
+            if turn is not None:
+                await asyncio.wait([turn])
+            await self._commit(filename, path, stats)
+        except Exception as e:
+            if self._error is None:
+                self._error = e
+            print(
+                f'Error: AsyncWriter failed to write "{filename}": '
+                f"{type(e).__name__}: {str(e)}",
+                file=sys.stderr,
+            )
+        finally:
+            next_turn.set_result(None)
+
+    async def _write(
+        self,
+        filename: str,
+        target: _TargetType,
+        savefun: _SaveFun,
+        append: bool,
+    ) -> Tuple[Optional[str], Dict[str, float]]:
+        afs = self.async_fs
+        out_dir = self.out_dir
+        if not self._initialized:
+            await afs.makedirs(out_dir, exist_ok=True)
+            self._initialized = True
+        dest = os.path.join(out_dir, filename)
+
+        begin = time.perf_counter()
+        buffer = io.BytesIO()
+        await afs._run(lambda: savefun(target, buffer, **self._kwds))
+        data = buffer.getbuffer()
+        serialized = time.perf_counter()
+        path = dest if append else os.path.join(out_dir, f"tmp_{filename}")
+        async with await afs.open(path, "ab" if append else "wb") as f:
+            for pos in range(0, len(data), self._chunk_size):
+                await f.write(data[pos : pos + self._chunk_size])
+        saved = time.perf_counter()
+        stats = {
+            "serialize": serialized - begin,
+            "write": saved - serialized,
+            "bytes": len(data),
+            "throughput": len(data) / max(saved - serialized, 1e-9),
+        }
+        return None if append else path, stats
+
+    async def _commit(
+        self, filename: str, path: Optional[str], stats: Dict[str, float]
+    ) -> None:
+        afs = self.async_fs
+        begin = time.perf_counter()
+        if path is not None:
+            dest = os.path.join(self.out_dir, filename)
+            make_backup = await afs.exists(dest)
+            if make_backup:
+                # HDFS does not support overwrite
+                bak = "{}.bak".format(dest)
+                # Check if another backup file exists
+                # due to some unexpected termination of an earlier
+                # process
+                if await afs.exists(bak):
+                    await afs.remove(bak)
+                await afs.rename(dest, bak)
+            await afs.rename(path, dest)
+            if make_backup:
+                await afs.remove(bak)
+            await afs._run(self._record_snapshot, filename)
+        stats["rename"] = time.perf_counter() - begin
+        self._report_io(stats)
+        # Hooks such as the cleanup of stale snapshots use the blocking API
+        await afs._run(self._post_save)
+
+    def synchronize(self) -> None:
+        """Waits until all the files are written."""
+        pending, self._pending = self._pending, []
+        concurrent.futures.wait(pending)
+
+    def finalize(self) -> None:
+        if self._finalized:
+            return
+        self._finalized = True
+        self.synchronize()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        if self._owns_async_fs:
+            self.async_fs.close()
+        if self._error is not None:
+            raise RuntimeError(
+                f"failed to write a file: {self._error}"
+            ) from self._error
@@ -0,0 +1,235 @@
+import collections
+import sys
+import threading
+import time
+from typing import Any, Deque, Optional, Tuple
+
+import torch
+from pytorch_pfn_extras import reporting
+from pytorch_pfn_extras.writing._shared_memory import SharedMemoryPool, _Lease
+from pytorch_pfn_extras.writing._writer_base import (
+    Writer,
+    _FileSystem,
+    _SaveFun,
+    _TargetType,
+)
+
+# The last elements are the time the task was put in the queue and the
+# buffers of the copied target
+_Task = Tuple[str, str, _TargetType, _SaveFun, bool, float, _Lease]
+
+_POLICIES = ("block", "drop_oldest", "coalesce")
+
+
+class BoundedQueueWriter(Writer):
+    """Snapshot writer that uses a persistent thread and a bounded queue.
+
+    Unlike :class:`ThreadWriter`, which waits for the previous snapshot
+    to be written before starting a new one, this writer puts every
+    snapshot into a queue consumed by a single thread, so that the
+    training loop does not wait for slow storage. At most ``max_pending``
+    snapshots wait in the queue (the one being written is not counted);
+    when the queue is full, ``policy`` decides what happens:
+
+    * ``'block'``: waits until a snapshot has been written.
+    * ``'drop_oldest'``: discards the oldest waiting snapshot.
+    * ``'coalesce'``: a waiting snapshot of the same file is replaced by the
+      new one even if the queue is not full. Otherwise, the oldest waiting
+      snapshot is discarded when the queue is full.
+
+    The number of waiting snapshots and of discarded snapshots are
+    reported to :mod:`pytorch_pfn_extras.reporting` on every call as
+    ``<report_prefix>/queue_depth`` and ``<report_prefix>/dropped``.
+
+    .. note::
+        Since a snapshot can wait in the queue for several calls, the
+        tensors of the target are copied when it is put in the queue, so
+        that the file holds the values at the time of the call. The copies
+        are kept in a :class:`SharedMemoryPool` and reused, and up to
+        ``max_pending + 1`` copies are held in memory. With
+        ``copy_target=False``, the target is not copied and is serialized
+        when the thread gets to it, so a queued snapshot may hold the
+        values of later iterations.
+
+    Args:
+        savefun: Callable object. It takes three arguments: the output file
+            path, the serialized dictionary object, and the optional keyword
+            arguments.
+        fs: FileSystem abstracting interface to implement all the operations.
+            optional, defaults to None
+        out_dir: str. Specifies the directory this writer will use.
+            It takes precedence over the one specified in `__call__`
+            optional, defaults to ``''``
+        max_pending: Maximum number of snapshots waiting to be written.
+        policy: Policy applied when the queue is full, one of ``'block'``,
+            ``'drop_oldest'`` and ``'coalesce'``.
+        report_prefix: Prefix of the reported values. If ``None``, nothing
+            is reported.
+        copy_target: Whether to copy the tensors of the target when it is
+            put in the queue.
+        kwds: Keyword arguments for the ``savefun``.
+
+    .. seealso::
+
+        - :meth:`pytorch_pfn_extras.training.extensions.snapshot`
+    """
+
+    def __init__(
+        self,
+        savefun: _SaveFun = torch.save,
+        fs: _FileSystem = None,
+        out_dir: str = "",
+        max_pending: int = 1,
+        policy: str = "block",
+        report_prefix: Optional[str] = "writer",
+        copy_target: bool = True,
+        **kwds: Any,
+    ) -> None:
+        # Nothing to finalize until the consumer is started
+        self._finalized = True
+        super().__init__(fs=fs, out_dir=out_dir)
+        if max_pending < 1:
+            raise ValueError("max_pending must be a positive number")
+        if policy not in _POLICIES:
+            raise ValueError(
+                f"policy must be one of {_POLICIES}, but got {policy!r}"
+            )
+        self._savefun = savefun
+        self._kwds = kwds
+        self._max_pending = max_pending
+        self._policy = policy
+        self._report_prefix = report_prefix
+        self._pool = SharedMemoryPool() if copy_target else None
+        # The pool is used from the caller and the consumer threads
+        self._pool_lock = threading.Lock()
+        self._pending: Deque[_Task] = collections.deque()
+        # Slots taken by the calls copying their target (policy 'block')
+        self._reserved = 0
+        self._cond = threading.Condition()
+        self._busy = False
+        self._closing = False
+        self._error: Optional[Exception] = None
+        self.dropped = 0
+        self._finalized = False
+        self._consumer = threading.Thread(target=self._consume, daemon=True)
+        self._consumer.start()
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of snapshots waiting to be written."""
+        return len(self._pending)
+
+    def __call__(
+        self,
+        filename: str,
+        out_dir: str,
+        target: _TargetType,
+        *,
+        savefun: Optional[_SaveFun] = None,
+        append: bool = False,
+    ) -> None:
+        assert not self._finalized
+        if savefun is None:
+            savefun = self._savefun
+        block = self._policy == "block"
+        if block:
+            # Wait for a free slot before copying the target, so that the
+            # blocked calls do not hold copies beyond the bound
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: len(self._pending) + self._reserved
+                    < self._max_pending
+                )
+                self._reserved += 1
+        lease: _Lease = []
+        try:
+            if self._pool is not None:
+                with self._pool_lock:
+                    target, lease = self._pool.pack(target)
+        except BaseException:
+            if block:
+                with self._cond:
+                    self._reserved -= 1
+                    self._cond.notify_all()
+            raise
+        task = (filename, out_dir, target, savefun, append, time.time(), lease)
+        with self._cond:
+            if block:
+                self._reserved -= 1
+                self._pending.append(task)
+            elif not self._coalesce(task):
+                if len(self._pending) >= self._max_pending:
+                    self._release(self._pending.popleft())
+                    self.dropped += 1
+                self._pending.append(task)
+            self._cond.notify_all()
+            stats = {"queue_depth": len(self._pending), "dropped": self.dropped}
+        if self._report_prefix is not None:
+            reporting.report(
+                {f"{self._report_prefix}/{k}": v for k, v in stats.items()}
+            )
+
+    def _coalesce(self, task: _Task) -> bool:
+        # Must be called with `_cond` held
+        if self._policy != "coalesce" or task[4]:
+            return False
+        for i, pending in enumerate(self._pending):
+            # Appended contents cannot be replaced
+            if pending[0] == task[0] and not pending[4]:
+                self._release(pending)
+                self._pending[i] = task
+                self.dropped += 1
+                return True
+        return False
+
+    def _release(self, task: _Task) -> None:
+        if self._pool is not None:
+            with self._pool_lock:
+                self._pool.release(task[6])
+
+    def _consume(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._closing)
+                if not self._pending:
+                    return
+                task = self._pending.popleft()
+                filename, out_dir, target, savefun, append, enqueued, _ = task
+                self._busy = True
+                self._cond.notify_all()
+            try:
+                self._report_io({"queue_wait": time.time() - enqueued})
+                self.save(
+                    filename, out_dir, target, savefun, append, **self._kwds
+                )
+            except Exception as e:
+                self._error = e
+                print(
+                    f"Error: BoundedQueueWriter failed to write "
+                    f'"{filename}": {type(e).__name__}: {str(e)}',
+                    file=sys.stderr,
+                )
+            finally:
+                self._release(task)
+                del target, task
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+    def synchronize(self) -> None:
+        """Waits until all the snapshots in the queue are written."""
+        with self._cond:
+            self._cond.wait_for(lambda: not self._pending and not self._busy)
+
+    def finalize(self) -> None:
+        if self._finalized:
+            return
+        self._finalized = True
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        self._consumer.join()
+        if self._error is not None:
+            raise RuntimeError(
+                f"failed to write a snapshot: {self._error}"
+            ) from self._error
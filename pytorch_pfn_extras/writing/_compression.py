@@ -0,0 +1,306 @@
+import collections
+import concurrent.futures
+import gzip
+import io
+import time
+import zlib
+from typing import IO, Any, Deque, Dict, Optional
+
+import torch
+from pytorch_pfn_extras import reporting
+from pytorch_pfn_extras.profiler._time_summary import get_time_summary
+from pytorch_pfn_extras.writing._writer_base import _report_io, _SaveFun
+
+# Size of the head of a block compressed to judge its compressibility
+_SAMPLE_SIZE = 64 * 1024
+# First bytes of a gzip stream
+_GZIP_MAGIC = b"\x1f\x8b"
+# Size of the end of a decompressed stream kept to read its records
+_TAIL_SIZE = 1024 * 1024
+
+
+def _compress_block(data: bytes, level: int, max_ratio: float) -> bytes:
+    # Every block is a complete gzip member, and the concatenation of
+    # members is a valid gzip stream
+    if max_ratio < 1 and len(data) > _SAMPLE_SIZE:
+        sample = zlib.compress(data[:_SAMPLE_SIZE], level)
+        if len(sample) > max_ratio * _SAMPLE_SIZE:
+            # Stores incompressible data without spending time on it
+            level = 0
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+class _CompressingStream(io.RawIOBase):
+    """Write-only stream compressing blocks in a pool of threads."""
+
+    def __init__(
+        self,
+        file_o: IO[Any],
+        executor: concurrent.futures.Executor,
+        level: int,
+        block_size: int,
+        max_ratio: float,
+        max_inflight: int,
+    ) -> None:
+        super().__init__()
+        self._file_o = file_o
+        self._executor = executor
+        self._level = level
+        self._block_size = block_size
+        self._max_ratio = max_ratio
+        self._max_inflight = max_inflight
+        self._buffer = bytearray()
+        self._inflight: Deque[
+            "concurrent.futures.Future[bytes]"
+        ] = collections.deque()
+        self.raw_bytes = 0
+        self.compressed_bytes = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: Any) -> int:
+        view = memoryview(data).cast("B")
+        pos = 0
+        if self._buffer:
+            pos = min(self._block_size - len(self._buffer), len(view))
+            self._buffer += view[:pos]
+            if len(self._buffer) < self._block_size:
+                return len(view)
+            self._submit(bytes(self._buffer))
+            self._buffer.clear()
+        # Large writes (e.g., tensor data) are split without buffering
+        while len(view) - pos >= self._block_size:
+            self._submit(bytes(view[pos : pos + self._block_size]))
+            pos += self._block_size
+        self._buffer += view[pos:]
+        return len(view)
+
+    def _submit(self, block: bytes) -> None:
+        self.raw_bytes += len(block)
+        self._inflight.append(
+            self._executor.submit(
+                _compress_block, block, self._level, self._max_ratio
+            )
+        )
+        # Bounds the memory held by the blocks being compressed
+        while len(self._inflight) > self._max_inflight:
+            self._write_oldest()
+
+    def _write_oldest(self) -> None:
+        compressed = self._inflight.popleft().result()
+        self.compressed_bytes += len(compressed)
+        self._file_o.write(compressed)
+
+    def close(self) -> None:
+        if not self.closed:
+            if self._buffer:
+                self._submit(bytes(self._buffer))
+                self._buffer.clear()
+            while self._inflight:
+                self._write_oldest()
+        super().close()
+
+
+class _GzipReader(io.RawIOBase):
+    """Read-only seekable stream decompressing a gzip file on the fly.
+
+    ``gzip.GzipFile`` seeks backward by decompressing again from the start,
+    and cannot seek from the end, which loading functions such as
+    ``torch.load`` do to read the records at the end of the file. The size
+    is found by decompressing the stream once, keeping only its tail so
+    that the reads at the end do not decompress it again.
+    """
+
+    def __init__(self, file_o: IO[Any]) -> None:
+        super().__init__()
+        self._gzip = gzip.GzipFile(fileobj=file_o, mode="rb")
+        self._pos = 0
+        self._size: Optional[int] = None
+        self._tail = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        view = memoryview(buffer).cast("B")
+        if self._size is not None and self._pos >= self._size - len(self._tail):
+            start = self._pos - (self._size - len(self._tail))
+            data = self._tail[start : start + len(view)]
+            view[: len(data)] = data
+            n = len(data)
+        else:
+            if self._gzip.tell() != self._pos:
+                self._gzip.seek(self._pos)
+            n = self._gzip.readinto(view)
+        self._pos += n
+        return n
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_END:
+            offset += self._find_size()
+        elif whence == io.SEEK_CUR:
+            offset += self._pos
+        # The decompressed stream is moved when it is read
+        self._pos = max(offset, 0)
+        return self._pos
+
+    def _find_size(self) -> int:
+        if self._size is None:
+            tail: Deque[bytes] = collections.deque()
+            tail_size = 0
+            # Only the tail is kept, so it is read from wherever it is
+            while True:
+                data = self._gzip.read(_TAIL_SIZE)
+                if not data:
+                    break
+                tail.append(data)
+                tail_size += len(data)
+                while tail_size - len(tail[0]) >= _TAIL_SIZE:
+                    tail_size -= len(tail.popleft())
+            self._size = self._gzip.tell()
+            self._tail = b"".join(tail)
+        return self._size
+
+    def close(self) -> None:
+        if not self.closed:
+            self._gzip.close()
+        super().close()
+
+
+class CompressedSaveFunc:
+    """Saving function that compresses the output of another one.
+
+    The output of ``savefun`` is split into blocks that are compressed
+    concurrently by a pool of threads and written in order as they are
+    ready, so that the whole output is never held in memory. The result is
+    a gzip stream, which can be loaded with :func:`load_compressed` or
+    decompressed with ``gunzip``.
+
+    Since parameters in floating point types hardly compress, the blocks
+    whose first 64 KiB do not compress below ``max_ratio`` of their size
+    are stored without compression, which costs almost no time.
+
+    The ratio and the throughput (in bytes per second of uncompressed
+    data) of each call are reported to
+    :func:`~pytorch_pfn_extras.profiler.get_time_summary` of the thread
+    that created this object as ``<tag>:ratio`` and ``<tag>:throughput``,
+    where the tag is ``pytorch_pfn_extras.writing.CompressedSaveFunc``.
+    This works with every writer, e.g., to show them with
+    :class:`~pytorch_pfn_extras.training.extensions.ProfileReport`.
+    They are also reported to :mod:`pytorch_pfn_extras.reporting` as
+    ``compression/ratio`` and ``compression/throughput``, but only with
+    :class:`SimpleWriter`, since the other writers save in another thread
+    or process than the reporter. The values of the last call are kept
+    in :attr:`stats`, except with the writers saving in other processes.
+
+    It can be passed as ``savefun`` to any writer, e.g.,
+    ``writing.ThreadWriter(savefun=writing.CompressedSaveFunc())``, and
+    the snapshots written with it are loaded by ``autoload`` of
+    :meth:`~pytorch_pfn_extras.training.extensions.snapshot`.
+
+    Args:
+        savefun: Function writing the target to a file object.
+        level: Compression level of zlib, from 0 (no compression) to 9.
+        block_size: Size in bytes of the blocks compressed independently.
+        num_threads: Number of threads compressing blocks.
+        max_ratio: Blocks whose sample compresses to more than this
+            ratio of their size are stored uncompressed. Set ``1`` to
+            compress all the blocks.
+    """
+
+    def __init__(
+        self,
+        savefun: _SaveFun = torch.save,
+        level: int = 1,
+        block_size: int = 4 * 1024 * 1024,
+        num_threads: int = 4,
+        max_ratio: float = 0.9,
+    ) -> None:
+        if not 0 <= level <= 9:
+            raise ValueError("level must be in [0, 9]")
+        if block_size < 1 or num_threads < 1:
+            raise ValueError("block_size and num_threads must be positive")
+        self._savefun = savefun
+        self._level = level
+        self._block_size = block_size
+        self._num_threads = num_threads
+        self._max_ratio = max_ratio
+        self.stats: Dict[str, float] = {}
+        # The summary is per thread, and the writers save in other threads
+        self._time_summary = get_time_summary()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        # Time summaries are not picklable, e.g., for the tasks of queues
+        del state["_time_summary"]
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._time_summary = get_time_summary()
+
+    def __call__(self, target: Any, file_o: IO[Any], **kwargs: Any) -> None:
+        begin = time.perf_counter()
+        with concurrent.futures.ThreadPoolExecutor(
+            self._num_threads
+        ) as executor:
+            stream = _CompressingStream(
+                file_o,
+                executor,
+                self._level,
+                self._block_size,
+                self._max_ratio,
+                2 * self._num_threads,
+            )
+            with stream:
+                self._savefun(target, stream, **kwargs)
+        elapsed = time.perf_counter() - begin
+        self.stats = {
+            "raw_bytes": stream.raw_bytes,
+            "compressed_bytes": stream.compressed_bytes,
+            "ratio": stream.compressed_bytes / max(stream.raw_bytes, 1),
+            "throughput": stream.raw_bytes / max(elapsed, 1e-9),
+        }
+        _report_io(
+            self._time_summary,
+            "pytorch_pfn_extras.writing.CompressedSaveFunc",
+            {
+                "ratio": self.stats["ratio"],
+                "throughput": self.stats["throughput"],
+            },
+        )
+        # Only effective in the thread of the reporter
+        reporting.report(
+            {
+                "compression/ratio": self.stats["ratio"],
+                "compression/throughput": self.stats["throughput"],
+            }
+        )
+
+
+def load_compressed(
+    file_o: IO[Any], loadfun: Optional[Any] = None, **kwargs: Any
+) -> Any:
+    """Loads an object saved with :class:`CompressedSaveFunc`.
+
+    The file is decompressed while ``loadfun`` reads it, so that the
+    decompressed data is not held in memory besides the loaded object.
+
+    Args:
+        file_o: File object of the compressed file.
+        loadfun: Function reading the object from a file object, defaults
+            to ``torch.load``.
+        kwargs: Keyword arguments for ``loadfun``.
+    """
+    if loadfun is None:
+        loadfun = torch.load
+    with io.BufferedReader(_GzipReader(file_o)) as f:
+        return loadfun(f, **kwargs)
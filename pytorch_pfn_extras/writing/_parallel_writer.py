@@ -1,9 +1,10 @@
 import multiprocessing
 import sys
 import threading
-from typing import Any, Optional
+from typing import Any, List, Optional
 
 import torch
+from pytorch_pfn_extras.writing._shared_memory import SharedMemoryPool
 from pytorch_pfn_extras.writing._writer_base import (
     StandardWriter,
     _FileSystem,
@@ -80,6 +81,13 @@ class ProcessWriter(StandardWriter[multiprocessing.Process]):
         using :class:`ThreadWriter` instead of ``ProcessWriter`` if you are
         using MPI.
 
+    Args:
+        shared_memory (bool): If ``True``, the tensors of the target are
+            copied into a :class:`SharedMemoryPool` and only their handles
+            are passed to the process. The copy makes the snapshot
+            independent of the training that continues meanwhile, and the
+            buffers are reused by the next snapshots.
+
     .. seealso::
 
         - :meth:`pytorch_pfn_extras.training.extensions.snapshot`
@@ -90,9 +98,12 @@ class ProcessWriter(StandardWriter[multiprocessing.Process]):
         savefun: _SaveFun = torch.save,
         fs: _FileSystem = None,
         out_dir: str = "",
+        shared_memory: bool = False,
         **kwds: Any,
     ) -> None:
         super().__init__(savefun=savefun, fs=fs, out_dir=out_dir, **kwds)
+        self._pool = SharedMemoryPool() if shared_memory else None
+        self._lease: List[torch.Tensor] = []
 
     def create_worker(
         self,
@@ -104,8 +115,18 @@ class ProcessWriter(StandardWriter[multiprocessing.Process]):
         append: bool = False,
         **savefun_kwargs: Any,
     ) -> multiprocessing.Process:
+        if self._pool is not None:
+            target, self._lease = self._pool.pack(target)
         return multiprocessing.Process(
             target=self.save,
             args=(filename, out_dir, target, savefun, append),
             kwargs=savefun_kwargs,
         )
+
+    def finalize(self) -> None:
+        try:
+            super().finalize()
+        finally:
+            if self._pool is not None:
+                # The worker using the buffers has been joined
+                self._pool.release(self._lease)
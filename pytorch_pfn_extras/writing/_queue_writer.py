@@ -1,9 +1,12 @@
+import collections
 import multiprocessing
 import queue
 import threading
-from typing import Generic, Optional, Tuple
+import time
+from typing import Any, Deque, Generic, List, Optional, Tuple
 
 import torch
+from pytorch_pfn_extras.writing._shared_memory import SharedMemoryPool
 from pytorch_pfn_extras.writing._simple_writer import SimpleWriter
 from pytorch_pfn_extras.writing._writer_base import (
     Writer,
@@ -14,8 +17,9 @@ from pytorch_pfn_extras.writing._writer_base import (
     _Worker,
 )
 
+# The last element is the time the task was put in the queue
 _QueUnit = Optional[
-    Tuple[_TaskFun, str, str, _TargetType, Optional[_SaveFun], bool]
+    Tuple[_TaskFun, str, str, _TargetType, Optional[_SaveFun], bool, float]
 ]
 
 
@@ -74,11 +78,24 @@ class QueueWriter(Writer, Generic[_Worker]):
     ) -> None:
         assert not self._finalized
         self._queue.put(
-            (self._task, filename, out_dir, target, savefun, append)
+            (
+                self._task,
+                filename,
+                out_dir,
+                target,
+                savefun,
+                append,
+                time.time(),
+            )
         )
 
     def create_task(self, savefun: _SaveFun) -> _TaskFun:
-        return SimpleWriter(savefun=savefun)
+        task = SimpleWriter(savefun=savefun, fs=self.fs, out_dir=self.out_dir)
+        # Writes are reported as the ones of this writer
+        task._profile_tag = self._profile_tag
+        # Snapshots are recorded in the manifest as the ones of this writer
+        task._snapshot_affixes = self._snapshot_affixes
+        return task
 
     def create_queue(self) -> "queue.Queue[_QueUnit]":
         raise NotImplementedError
@@ -93,11 +110,17 @@ class QueueWriter(Writer, Generic[_Worker]):
                 q.task_done()
                 return
             else:
+                self._report_io({"queue_wait": time.time() - task[6]})
                 task[0](
                     task[1], task[2], task[3], savefun=task[4], append=task[5]
                 )
+                self._task_done()
                 q.task_done()
 
+    def _task_done(self) -> None:
+        # Called by the consumer after each task
+        pass
+
     def finalize(self) -> None:
         if self._started:
             if not self._finalized:
@@ -149,6 +172,12 @@ class ProcessQueueWriter(QueueWriter[multiprocessing.Process]):
         :class:`ThreadQueueWriter` instead of ``ProcessQueueWriter`` if you are
         using MPI.
 
+    Args:
+        shared_memory (bool): If ``True``, the tensors of the target are
+            copied into a :class:`SharedMemoryPool` and only their handles
+            are put into the queue instead of their contents. The buffers
+            are reused once the consumer has written the snapshot.
+
     .. seealso::
 
         - :meth:`pytorch_pfn_extras.training.extensions.snapshot`
@@ -160,9 +189,52 @@ class ProcessQueueWriter(QueueWriter[multiprocessing.Process]):
         fs: _FileSystem = None,
         out_dir: str = "",
         task: Optional[_TaskFun] = None,
+        shared_memory: bool = False,
     ) -> None:
+        self._pool: Optional[SharedMemoryPool] = None
+        if shared_memory:
+            self._pool = SharedMemoryPool()
+            # Must be created before the consumer process
+            self._completed: Any = multiprocessing.Value("Q", 0)
+            self._released = 0
+            self._leases: Deque[List[torch.Tensor]] = collections.deque()
         super().__init__(savefun=savefun, fs=fs, out_dir=out_dir, task=task)
 
+    def __call__(
+        self,
+        filename: str,
+        out_dir: str,
+        target: _TargetType,
+        *,
+        savefun: Optional[_SaveFun] = None,
+        append: bool = False,
+    ) -> None:
+        if self._pool is not None:
+            self._release_completed()
+            target, lease = self._pool.pack(target)
+            self._leases.append(lease)
+        super().__call__(
+            filename, out_dir, target, savefun=savefun, append=append
+        )
+
+    def _release_completed(self) -> None:
+        assert self._pool is not None
+        # Tasks are consumed in order, so the oldest leases are released
+        completed = self._completed.value
+        while self._released < completed:
+            self._pool.release(self._leases.popleft())
+            self._released += 1
+
+    def _task_done(self) -> None:
+        if self._pool is not None:
+            with self._completed.get_lock():
+                self._completed.value += 1
+
+    def finalize(self) -> None:
+        super().finalize()
+        if self._pool is not None:
+            self._release_completed()
+
     def create_queue(self) -> "queue.Queue[_QueUnit]":
         return multiprocessing.JoinableQueue()
 
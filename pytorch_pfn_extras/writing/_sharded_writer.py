@@ -0,0 +1,376 @@
+import concurrent.futures
+import copy
+import os
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+import torch
+from pytorch_pfn_extras.writing._writer_base import (
+    Writer,
+    _FileSystem,
+    _PosixFileSystem,
+    _SaveFun,
+    _TargetType,
+)
+
+_FORMAT = "pytorch_pfn_extras.sharded"
+# Shards are kept apart so that they do not match the snapshot file names
+_SHARD_DIR = ".ppe_shards"
+# Key of the dicts standing for the tensors in the skeleton of the index
+_TENSOR = "__ppe_sharded_tensor__"
+
+# The index only holds plain dicts, lists and strings besides the
+# skeleton of the target, so that it can be loaded with
+# `torch.load(weights_only=True)`
+
+
+def _tensor_ref(
+    tensor: torch.Tensor, shard: int, offset: int, nbytes: int
+) -> Dict[str, Any]:
+    # Location of the raw bytes of a tensor in a shard
+    return {
+        "shard": shard,
+        "offset": offset,
+        "nbytes": nbytes,
+        "dtype": str(tensor.dtype).split(".")[-1],
+        "shape": list(tensor.shape),
+        "is_parameter": isinstance(tensor, torch.nn.Parameter),
+        "requires_grad": tensor.requires_grad,
+    }
+
+
+def _dtype(name: str) -> torch.dtype:
+    dtype = getattr(torch, name, None)
+    if not isinstance(dtype, torch.dtype):
+        raise ValueError(f"unknown dtype in a sharded snapshot: {name}")
+    return dtype
+
+
+def _raw_bytes(tensor: torch.Tensor) -> Any:
+    # A view of the tensor memory, written without pickling
+    data = tensor.detach().cpu().contiguous().reshape(-1)
+    return memoryview(data.view(torch.uint8).numpy())
+
+
+def _split(obj: Any, tensors: List[torch.Tensor], memo: Dict[Any, int]) -> Any:
+    # Replaces the tensors with their index in `tensors`
+    if isinstance(obj, torch.Tensor):
+        if obj.layout != torch.strided or obj.is_quantized:
+            return obj
+        key = (
+            obj.device,
+            obj.untyped_storage().data_ptr(),
+            obj.storage_offset(),
+            obj.shape,
+            obj.stride(),
+            obj.dtype,
+        )
+        if key not in memo:
+            memo[key] = len(tensors)
+            tensors.append(obj)
+        return {_TENSOR: memo[key]}
+    if isinstance(obj, dict):
+        split = copy.copy(obj)
+        for k, v in obj.items():
+            split[k] = _split(v, tensors, memo)
+        return split
+    if isinstance(obj, (list, tuple)) and not hasattr(obj, "_fields"):
+        return type(obj)(_split(v, tensors, memo) for v in obj)
+    return obj
+
+
+def _replace(obj: Any, fn: Any) -> Any:
+    if isinstance(obj, dict) and obj.keys() == {_TENSOR}:
+        return fn(obj[_TENSOR])
+    if isinstance(obj, dict):
+        replaced = copy.copy(obj)
+        for k, v in obj.items():
+            replaced[k] = _replace(v, fn)
+        return replaced
+    if isinstance(obj, (list, tuple)) and not hasattr(obj, "_fields"):
+        return type(obj)(_replace(v, fn) for v in obj)
+    return obj
+
+
+def _balance(sizes: List[int], num_shards: int) -> List[int]:
+    # Assigns the largest tensors first to the least loaded shard
+    loads = [0] * num_shards
+    shard_of = [0] * len(sizes)
+    for i in sorted(range(len(sizes)), key=lambda i: -sizes[i]):
+        shard = loads.index(min(loads))
+        shard_of[i] = shard
+        loads[shard] += sizes[i]
+    return shard_of
+
+
+class ShardedWriter(Writer):
+    """Snapshot writer that writes large state dicts in parallel.
+
+    The tensors of the target are split into ``num_shards`` files of
+    balanced sizes, which are written concurrently by a pool of threads.
+    The raw bytes of the tensors are written directly from their memory,
+    and only the rest of the target is pickled into an index file with
+    the given file name. The index is written last, so that a snapshot
+    with an index is always complete. Use :func:`load_sharded` to load it.
+
+    The shards of a snapshot are named after its index and written in the
+    ``.ppe_shards`` directory under the output directory. Every call removes
+    the shards whose index has been overwritten or removed (e.g., by
+    ``n_retains`` of
+    :meth:`~pytorch_pfn_extras.training.extensions.snapshot`). The shards
+    are tracked by the writer, and the ones left by previous runs are
+    found by listing the directory on the first call. The index only holds
+    plain containers and strings besides the skeleton of the target, so it
+    can be loaded with ``torch.load(weights_only=True)`` when the target
+    can. Snapshots written by this writer can be loaded by ``autoload`` of
+    the snapshot extension.
+
+    Args:
+        num_shards: Number of shard files of a snapshot.
+        num_threads: Number of threads writing the shards. Defaults to
+            ``num_shards``.
+        fs: FileSystem abstracting interface to implement all the operations.
+            optional, defaults to None
+        out_dir: str. Specifies the directory this writer will use.
+            It takes precedence over the one specified in `__call__`
+            optional, defaults to ``''``
+
+    .. seealso::
+
+        - :meth:`pytorch_pfn_extras.training.extensions.snapshot`
+    """
+
+    def __init__(
+        self,
+        num_shards: int = 8,
+        num_threads: Optional[int] = None,
+        fs: _FileSystem = None,
+        out_dir: str = "",
+    ) -> None:
+        if num_shards < 1:
+            raise ValueError("num_shards must be a positive number")
+        super().__init__(fs=fs, out_dir=out_dir)
+        self._num_shards = num_shards
+        self._num_threads = num_threads or num_shards
+        # Shards of each index in the output directory
+        self._shards: Optional[Dict[str, List[str]]] = None
+
+    def __call__(
+        self,
+        filename: str,
+        out_dir: str,
+        target: _TargetType,
+        *,
+        savefun: Optional[_SaveFun] = None,
+        append: bool = False,
+    ) -> None:
+        if append:
+            raise ValueError("ShardedWriter does not support append mode")
+        out_dir = self.out_dir
+        if not self._initialized:
+            self.initialize(out_dir)
+        self.fs.makedirs(os.path.join(out_dir, _SHARD_DIR), exist_ok=True)
+        if self._shards is None:
+            self._shards = self._find_shards(out_dir)
+
+        tensors: List[torch.Tensor] = []
+        skeleton = _split(target, tensors, {})
+        sizes = [t.numel() * t.element_size() for t in tensors]
+        shard_of = _balance(sizes, self._num_shards)
+        token = uuid.uuid4().hex[:8]
+        shards = [
+            os.path.join(_SHARD_DIR, f"{filename}.{token}.shard{i}")
+            for i in range(min(self._num_shards, len(tensors)))
+        ]
+        refs: List[Dict[str, Any]] = []
+        offsets = [0] * len(shards)
+        for tensor, size, shard in zip(tensors, sizes, shard_of):
+            refs.append(_tensor_ref(tensor, shard, offsets[shard], size))
+            offsets[shard] += size
+
+        begin = time.perf_counter()
+        with concurrent.futures.ThreadPoolExecutor(self._num_threads) as pool:
+            futures = [
+                pool.submit(
+                    self._write_shard,
+                    out_dir,
+                    name,
+                    [t for t, s in zip(tensors, shard_of) if s == i],
+                )
+                for i, name in enumerate(shards)
+            ]
+            for future in futures:
+                future.result()
+        shard_time = time.perf_counter() - begin
+        self._report_io(
+            {
+                "shard_write": shard_time,
+                "shard_bytes": sum(sizes),
+                "shard_throughput": sum(sizes) / max(shard_time, 1e-9),
+            }
+        )
+
+        index = {
+            "format": _FORMAT,
+            "shards": shards,
+            "tensors": refs,
+            "skeleton": skeleton,
+        }
+        self.save(filename, out_dir, index, torch.save, False)
+        self._remove_stale_shards(out_dir, filename, shards)
+
+    def _find_shards(self, out_dir: str) -> Dict[str, List[str]]:
+        # The shards left by previous runs, the ones of removed indices
+        # are removed right away
+        shard_dir = os.path.join(out_dir, _SHARD_DIR)
+        indices = set(self.fs.list(out_dir))
+        shards: Dict[str, List[str]] = {}
+        for name in list(self.fs.list(shard_dir)):
+            parts = name.rsplit(".", 2)
+            if len(parts) != 3 or not parts[2].startswith("shard"):
+                continue
+            if parts[0] in indices:
+                shards.setdefault(parts[0], []).append(
+                    os.path.join(_SHARD_DIR, name)
+                )
+            else:
+                self._remove_shards(out_dir, [os.path.join(_SHARD_DIR, name)])
+        return shards
+
+    def _remove_stale_shards(
+        self, out_dir: str, filename: str, shards: List[str]
+    ) -> None:
+        assert self._shards is not None
+        stale = [s for s in self._shards.get(filename, []) if s not in shards]
+        self._shards[filename] = shards
+        # Indices removed since the last call, e.g., by `n_retains`
+        for index_name in list(self._shards):
+            if index_name != filename and not self.fs.exists(
+                os.path.join(out_dir, index_name)
+            ):
+                stale += self._shards.pop(index_name)
+        self._remove_shards(out_dir, stale)
+
+    def _remove_shards(self, out_dir: str, shards: List[str]) -> None:
+        for shard in shards:
+            try:
+                self.fs.remove(os.path.join(out_dir, shard))
+            except FileNotFoundError:
+                # Removed by another writer of the directory
+                pass
+
+    def _write_shard(
+        self, out_dir: str, name: str, tensors: List[torch.Tensor]
+    ) -> None:
+        path = os.path.join(out_dir, name)
+        tmppath = os.path.join(
+            os.path.dirname(path), f"tmp_{os.path.basename(path)}"
+        )
+        with self.fs.open(tmppath, "wb") as f:
+            for tensor in tensors:
+                f.write(_raw_bytes(tensor))
+        self.fs.rename(tmppath, path)
+
+
+def _read_shard(
+    fs: _FileSystem, path: str, refs: List[Tuple[int, Dict[str, Any]]]
+) -> List[Tuple[int, torch.Tensor]]:
+    tensors = []
+    with fs.open(path, "rb") as f:
+        for i, ref in sorted(refs, key=lambda r: r[1]["offset"]):
+            f.seek(ref["offset"])
+            buffer = torch.empty(ref["nbytes"], dtype=torch.uint8)
+            if hasattr(f, "readinto"):
+                n = f.readinto(memoryview(buffer.numpy()))
+            else:
+                data = f.read(ref["nbytes"])
+                n = len(data)
+                buffer.copy_(
+                    torch.frombuffer(bytearray(data), dtype=torch.uint8)
+                )
+            if n != ref["nbytes"]:
+                raise RuntimeError(f"{path} is truncated")
+            tensor = buffer.view(_dtype(ref["dtype"])).reshape(ref["shape"])
+            tensors.append((i, tensor))
+    return tensors
+
+
+def _is_sharded(state: Any) -> bool:
+    return isinstance(state, dict) and state.get("format") == _FORMAT
+
+
+def _restore_sharded(
+    index: Dict[str, Any],
+    out_dir: str,
+    fs: _FileSystem,
+    num_threads: int,
+    map_location: Optional[torch.device],
+) -> Any:
+    refs: List[Dict[str, Any]] = index["tensors"]
+    by_shard: Dict[int, List[Tuple[int, Dict[str, Any]]]] = {}
+    for i, ref in enumerate(refs):
+        by_shard.setdefault(ref["shard"], []).append((i, ref))
+
+    tensors: List[Any] = [None] * len(refs)
+    with concurrent.futures.ThreadPoolExecutor(num_threads) as pool:
+        futures = [
+            pool.submit(
+                _read_shard,
+                fs,
+                os.path.join(out_dir, index["shards"][shard]),
+                shard_refs,
+            )
+            for shard, shard_refs in by_shard.items()
+        ]
+        for future in futures:
+            for i, tensor in future.result():
+                tensors[i] = tensor
+
+    restored: Dict[int, torch.Tensor] = {}
+
+    def _restore(i: int) -> torch.Tensor:
+        # Tensors referenced several times are restored once
+        if i not in restored:
+            ref = refs[i]
+            tensor = tensors[i]
+            if map_location is not None:
+                tensor = tensor.to(map_location)
+            if ref["is_parameter"]:
+                tensor = torch.nn.Parameter(
+                    tensor, requires_grad=ref["requires_grad"]
+                )
+            else:
+                tensor.requires_grad_(ref["requires_grad"])
+            restored[i] = tensor
+        return restored[i]
+
+    return _replace(index["skeleton"], _restore)
+
+
+def load_sharded(
+    path: str,
+    fs: _FileSystem = None,
+    num_threads: int = 8,
+    map_location: Optional[torch.device] = None,
+) -> Any:
+    """Loads a snapshot written by :class:`ShardedWriter`.
+
+    The shards are read in parallel by a pool of threads.
+
+    Args:
+        path: Path of the index file of the snapshot.
+        fs: FileSystem abstracting interface to implement all the operations.
+            optional, defaults to None
+        num_threads: Number of threads reading the shards.
+        map_location: Device to move the tensors to. By default, the tensors
+            are loaded in the CPU.
+    """
+    fs = fs or _PosixFileSystem()
+    with fs.open(path, "rb") as f:
+        index = torch.load(f)
+    if not _is_sharded(index):
+        raise ValueError(f"{path} is not a sharded snapshot")
+    return _restore_sharded(
+        index, os.path.dirname(path), fs, num_threads, map_location
+    )
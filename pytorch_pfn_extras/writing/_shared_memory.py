@@ -0,0 +1,99 @@
+import collections
+import copy
+from typing import Any, Dict, List, Tuple
+
+import torch
+
+_Lease = List[torch.Tensor]
+
+
+class SharedMemoryPool:
+    """Pool of shared memory buffers to hand tensors to writer processes.
+
+    :meth:`pack` copies the tensors of a target into buffers in shared
+    memory, so that only their handles are pickled when the target is sent
+    to another process. After the process is done with the target, the
+    buffers are returned to the pool by :meth:`release` and reused by the
+    next targets of the same sizes, which avoids allocating shared memory
+    again for every snapshot.
+
+    CUDA tensors are copied to the host, so the writer processes do not
+    need to initialize CUDA.
+
+    .. note::
+        This class is not thread safe.
+    """
+
+    def __init__(self) -> None:
+        self._free: Dict[int, List[torch.Tensor]] = collections.defaultdict(
+            list
+        )
+
+    def _acquire(self, nbytes: int) -> torch.Tensor:
+        free = self._free.get(nbytes)
+        if free:
+            return free.pop()
+        buffer = torch.empty(nbytes, dtype=torch.uint8)
+        return buffer.share_memory_()  # type: ignore[no-untyped-call,no-any-return]
+
+    def _pack_tensor(
+        self, tensor: torch.Tensor, lease: _Lease, memo: Dict[Any, torch.Tensor]
+    ) -> torch.Tensor:
+        if tensor.layout != torch.strided or tensor.is_quantized:
+            return tensor
+        key = (
+            tensor.device,
+            tensor.untyped_storage().data_ptr(),
+            tensor.storage_offset(),
+            tensor.shape,
+            tensor.stride(),
+            tensor.dtype,
+        )
+        if key in memo:
+            # Keep tensors sharing the same data shared
+            return memo[key]
+        buffer = self._acquire(tensor.numel() * tensor.element_size())
+        lease.append(buffer)
+        packed = buffer.view(tensor.dtype).view(tensor.shape)
+        packed.copy_(tensor.detach())
+        if isinstance(tensor, torch.nn.Parameter):
+            packed = torch.nn.Parameter(
+                packed, requires_grad=tensor.requires_grad
+            )
+        memo[key] = packed
+        return packed
+
+    def _pack(self, obj: Any, lease: _Lease, memo: Dict[Any, Any]) -> Any:
+        if isinstance(obj, torch.Tensor):
+            return self._pack_tensor(obj, lease, memo)
+        if isinstance(obj, dict):
+            packed = copy.copy(obj)
+            for k, v in obj.items():
+                packed[k] = self._pack(v, lease, memo)
+            return packed
+        if isinstance(obj, (list, tuple)) and not hasattr(obj, "_fields"):
+            return type(obj)(self._pack(v, lease, memo) for v in obj)
+        return obj
+
+    def pack(self, target: Any) -> Tuple[Any, _Lease]:
+        """Copies the tensors of a target into shared memory.
+
+        Tensors in nested dicts, lists and tuples are copied, and the other
+        values are kept as they are.
+
+        Returns:
+            A tuple of the copied target and the lease of the buffers to
+            pass to :meth:`release`.
+        """
+        lease: _Lease = []
+        return self._pack(target, lease, {}), lease
+
+    def release(self, lease: _Lease) -> None:
+        """Returns the buffers of a packed target to the pool."""
+        for buffer in lease:
+            self._free[buffer.numel()].append(buffer)
+        lease.clear()
+
+    def clear(self) -> None:
+        """Frees the buffers that are not in use."""
+        self._free.clear()
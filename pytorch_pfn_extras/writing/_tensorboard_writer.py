@@ -1,8 +1,13 @@
+import sys
+import threading
+import time
 import warnings
-from typing import Any, KeysView, Optional
+from typing import Any, Dict, Iterator, KeysView, List, Optional, Tuple
 
+from pytorch_pfn_extras.profiler._time_summary import get_time_summary
 from pytorch_pfn_extras.writing._writer_base import (
     _FileSystem,
+    _report_io,
     _SaveFun,
     _TargetType,
 )
@@ -15,6 +20,11 @@ class TensorBoardWriter(object):
     object that is used to send the collected statistics to TensorBoard.
     A list of stats can be specified to report only the desired ones.
 
+    Like :class:`~pytorch_pfn_extras.writing.Writer`, the seconds spent
+    writing the statistics are reported as
+    ``pytorch_pfn_extras.writing.TensorBoardWriter:write`` to the time
+    summary in use.
+
     Args:
         savefun: Ignored.
         fs: Ignored.
@@ -32,6 +42,8 @@ class TensorBoardWriter(object):
         **kwds: Any,
     ) -> None:
         self._writer = None
+        self._time_summary = get_time_summary()
+        self._profile_tag = f"pytorch_pfn_extras.writing.{type(self).__name__}"
         try:
             import torch.utils.tensorboard
         except ImportError:
@@ -70,6 +82,21 @@ class TensorBoardWriter(object):
         """
         if self._writer is None:
             return
+        begin = time.perf_counter()
+        step, scalars = self._scalars(target)
+        for key, value in scalars:
+            self._writer.add_scalar(  # type: ignore[no-untyped-call]
+                key, value, step
+            )
+        _report_io(
+            self._time_summary,
+            self._profile_tag,
+            {"write": time.perf_counter() - begin},
+        )
+
+    def _scalars(
+        self, target: _TargetType
+    ) -> Tuple[Any, Iterator[Tuple[str, Any]]]:
         stats_cpu = target
         if isinstance(target, list):
             stats_cpu = target[-1]
@@ -79,13 +106,157 @@ class TensorBoardWriter(object):
         keys = stats_cpu.keys()
         if self._stats is not None:
             keys = self._stats  # type: ignore[assignment]
-        for key in keys:
-            value = stats_cpu[key]
-            self._writer.add_scalar(  # type: ignore[no-untyped-call]
-                key, value, stats_cpu["iteration"]
-            )
+        return stats_cpu["iteration"], ((key, stats_cpu[key]) for key in keys)
 
     def finalize(self) -> None:
         if self._writer is not None:
             self._writer.close()  # type: ignore[no-untyped-call]
             self._writer = None
+
+
+class BufferedTensorBoardWriter(TensorBoardWriter):
+    """Writer that sends statistics to TensorBoard from a background thread.
+
+    Unlike :class:`TensorBoardWriter`, a call only appends the statistics
+    to columnar buffers, and the events are created and written by a
+    background thread every ``flush_interval`` seconds, so that logging
+    many statistics at high frequency costs little to the training loop.
+    The statistics are written with the time they were given to the
+    writer, and the seconds spent writing them in the background are
+    reported as ``pytorch_pfn_extras.writing.BufferedTensorBoardWriter:write``.
+
+    Args:
+        savefun: Ignored.
+        fs: Ignored.
+        out_dir: Passed as ``log_dir`` argument to SummaryWriter.
+        stats (list): List of statistic keys.
+        flush_interval (float): Seconds between writes of the buffered
+            statistics.
+        kwds: Passed as an additional arguments to SummaryWriter.
+    """
+
+    def __init__(
+        self,
+        savefun: Optional[_SaveFun] = None,
+        fs: _FileSystem = None,
+        out_dir: str = "",
+        stats: Optional[KeysView[str]] = None,
+        flush_interval: float = 1.0,
+        **kwds: Any,
+    ) -> None:
+        self._flusher: Optional[threading.Thread] = None
+        super().__init__(savefun, fs, out_dir, stats, **kwds)
+        self._flush_interval = flush_interval
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._steps: List[Any] = []
+        self._walltimes: List[float] = []
+        # Values of each key, aligned with the steps (None if missing)
+        self._columns: Dict[str, List[Any]] = {}
+        self._closing = False
+        self._error: Optional[Exception] = None
+        if self._writer is not None:
+            self._flusher = threading.Thread(
+                target=self._flush_loop, daemon=True
+            )
+            self._flusher.start()
+
+    def __call__(
+        self,
+        filename: str,
+        out_dir: str,
+        target: _TargetType,
+        *,
+        savefun: Optional[_SaveFun] = None,
+        append: bool = False,
+    ) -> None:
+        """Buffers the statistics to send to the TensorBoard.
+
+        Args:
+            filename: Ignored.
+            out_dir: Ignored.
+            target (dict or list): The statistics of the iteration. If given as
+                a list, only the last element (assumed to be a dict containing
+                the latest iteration statistics) is reported.
+            savefun: Ignored.
+            append: Ignored.
+        """
+        if self._writer is None:
+            return
+        step, scalars = self._scalars(target)
+        walltime = time.time()
+        with self._cond:
+            row = len(self._steps)
+            self._steps.append(step)
+            self._walltimes.append(walltime)
+            for key, value in scalars:
+                column = self._columns.get(key)
+                if column is None:
+                    column = self._columns[key] = [None] * row
+                column.append(value)
+            for column in self._columns.values():
+                if len(column) == row:
+                    column.append(None)
+
+    def _flush_loop(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._closing, self._flush_interval)
+                closing = self._closing
+            try:
+                self._write_buffered()
+            except Exception as e:
+                self._error = e
+                print(
+                    "Error: BufferedTensorBoardWriter failed to write "
+                    f"statistics: {type(e).__name__}: {str(e)}",
+                    file=sys.stderr,
+                )
+            if closing:
+                return
+
+    def _write_buffered(self) -> None:
+        # Keeps the order of the events written by `flush` and the thread
+        with self._write_lock:
+            with self._cond:
+                steps, walltimes, columns = (
+                    self._steps,
+                    self._walltimes,
+                    self._columns,
+                )
+                self._steps, self._walltimes, self._columns = [], [], {}
+            if not steps:
+                return
+            assert self._writer is not None
+            begin = time.perf_counter()
+            for key, values in columns.items():
+                for step, walltime, value in zip(steps, walltimes, values):
+                    if value is not None:
+                        self._writer.add_scalar(  # type: ignore[no-untyped-call]
+                            key, value, step, walltime
+                        )
+            _report_io(
+                self._time_summary,
+                self._profile_tag,
+                {"write": time.perf_counter() - begin},
+            )
+
+    def flush(self) -> None:
+        """Writes the buffered statistics."""
+        if self._writer is None:
+            return
+        self._write_buffered()
+        self._writer.flush()  # type: ignore[no-untyped-call]
+
+    def finalize(self) -> None:
+        flusher, self._flusher = self._flusher, None
+        if flusher is not None:
+            with self._cond:
+                self._closing = True
+                self._cond.notify_all()
+            flusher.join()
+        super().finalize()
+        if flusher is not None and self._error is not None:
+            raise RuntimeError(
+                f"failed to write statistics: {self._error}"
+            ) from self._error
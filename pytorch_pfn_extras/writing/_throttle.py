@@ -0,0 +1,182 @@
+import threading
+import time
+from typing import IO, Any, Optional
+
+from pytorch_pfn_extras.profiler._time_summary import get_time_summary
+from pytorch_pfn_extras.writing._writer_base import (
+    _FileSystem,
+    _PosixFileSystem,
+)
+
+# Largest write issued at once, so that the rate is kept during the write
+_CHUNK_SIZE = 256 * 1024
+
+
+class _TokenBucket:
+    def __init__(self, rate: float, burst: float) -> None:
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, n: float) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._last) * self.rate
+            )
+            self._last = now
+            # Tokens can be borrowed, and the debt is waited for
+            self._tokens -= n
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait > 0:
+            time.sleep(wait)
+
+
+class _ThrottledFile:
+    def __init__(self, file_o: IO[Any], fs: "ThrottledFileSystem") -> None:
+        self._file_o = file_o
+        self._fs = fs
+
+    def write(self, data: Any) -> int:
+        view = memoryview(data).cast("B")
+        for pos in range(0, len(view), _CHUNK_SIZE):
+            chunk = view[pos : pos + _CHUNK_SIZE]
+            self._fs._throttle(len(chunk))
+            self._file_o.write(chunk)
+        return len(view)
+
+    def __enter__(self) -> "_ThrottledFile":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self._file_o.close()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._file_o, name)
+
+
+class ThrottledFileSystem:
+    """File system limiting the bandwidth and the rate of writes.
+
+    Wraps the file system of a writer so that writing snapshots does not
+    starve the data loading that shares the same storage, e.g.,
+    ``writing.ThreadWriter(fs=writing.ThrottledFileSystem(max_bandwidth=50e6))``.
+    Writes to the files opened by this file system are limited by token
+    buckets, which allow bursts of up to one second of writes.
+
+    With ``adaptive=True``, the bandwidth is adjusted every ``interval``
+    seconds from the times of ``latency_tag`` reported to
+    :func:`~pytorch_pfn_extras.profiler.get_time_summary` of the thread
+    that created this file system (by default, the time
+    :class:`~pytorch_pfn_extras.training.Trainer` waits for data).
+    When the mean time of the last interval exceeds the lowest one seen by
+    more than ``tolerance``, the bandwidth is halved down to
+    ``min_bandwidth``. Otherwise it is increased by a tenth of
+    ``max_bandwidth``.
+
+    Args:
+        fs: File system to wrap. Defaults to the local file system.
+        max_bandwidth: Maximum bytes written per second.
+        max_iops: Maximum write calls per second. Unlimited by default.
+        adaptive: Whether to adjust the bandwidth from the data loading
+            times.
+        latency_tag: Tag of the times watched in the adaptive mode.
+        min_bandwidth: Lowest bandwidth in the adaptive mode. Defaults to a
+            tenth of ``max_bandwidth``.
+        tolerance: Relative increase of the times considered a slowdown.
+        interval: Seconds between adjustments.
+    """
+
+    def __init__(
+        self,
+        fs: _FileSystem = None,
+        max_bandwidth: float = 100e6,
+        max_iops: Optional[float] = None,
+        adaptive: bool = False,
+        latency_tag: str = "pytorch_pfn_extras.training.Trainer:get_data",
+        min_bandwidth: Optional[float] = None,
+        tolerance: float = 0.2,
+        interval: float = 1.0,
+    ) -> None:
+        if max_bandwidth <= 0 or (max_iops is not None and max_iops <= 0):
+            raise ValueError("max_bandwidth and max_iops must be positive")
+        self._fs = fs or _PosixFileSystem()
+        self._max_bandwidth = max_bandwidth
+        self._min_bandwidth = min_bandwidth or max_bandwidth / 10
+        self._bandwidth = _TokenBucket(max_bandwidth, max_bandwidth)
+        self._iops = None
+        if max_iops is not None:
+            self._iops = _TokenBucket(max_iops, max_iops)
+        self._adaptive = adaptive
+        self._latency_tag = latency_tag
+        # The summary is per thread, and writes may come from other threads
+        self._time_summary = get_time_summary()
+        self._tolerance = tolerance
+        self._interval = interval
+        self._next_adapt = time.monotonic() + interval
+        self._adapt_lock = threading.Lock()
+        self._last_total = (0.0, 0.0)
+        # Statistics of the tag replaced when the summary is cleared
+        self._last_stats: Any = None
+        self._best_latency: Optional[float] = None
+
+    @property
+    def bandwidth(self) -> float:
+        """Current maximum bytes written per second."""
+        return self._bandwidth.rate
+
+    def _throttle(self, nbytes: int) -> None:
+        if (
+            self._adaptive
+            and time.monotonic() >= self._next_adapt
+            # Adjusted by one of the threads writing concurrently
+            and self._adapt_lock.acquire(blocking=False)
+        ):
+            try:
+                self._next_adapt = time.monotonic() + self._interval
+                self._adapt()
+            finally:
+                self._adapt_lock.release()
+        if self._iops is not None:
+            self._iops.acquire(1)
+        self._bandwidth.acquire(nbytes)
+
+    def _adapt(self) -> None:
+        with self._time_summary.summary() as (summary, _):
+            stats = summary._summaries.get(self._latency_tag)
+            total = (0.0, 0.0)
+            if stats is not None:
+                total = (float(stats._x), float(stats._n))
+        last = self._last_total
+        if stats is not self._last_stats:
+            # The summary has been cleared since the last adjustment
+            last = (0.0, 0.0)
+        x, n = total[0] - last[0], total[1] - last[1]
+        self._last_stats = stats
+        self._last_total = total
+        if n <= 0:
+            return
+        latency = x / n
+        best = self._best_latency
+        if best is None or latency < best:
+            best = self._best_latency = latency
+        if latency > best * (1 + self._tolerance):
+            rate = max(self._min_bandwidth, self._bandwidth.rate / 2)
+        else:
+            rate = min(
+                self._max_bandwidth,
+                self._bandwidth.rate + self._max_bandwidth / 10,
+            )
+        self._bandwidth.rate = rate
+        self._bandwidth.burst = rate
+
+    def open(self, file_path: str, mode: str = "r", *args: Any) -> Any:
+        file_o = self._fs.open(file_path, mode, *args)
+        if "r" in mode and "+" not in mode:
+            return file_o
+        return _ThrottledFile(file_o, self)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._fs, name)
@@ -0,0 +1,363 @@
+import collections
+import copy
+import os
+import sys
+import threading
+import time
+from typing import IO, Any, Deque, Dict, Iterator, Optional, Set
+
+import torch
+from pytorch_pfn_extras.writing._simple_writer import SimpleWriter
+from pytorch_pfn_extras.writing._writer_base import (
+    Writer,
+    _FileSystem,
+    _PosixFileSystem,
+    _SaveFun,
+    _TargetType,
+)
+
+
+class _TieredFileSystem:
+    """View of the files of the local and the durable tiers.
+
+    Paths are given in the durable output directory. A file is found in
+    the local tier while it is staged there, and in the durable tier after
+    it has been migrated.
+    """
+
+    def __init__(self, writer: "TieredWriter", durable_fs: _FileSystem) -> None:
+        self._writer = writer
+        self.local_fs = _PosixFileSystem()
+        self.durable_fs = durable_fs
+
+    def local_path(self, path: str) -> Optional[str]:
+        rel = os.path.relpath(path, self._writer.out_dir or ".")
+        if rel.startswith(os.pardir):
+            return None
+        return os.path.normpath(os.path.join(self._writer.local_dir, rel))
+
+    def _local(self, path: str) -> Optional[str]:
+        local = self.local_path(path)
+        if local is not None and self.local_fs.exists(local):
+            return local
+        return None
+
+    def open(self, file_path: str, mode: str = "r", *args: Any) -> IO[Any]:
+        local = self._local(file_path)
+        if local is not None and "r" in mode and "+" not in mode:
+            return self.local_fs.open(local, mode, *args)
+        return self.durable_fs.open(  # type: ignore[no-any-return]
+            file_path, mode, *args
+        )
+
+    def list(
+        self, path_or_prefix: Optional[str] = None, recursive: bool = False
+    ) -> Iterator[str]:
+        names = set()
+        if path_or_prefix is None or self.durable_fs.exists(path_or_prefix):
+            names.update(self.durable_fs.list(path_or_prefix, recursive))
+        local = None if path_or_prefix is None else self._local(path_or_prefix)
+        if local is not None:
+            names.update(self.local_fs.list(local, recursive))
+        for name in sorted(names):
+            # Files being written are not visible
+            if not os.path.basename(name).startswith("tmp_"):
+                yield name
+
+    def stat(self, path: str) -> Any:
+        local = self._local(path)
+        if local is not None:
+            return self.local_fs.stat(local)
+        stat = copy.copy(self.durable_fs.stat(path))
+        # Keeps the order of the snapshots migrated in the meantime
+        mtime = self._writer._mtimes.get(os.path.normpath(path))
+        if mtime is not None:
+            stat.last_modified = mtime
+        return stat
+
+    def exists(self, file_path: str) -> bool:
+        return self._local(file_path) is not None or bool(
+            self.durable_fs.exists(file_path)
+        )
+
+    def isdir(self, file_path: str) -> bool:
+        return bool(self.durable_fs.isdir(file_path))
+
+    def makedirs(
+        self, file_path: str, mode: int = 0o777, exist_ok: bool = False
+    ) -> None:
+        self.durable_fs.makedirs(file_path, mode, exist_ok)
+        local = self.local_path(file_path)
+        if local is not None:
+            self.local_fs.makedirs(local, mode, exist_ok=True)
+
+    def remove(self, file_path: str, recursive: bool = False) -> None:
+        # The file being replaced in the durable tier is removed by the
+        # migration thread once it is in place
+        replacing = self._writer._cancel(file_path)
+        local = self._local(file_path)
+        if local is not None:
+            self.local_fs.remove(local, recursive)
+        if not replacing and self.durable_fs.exists(file_path):
+            self.durable_fs.remove(file_path, recursive)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.durable_fs, name)
+
+
+class TieredWriter(Writer):
+    """Snapshot writer that stages snapshots in a fast local directory.
+
+    Snapshots are first written to ``local_dir`` (e.g., a local SSD), which
+    is as fast as writing to a local disk, and then copied to ``out_dir``
+    (e.g., a network filesystem) by a background thread, at most at
+    ``max_bandwidth`` bytes per second. The local copy is removed after the
+    migration unless ``keep_local`` is set. The snapshots left in
+    ``local_dir`` by a previous run that are missing or older in
+    ``out_dir`` are migrated again when the writer is created.
+
+    The file system of this writer (``writer.fs``) shows the files of both
+    directories in ``out_dir``, so that
+    :meth:`~pytorch_pfn_extras.training.extensions.snapshot` finds the
+    latest snapshot in either of them with ``autoload``, and removes the
+    stale ones from both with ``n_retains``.
+
+    Args:
+        local_dir: Directory of the local tier.
+        savefun: Callable object. It takes three arguments: the output file
+            path, the serialized dictionary object, and the optional keyword
+            arguments.
+        fs: FileSystem of the durable tier.
+            optional, defaults to None
+        out_dir: str. Specifies the directory of the durable tier.
+            It takes precedence over the one specified in `__call__`
+            optional, defaults to ``''``
+        max_bandwidth: Maximum bytes per second copied to the durable tier.
+            Unlimited by default.
+        keep_local: Whether to keep the local copies after the migration.
+        kwds: Keyword arguments for the ``savefun``.
+
+    .. seealso::
+
+        - :meth:`pytorch_pfn_extras.training.extensions.snapshot`
+    """
+
+    _chunk_size = 64 * 1024
+
+    def __init__(
+        self,
+        local_dir: str,
+        savefun: _SaveFun = torch.save,
+        fs: _FileSystem = None,
+        out_dir: str = "",
+        max_bandwidth: Optional[float] = None,
+        keep_local: bool = False,
+        **kwds: Any,
+    ) -> None:
+        # Nothing to finalize until the migration thread is started
+        self._finalized = True
+        super().__init__(fs=fs, out_dir=out_dir)
+        self.local_dir = local_dir
+        self._tiered_fs = _TieredFileSystem(self, self.fs)
+        self.fs = self._tiered_fs
+        self._local_writer = SimpleWriter(
+            savefun=savefun, out_dir=local_dir, **kwds
+        )
+        # The snapshots are recorded in the manifest of the durable tier
+        self._local_writer._use_manifest = False
+        self._local_writer._profile_tag = self._profile_tag
+        self._max_bandwidth = max_bandwidth
+        self._keep_local = keep_local
+        self._mtimes: Dict[str, float] = {}
+        self._pending: Deque[str] = collections.deque()
+        self._cancelled: Set[str] = set()
+        self._cond = threading.Condition()
+        self._busy = False
+        # File being renamed in place in the durable tier
+        self._replacing: Optional[str] = None
+        self._closing = False
+        self._error: Optional[Exception] = None
+        self._recover()
+        self._finalized = False
+        self._migrator = threading.Thread(
+            target=self._migrate_loop, daemon=True
+        )
+        self._migrator.start()
+
+    def __call__(
+        self,
+        filename: str,
+        out_dir: str,
+        target: _TargetType,
+        *,
+        savefun: Optional[_SaveFun] = None,
+        append: bool = False,
+    ) -> None:
+        assert not self._finalized
+        if not self._initialized:
+            self.initialize(self.out_dir)
+        self._local_writer(
+            filename, self.local_dir, target, savefun=savefun, append=append
+        )
+        path = os.path.normpath(os.path.join(self.out_dir, filename))
+        local = os.path.join(self.local_dir, filename)
+        with self._cond:
+            self._mtimes[path] = self._tiered_fs.local_fs.stat(
+                local
+            ).last_modified
+            self._cancelled.discard(path)
+            self._pending.append(path)
+            self._cond.notify_all()
+        self._record_snapshot(filename)
+        self._post_save()
+
+    def _recover(self) -> None:
+        # Queues the snapshots staged by a previous run that were not
+        # migrated before it stopped
+        local_fs = self._tiered_fs.local_fs
+        durable_fs = self._tiered_fs.durable_fs
+        if not local_fs.exists(self.local_dir):
+            return
+        for name in sorted(local_fs.list(self.local_dir)):
+            if name.startswith("tmp_") or name.endswith(".bak"):
+                # Left by an interrupted write of the local tier
+                continue
+            local = os.path.join(self.local_dir, name)
+            if local_fs.isdir(local):
+                continue
+            mtime = local_fs.stat(local).last_modified
+            path = os.path.normpath(os.path.join(self.out_dir, name))
+            if (
+                durable_fs.exists(path)
+                and durable_fs.stat(path).last_modified >= mtime
+            ):
+                if not self._keep_local:
+                    # Migrated before the local copy was removed
+                    local_fs.remove(local)
+                continue
+            self._mtimes[path] = mtime
+            self._pending.append(path)
+
+    def _cancel(self, path: str) -> bool:
+        # Returns whether the migration thread removes the durable file
+        path = os.path.normpath(path)
+        with self._cond:
+            self._mtimes.pop(path, None)
+            if path == self._replacing:
+                self._cancelled.add(path)
+                return True
+            if path in self._pending or self._busy:
+                self._cancelled.add(path)
+            return False
+
+    def _migrate_loop(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._closing)
+                if not self._pending:
+                    return
+                path = self._pending.popleft()
+                if path in self._cancelled:
+                    self._cancelled.discard(path)
+                    continue
+                self._busy = True
+            try:
+                self._migrate(path)
+            except Exception as e:
+                self._error = e
+                print(
+                    f'Error: TieredWriter failed to migrate "{path}": '
+                    f"{type(e).__name__}: {str(e)}",
+                    file=sys.stderr,
+                )
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+    def _migrate(self, path: str) -> None:
+        local = self._tiered_fs.local_path(path)
+        assert local is not None
+        durable_fs = self._tiered_fs.durable_fs
+        local_fs = self._tiered_fs.local_fs
+        tmppath = os.path.join(
+            os.path.dirname(path), f"tmp_{os.path.basename(path)}"
+        )
+        begin = time.perf_counter()
+        copied = 0
+        with local_fs.open(local, "rb") as src, durable_fs.open(
+            tmppath, "wb"
+        ) as dst:
+            while True:
+                chunk = src.read(self._chunk_size)
+                if not chunk or path in self._cancelled:
+                    break
+                dst.write(chunk)
+                copied += len(chunk)
+                if self._max_bandwidth is not None:
+                    wait = copied / self._max_bandwidth - (
+                        time.perf_counter() - begin
+                    )
+                    if wait > 0:
+                        time.sleep(wait)
+        self._report_io(
+            {"migrate": time.perf_counter() - begin, "migrate_bytes": copied}
+        )
+        with self._cond:
+            cancelled = path in self._cancelled
+            if cancelled:
+                self._cancelled.discard(path)
+            else:
+                self._replacing = path
+        if cancelled:
+            # Removed during the migration
+            durable_fs.remove(tmppath)
+            return
+        # The durable tier may be slow, so the training thread is not
+        # blocked while the file is replaced
+        try:
+            self._replace_file(tmppath, path, durable_fs)
+        finally:
+            with self._cond:
+                self._replacing = None
+                cancelled = path in self._cancelled
+                self._cancelled.discard(path)
+                if (
+                    not cancelled
+                    and not self._keep_local
+                    and path not in self._pending
+                ):
+                    local_fs.remove(local)
+        if cancelled:
+            # Removed while it was replaced
+            durable_fs.remove(path)
+        if self._use_manifest and self._snapshot_affixes:
+            # Records the state of the durable directory after the migration
+            self._append_manifest([])
+
+    def _directory_mtime(self) -> Optional[float]:
+        # The manifest is kept in the durable directory, which is changed by
+        # the migrations
+        try:
+            stat = self._tiered_fs.durable_fs.stat(self.out_dir or ".")
+            return float(stat.last_modified)
+        except (OSError, AttributeError, TypeError):
+            return None
+
+    def synchronize(self) -> None:
+        """Waits until all the snapshots are migrated."""
+        with self._cond:
+            self._cond.wait_for(lambda: not self._pending and not self._busy)
+
+    def finalize(self) -> None:
+        if self._finalized:
+            return
+        self._finalized = True
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        self._migrator.join()
+        if self._error is not None:
+            raise RuntimeError(
+                f"failed to migrate a snapshot: {self._error}"
+            ) from self._error
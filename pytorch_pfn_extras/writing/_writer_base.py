@@ -1,26 +1,34 @@
 import io
+import json
 import multiprocessing
 import os
 import shutil
 import sys
 import threading
+import time
 import types
 from typing import (
     IO,
     Any,
     Callable,
+    Dict,
     Generic,
     Iterator,
     List,
     Mapping,
     Optional,
     Sequence,
+    Tuple,
     Type,
     TypeVar,
     Union,
 )
 
 import torch
+from pytorch_pfn_extras.profiler._time_summary import (
+    TimeSummary,
+    get_time_summary,
+)
 
 _TargetType = Union[Sequence[Any], Mapping[str, Any]]
 _SaveFun = Callable[..., None]
@@ -29,6 +37,50 @@ _TaskFun = Callable[..., None]
 _Worker = TypeVar("_Worker", threading.Thread, multiprocessing.Process)
 _FileSystem = Any
 
+# Log of the snapshots written in an output directory, one JSON per line.
+# It is only appended to, so that the lines of concurrent writers are kept
+_MANIFEST = ".ppe_snapshots.jsonl"
+
+
+def _format_affixes(fmt: str) -> Tuple[str, str]:
+    # Only the prefix and the suffix of the snapshot file names are known
+    return fmt.split("{")[0], fmt.split("}")[-1]
+
+
+class _Manifest:
+    """State of the manifest parsed up to an offset of the file.
+
+    Only the lines appended since the last read are parsed, so that a long
+    manifest is cheap to read again.
+    """
+
+    def __init__(self) -> None:
+        self.files: Dict[str, float] = {}
+        self.formats: List[str] = []
+        # mtime of the directory when the manifest was last updated
+        self.dir_mtime: Optional[float] = None
+        self.offset = 0
+
+    def parse(self, data: bytes) -> None:
+        # A line still being written is parsed with its rest on the next read
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].decode(errors="replace").splitlines():
+            try:
+                entry = json.loads(line)
+                if "add" in entry:
+                    self.files.pop(entry["add"], None)
+                    self.files[str(entry["add"])] = float(entry["mtime"])
+                elif "remove" in entry:
+                    self.files.pop(entry["remove"], None)
+                elif "dir_mtime" in entry:
+                    self.dir_mtime = float(entry["dir_mtime"])
+                elif entry["format"] not in self.formats:
+                    self.formats.append(str(entry["format"]))
+            except (ValueError, KeyError, TypeError):
+                # E.g., a line partially written by a terminated process
+                continue
+        self.offset += end
+
 
 class _PosixFileStat:
     def __init__(self, _stat: os.stat_result, filename: str) -> None:
@@ -203,6 +255,36 @@ class _PosixFileSystem(object):
         return os.remove(file_path)
 
 
+def _report_io(
+    time_summary: TimeSummary, tag: str, values: Mapping[str, float]
+) -> None:
+    # Reported only while the summary is in use, e.g., by `ProfileReport`.
+    # Forked writer processes report through the queue of the summary
+    if not time_summary._initialized:
+        return
+    for name, value in values.items():
+        time_summary._put(f"{tag}:{name}", value)
+
+
+class _CountingFile:
+    """File object counting the bytes written and the time to write them."""
+
+    def __init__(self, file_o: IO[Any]) -> None:
+        self._file_o = file_o
+        self.nbytes = 0
+        self.write_time = 0.0
+
+    def write(self, data: Any) -> int:
+        begin = time.perf_counter()
+        n = self._file_o.write(data)
+        self.write_time += time.perf_counter() - begin
+        self.nbytes += memoryview(data).nbytes if n is None else n
+        return n
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._file_o, name)
+
+
 class Writer:
 
     """Base class of snapshot writers.
@@ -217,11 +299,40 @@ class Writer:
        right before the renaming, the temporary file might be left in the
        output directory.
 
+    .. note::
+       The snapshots taken by
+       :meth:`~pytorch_pfn_extras.training.extensions.snapshot` are
+       recorded in a manifest file (``.ppe_snapshots.jsonl``) in the output
+       directory, which it uses to find the latest and the stale snapshots
+       without listing the directory. Each snapshot appends a line to the
+       manifest, which is rewritten only when most of its lines are about
+       removed files. Other files (e.g., logs) are not recorded. The
+       directory is listed again when the manifest is found inconsistent.
+
+    .. note::
+       While the :func:`~pytorch_pfn_extras.profiler.get_time_summary` of
+       the thread that created the writer is in use (e.g., by
+       :class:`~pytorch_pfn_extras.training.extensions.ProfileReport`),
+       each file written reports the following values to it, with tags
+       prefixed by ``pytorch_pfn_extras.writing.<class name>:``.
+
+       - ``serialize``: seconds spent in ``savefun`` outside of writes.
+       - ``write``: seconds spent writing and closing the file.
+       - ``bytes``: bytes written.
+       - ``throughput``: bytes written per second of ``write``.
+       - ``rename``: seconds spent replacing the file.
+
+       Writers with a queue also report ``queue_wait``, the seconds a
+       snapshot waited in the queue.
+
     .. seealso::
 
         - :meth:`pytorch_pfn_extras.training.extensions.snapshot`
     """
 
+    # Whether the snapshots written are recorded in the manifest
+    _use_manifest = True
+
     def __init__(
         self,
         fs: _FileSystem = None,
@@ -231,6 +342,13 @@ class Writer:
         self.fs = fs or _PosixFileSystem()
         self.out_dir = out_dir
         self._initialized = False
+        # Prefixes and suffixes of the snapshots recorded in the manifest
+        self._snapshot_affixes: List[Tuple[str, str]] = []
+        self._manifest = _Manifest()
+        self._manifest_lock = threading.Lock()
+        # The summary is per thread, and files are written by other threads
+        self._time_summary = get_time_summary()
+        self._profile_tag = f"pytorch_pfn_extras.writing.{type(self).__name__}"
 
     def __call__(
         self,
@@ -271,6 +389,20 @@ class Writer:
     def __del__(self) -> None:
         self.finalize()
 
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        # Time summaries are not picklable, e.g., for the tasks of queues
+        del state["_time_summary"]
+        del state["_manifest_lock"]
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        # A process forked from the thread that created the writer has a
+        # copy of its summary, which reports to the original one
+        self._time_summary = get_time_summary()
+        self._manifest_lock = threading.Lock()
+
     def finalize(self) -> None:
         """Finalizes the writer.
 
@@ -292,32 +424,233 @@ class Writer:
 
         dest = os.path.join(out_dir, filename)
 
+        begin = time.perf_counter()
         if append:
             with self.fs.open(dest, "ab") as f:
                 # HDFS does not support overwrite
-                savefun(target, f, **savefun_kwargs)
+                counted = _CountingFile(f)
+                savefun(target, counted, **savefun_kwargs)
+                serialized = time.perf_counter()
+            saved = renamed = time.perf_counter()
         else:
             # Some filesystems are not compatible with temp folders, etc
             # so we rely on raw temp files
             prefix = "tmp_{}".format(filename)
             tmppath = os.path.join(out_dir, prefix)
-            make_backup = self.fs.exists(dest)
             with self.fs.open(tmppath, "wb") as f:
-                savefun(target, f, **savefun_kwargs)
-            if make_backup:
-                bak = "{}.bak".format(dest)
-                # Check if another backup file exists
-                # due to some unexpected termination of an earlier
-                # process
-                if self.fs.exists(bak):
-                    self.fs.remove(bak)
-                self.fs.rename(dest, bak)
-            self.fs.rename(tmppath, dest)
-            if make_backup:
-                self.fs.remove(bak)
-
+                counted = _CountingFile(f)
+                savefun(target, counted, **savefun_kwargs)
+                serialized = time.perf_counter()
+            saved = time.perf_counter()
+            self._replace_file(tmppath, dest)
+            renamed = time.perf_counter()
+            self._record_snapshot(filename)
+
+        write_time = counted.write_time + saved - serialized
+        self._report_io(
+            {
+                "serialize": serialized - begin - counted.write_time,
+                "write": write_time,
+                "bytes": counted.nbytes,
+                "throughput": counted.nbytes / max(write_time, 1e-9),
+                "rename": renamed - saved,
+            }
+        )
         self._post_save()
 
+    def _report_io(self, values: Mapping[str, float]) -> None:
+        _report_io(self._time_summary, self._profile_tag, values)
+
+    def _replace_file(
+        self, tmppath: str, dest: str, fs: _FileSystem = None
+    ) -> None:
+        """Renames a file to the destination, replacing the existing one.
+
+        Args:
+            tmppath (str): Path of the file to rename.
+            dest (str): Path of the destination.
+            fs: FileSystem of the files, defaults to the one of the writer.
+        """
+        if fs is None:
+            fs = self.fs
+        make_backup = fs.exists(dest)
+        if make_backup:
+            # HDFS does not support overwrite
+            bak = "{}.bak".format(dest)
+            # Check if another backup file exists
+            # due to some unexpected termination of an earlier
+            # process
+            if fs.exists(bak):
+                fs.remove(bak)
+            fs.rename(dest, bak)
+        fs.rename(tmppath, dest)
+        if make_backup:
+            fs.remove(bak)
+
+    def _track_snapshots(self, fmt: str) -> None:
+        """Records the snapshots matching a format in the manifest.
+
+        The snapshots written before are looked up in the output directory
+        once, unless the manifest already records the format.
+
+        Args:
+            fmt (str): Format string of the snapshot file names.
+        """
+        affixes = _format_affixes(fmt)
+        if affixes in self._snapshot_affixes:
+            return
+        self._snapshot_affixes.append(affixes)
+        if not self._use_manifest:
+            return
+        manifest = self._load_manifest()
+        if manifest is not None and fmt in manifest[1]:
+            return
+        if not self._initialized:
+            self.initialize(self.out_dir)
+        recorded = {} if manifest is None else manifest[0]
+        prefix, suffix = affixes
+        files = []
+        for name in self.fs.list(self.out_dir):
+            if (
+                name.startswith(prefix)
+                and name.endswith(suffix)
+                and name not in recorded
+            ):
+                path = os.path.join(self.out_dir, name)
+                files.append((self.fs.stat(path).last_modified, name))
+        entries: List[Dict[str, Any]] = [
+            {"add": name, "mtime": mtime} for mtime, name in sorted(files)
+        ]
+        self._append_manifest(entries + [{"format": fmt}])
+
+    def _record_snapshot(self, filename: str) -> None:
+        """Appends a snapshot to the manifest as the latest one.
+
+        The other files written while snapshots are tracked only update the
+        state of the directory recorded in the manifest.
+        """
+        if not self._use_manifest or not self._snapshot_affixes:
+            return
+        entries = []
+        if any(
+            filename.startswith(prefix) and filename.endswith(suffix)
+            for prefix, suffix in self._snapshot_affixes
+        ):
+            path = os.path.join(self.out_dir, filename)
+            mtime = self.fs.stat(path).last_modified
+            entries.append({"add": filename, "mtime": mtime})
+        self._append_manifest(entries)
+
+    def _forget_files(self, filenames: Sequence[str]) -> None:
+        """Removes files from the manifest."""
+        if not self._use_manifest:
+            return
+        self._append_manifest([{"remove": name} for name in filenames])
+
+    def _directory_mtime(self) -> Optional[float]:
+        # Changes when a file is added to or removed from the directory
+        try:
+            stat = self.fs.stat(self.out_dir or ".")
+            return float(stat.last_modified)
+        except (OSError, AttributeError, TypeError):
+            # Not supported by the file system
+            return None
+
+    def _append_manifest(self, entries: Sequence[Dict[str, Any]]) -> None:
+        path = os.path.join(self.out_dir, _MANIFEST)
+        if not self.fs.exists(path):
+            # Creating the manifest changes the directory
+            with self.fs.open(path, "ab"):
+                pass
+        # The state of the directory is recorded after the changes of the
+        # writer, so that the files changed by others are found later
+        dir_mtime = self._directory_mtime()
+        if dir_mtime is not None:
+            entries = list(entries) + [{"dir_mtime": dir_mtime}]
+        # A single write, so that the lines of different writers are not
+        # interleaved. It starts on a new line in case a terminated process
+        # left a partial one
+        data = "".join("\n" + json.dumps(entry) for entry in entries) + "\n"
+        with self.fs.open(path, "ab") as f:
+            f.write(data.encode())
+
+    def _load_manifest(
+        self,
+    ) -> Optional[Tuple[Dict[str, float], List[str], Optional[float]]]:
+        # Returns the recorded files, the formats and the directory mtime
+        path = os.path.join(self.out_dir, _MANIFEST)
+        with self._manifest_lock:
+            if not self.fs.exists(path):
+                self._manifest = _Manifest()
+                return None
+            manifest = self._manifest
+            size = getattr(self.fs.stat(path), "size", None)
+            if size is not None and size < manifest.offset:
+                # Created again since the last read
+                manifest = self._manifest = _Manifest()
+            with self.fs.open(path, "rb") as f:
+                if manifest.offset:
+                    f.seek(manifest.offset)
+                manifest.parse(f.read())
+            return (
+                dict(manifest.files),
+                list(manifest.formats),
+                manifest.dir_mtime,
+            )
+
+    def _sync_manifest(
+        self, files: Dict[str, float], formats: Sequence[str]
+    ) -> Dict[str, float]:
+        # Updates the manifest from the directory listing
+        affixes = [_format_affixes(fmt) for fmt in formats]
+        listed = {
+            name
+            for name in self.fs.list(self.out_dir)
+            if any(
+                name.startswith(prefix) and name.endswith(suffix)
+                for prefix, suffix in affixes
+            )
+        }
+        added = sorted(
+            (self.fs.stat(os.path.join(self.out_dir, name)).last_modified, name)
+            for name in listed
+            if name not in files
+        )
+        entries: List[Dict[str, Any]] = [
+            {"remove": name} for name in files if name not in listed
+        ]
+        entries += [{"add": name, "mtime": mtime} for mtime, name in added]
+        self._append_manifest(entries)
+        synced = {name: t for name, t in files.items() if name in listed}
+        synced.update((name, mtime) for mtime, name in added)
+        return synced
+
+    def _read_manifest(self, fmt: str) -> Optional[Dict[str, float]]:
+        """Reads the snapshots recorded in the manifest of the output directory.
+
+        The manifest is updated from the directory listing when the
+        directory has been changed since the last update of the manifest,
+        e.g., by another writer or by a process terminated before recording
+        its snapshot.
+
+        Args:
+            fmt (str): Format string of the snapshot file names.
+
+        Returns:
+            A dict from the file names to their mtime, in the order they were
+            recorded, or ``None`` if the manifest does not record the format.
+        """
+        if not self._use_manifest:
+            return None
+        manifest = self._load_manifest()
+        if manifest is None or fmt not in manifest[1]:
+            return None
+        files, formats, dir_mtime = manifest
+        current = self._directory_mtime()
+        if current is not None and current != dir_mtime:
+            files = self._sync_manifest(files, formats)
+        return files
+
     def _add_cleanup_hook(self, hook_fun: _HookFun) -> None:
         """Adds cleanup hook function.
 
@@ -0,0 +1,106 @@
+import pytest
+from pytorch_pfn_extras.distributed import (
+    DistributedSubsetSampler,
+    create_distributed_subset_indices,
+    iterate_distributed_subset_indices,
+)
+
+
+@pytest.mark.parametrize("num_total_samples", [1, 2, 10, 17, 64, 1000])
+def test_permutation(num_total_samples):
+    indices = list(
+        iterate_distributed_subset_indices(
+            num_total_samples, num_replicas=1, rank=0, seed=0
+        )
+    )
+    assert sorted(indices) == list(range(num_total_samples))
+
+
+def test_not_shuffle():
+    for rank in range(3):
+        indices = iterate_distributed_subset_indices(
+            num_total_samples=10, num_replicas=3, rank=rank, shuffle=False
+        )
+        expected = create_distributed_subset_indices(
+            num_total_samples=10, num_replicas=3, rank=rank, shuffle=False
+        )
+        assert list(indices) == expected
+
+
+def test_shuffle():
+    indices = [
+        list(
+            iterate_distributed_subset_indices(
+                num_total_samples=100, num_replicas=3, rank=rank, seed=1
+            )
+        )
+        for rank in range(3)
+    ]
+    assert [len(i) for i in indices] == [34, 34, 34]
+    assert set(sum(indices, [])) == set(range(100))
+    assert indices[0] != list(range(34))
+
+
+def test_deterministic():
+    def indices(seed, epoch):
+        return list(
+            iterate_distributed_subset_indices(
+                100, num_replicas=2, rank=1, seed=seed, epoch=epoch
+            )
+        )
+
+    assert indices(0, 0) == indices(0, 0)
+    assert indices(0, 0) != indices(0, 1)
+    assert indices(0, 0) != indices(1, 0)
+
+
+def test_start():
+    indices = list(
+        iterate_distributed_subset_indices(
+            100, num_replicas=2, rank=0, seed=0, epoch=3
+        )
+    )
+    resumed = list(
+        iterate_distributed_subset_indices(
+            100, num_replicas=2, rank=0, seed=0, epoch=3, start=20
+        )
+    )
+    assert resumed == indices[20:]
+
+
+def test_sampler():
+    samplers = [
+        DistributedSubsetSampler(range(10), num_replicas=3, rank=rank)
+        for rank in range(3)
+    ]
+    assert [len(s) for s in samplers] == [4, 4, 4]
+    epoch0 = [list(s) for s in samplers]
+    assert [list(s) for s in samplers] == epoch0
+    for s in samplers:
+        s.set_epoch(1)
+    epoch1 = [list(s) for s in samplers]
+    assert epoch1 != epoch0
+    for indices in (epoch0, epoch1):
+        assert set(sum(indices, [])) == set(range(10))
+
+
+def test_sampler_resume():
+    sampler = DistributedSubsetSampler(range(100), num_replicas=2, rank=0)
+    sampler.set_epoch(2)
+    expected = list(sampler)
+
+    it = iter(sampler)
+    consumed = [next(it) for _ in range(7)]
+    state = sampler.state_dict()
+    assert state == {"epoch": 2, "offset": 7}
+
+    sampler = DistributedSubsetSampler(range(100), num_replicas=2, rank=0)
+    sampler.load_state_dict(state)
+    assert consumed + list(sampler) == expected
+    # The next iteration starts from the beginning of the epoch
+    assert list(sampler) == expected
+
+
+def test_sampler_invalid_rank():
+    with pytest.raises(ValueError):
+        DistributedSubsetSampler(range(10), num_replicas=2, rank=2)
@@ -0,0 +1,107 @@
+import os
+import sys
+import tempfile
+import urllib.request
+
+import pytest
+import pytorch_pfn_extras as ppe
+import torch
+from pytorch_pfn_extras.training.extensions.evaluator import (
+    _dist_all_reduce_summary,
+)
+from torch import distributed as dist
+from torch import multiprocessing as mp
+
+context = mp.get_context("spawn")
+
+_world_size = 4
+_local_size = 2
+
+
+def _run(init_file, rank):
+    init_method = "file://{}".format(urllib.request.pathname2url(init_file))
+    dist.init_process_group(
+        backend="gloo",
+        init_method=init_method,
+        world_size=_world_size,
+        rank=rank,
+    )
+    groups = ppe.distributed.HierarchicalGroups(local_size=_local_size)
+
+    reduced = torch.arange(5, dtype=torch.float32) * (rank + 1)
+    ppe.distributed.hierarchical_all_reduce(reduced, groups)
+
+    broadcasted = torch.full((3,), float(rank))
+    ppe.distributed.hierarchical_broadcast(broadcasted, groups)
+
+    gathered = ppe.distributed.hierarchical_all_gather_object(
+        {"rank": rank}, groups
+    )
+
+    summary = ppe.reporting.DictSummary()
+    summary.add({"loss": float(rank)})
+    if rank == 3:
+        summary.add({"extra": 1.0})
+    flat_summary = _dist_all_reduce_summary(summary)
+    hierarchical_summary = _dist_all_reduce_summary(summary, groups)
+
+    module = torch.nn.Linear(1, 1, bias=False)
+    module.weight.data.fill_(float(rank))
+    ddp = ppe.nn.parallel.DistributedDataParallel(module, hierarchical=groups)
+    ddp(torch.tensor([[float(rank + 1)]])).sum().backward()
+
+    return (
+        groups.local_rank,
+        groups.node_rank,
+        reduced,
+        broadcasted,
+        gathered,
+        flat_summary.compute_mean(),
+        hierarchical_summary.compute_mean(),
+        ddp.module.weight.data.clone(),
+        ddp.module.weight.grad.clone(),
+    )
+
+
+@pytest.mark.skipif(
+    sys.platform == "win32", reason="DDP not fully supported on Windows"
+)
+def test_hierarchical_collectives():
+    with tempfile.TemporaryDirectory() as tmpdir, context.Pool(
+        _world_size
+    ) as pool:
+        init_file = os.path.join(tmpdir, "init")
+        procs = [
+            pool.apply_async(_run, args=(init_file, rank))
+            for rank in range(_world_size)
+        ]
+        results = [p.get() for p in procs]
+
+    expected_sum = torch.arange(5, dtype=torch.float32) * 10
+    for rank, (
+        local_rank,
+        node_rank,
+        reduced,
+        broadcasted,
+        gathered,
+        flat_mean,
+        hierarchical_mean,
+        weight,
+        grad,
+    ) in enumerate(results):
+        assert local_rank == rank % _local_size
+        assert node_rank == rank // _local_size
+        assert torch.equal(reduced, expected_sum)
+        assert torch.equal(broadcasted, torch.zeros(3))
+        assert gathered == [{"rank": r} for r in range(_world_size)]
+        assert flat_mean == {"loss": 1.5, "extra": 1.0}
+        assert hierarchical_mean == flat_mean
+        # Initial parameters are broadcast from rank 0
+        assert weight.item() == 0.0
+        # Gradients are averaged: mean of (1, 2, 3, 4)
+        assert grad.item() == 2.5
+
+
+def test_not_initialized():
+    with pytest.raises(RuntimeError):
+        ppe.distributed.HierarchicalGroups(local_size=3)
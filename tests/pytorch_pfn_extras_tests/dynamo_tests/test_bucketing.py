@@ -0,0 +1,131 @@
+import sys
+
+import pytest
+import pytorch_pfn_extras as ppe
+import torch
+from pytorch_pfn_extras import testing
+from pytorch_pfn_extras._dynamo import ShapeBuckets
+
+
+def test_bucket():
+    buckets = ShapeBuckets(sizes=(4, 8), mask_argument="mask")
+    assert [buckets.bucket(s) for s in (1, 4, 5, 8, 9, 17)] == [
+        4,
+        4,
+        8,
+        8,
+        16,
+        24,
+    ]
+    buckets = ShapeBuckets(mask_argument="mask")
+    assert [buckets.bucket(s) for s in (1, 3, 4, 5, 100)] == [1, 4, 4, 8, 128]
+
+
+@pytest.mark.parametrize("sizes", [(), (0, 4), (8, 4)])
+def test_bucket_invalid_sizes(sizes):
+    with pytest.raises(ValueError):
+        ShapeBuckets(sizes=sizes, mask_argument="mask")
+
+
+def test_batch_dim_requires_mask():
+    with pytest.raises(ValueError, match="mask_argument"):
+        ShapeBuckets(sizes=(4,))
+    with pytest.warns(UserWarning, match="without mask_argument"):
+        buckets = ShapeBuckets(dims=(0,), sizes=(4,))
+    assert buckets.dims == (0,)
+
+
+def test_pad():
+    buckets = ShapeBuckets(
+        dims=(0, -1), sizes=(4,), pad_value=-1, mask_argument="mask"
+    )
+    x = torch.arange(6.0).reshape(2, 3)
+    padded, mask = buckets.pad(x)
+    assert padded.shape == (4, 4)
+    assert torch.equal(padded[:2, :3], x)
+    assert (padded[2:] == -1).all() and (padded[:, 3:] == -1).all()
+    assert torch.equal(mask, padded != -1)
+    # Tensors already in a bucket are not copied
+    x = torch.zeros(4, 4)
+    padded, mask = buckets.pad(x)
+    assert padded is x
+    assert mask.all()
+
+
+def test_apply():
+    buckets = ShapeBuckets(dims=(1,), sizes=(4,), mask_argument="mask")
+    args, kwargs = buckets.apply(
+        (torch.ones(2, 3), torch.ones(3)), {"n": 1, "y": torch.ones(2, 2)}
+    )
+    assert args[0].shape == (2, 4)
+    # Tensors with fewer dimensions are not padded
+    assert args[1].shape == (3,)
+    assert kwargs["n"] == 1
+    assert kwargs["y"].shape == (2, 4)
+    assert torch.equal(kwargs["mask"], args[0] != 0)
+
+
+def test_unpad():
+    buckets = ShapeBuckets(dims=(1,), sizes=(4,), mask_argument="mask")
+    x = torch.ones(2, 3)
+    outputs = {
+        "y": torch.zeros(2, 4),
+        "z": torch.zeros(4, 4, 2),
+        "loss": torch.zeros(()),
+        "n": 1,
+    }
+    unpadded = buckets.unpad(outputs, (x,), {})
+    assert unpadded["y"].shape == (2, 3)
+    assert unpadded["z"].shape == (4, 3, 2)
+    assert unpadded["loss"].shape == ()
+    assert unpadded["n"] == 1
+    # Inputs in a bucket already leave the outputs as they are
+    assert buckets.unpad(outputs, (torch.ones(2, 4),), {}) is outputs
+
+
+class _MaskedModule(torch.nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.linear = torch.nn.Linear(10, 10)
+
+    def forward(self, x, mask):
+        return (self.linear(x) * mask[:, :1]).sum()
+
+
+@pytest.mark.skipif(
+    not ppe.requires("2.0.0") or sys.platform == "win32",
+    reason="torch.compile interface its only added in PyTorch>2.0 and linux",
+)
+@pytest.mark.parametrize(
+    "max_variants, expected_recompiles", [(None, 2), (2, 2), (1, 6)]
+)
+def test_compile_shape_buckets(max_variants, expected_recompiles):
+    torch._dynamo.reset()
+    with ppe.profiler.get_time_summary().summary(clear=True):
+        pass
+    torch_module = torch.nn.Linear(10, 10)
+    module = _MaskedModule()
+    module.linear.load_state_dict(torch_module.state_dict())
+    opt = torch.optim.SGD(torch_module.parameters(), lr=0.1)
+    compiled_opt = torch.optim.SGD(module.parameters(), lr=0.1)
+    compiled = ppe.compile(
+        module,
+        compiled_opt,
+        shape_buckets=ShapeBuckets(sizes=(4, 8), mask_argument="mask"),
+        max_variants=max_variants,
+    )
+    for length in (3, 5, 7, 2, 8, 1, 6):
+        x = torch.randn(length, 10)
+        opt.zero_grad()
+        y = torch_module(x).sum()
+        y.backward()
+        opt.step()
+        compiled_y = compiled(x)
+        assert torch.allclose(y, compiled_y, atol=1e-5)
+        assert testing._compare_states(
+            torch_module.state_dict(), module.linear.state_dict()
+        )
+    assert compiled.recompiles == expected_recompiles
+    with ppe.profiler.get_time_summary().summary(clear=True) as (s, stats):
+        assert s.compute_mean()["ppe.compile.recompile"] > 0
+        assert stats["ppe.compile.recompiles.max"] == expected_recompiles
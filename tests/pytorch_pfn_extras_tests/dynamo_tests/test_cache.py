@@ -0,0 +1,216 @@
+import os
+import sys
+
+import pytest
+import pytorch_pfn_extras as ppe
+import torch
+from pytorch_pfn_extras import testing
+from pytorch_pfn_extras._dynamo import _optimizer
+
+
+class _Module(torch.nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.linear = torch.nn.Linear(10, 10)
+
+    def forward(self, x, scale):
+        y = self.linear(x)
+        return {"loss": (y * scale).sum(), "y": y}
+
+
+def _cache_files(cache_dir):
+    return sorted(f for f in os.listdir(cache_dir) if f.endswith(".pt"))
+
+
+def _functional_backend(gm, example_inputs):
+    def run(*args):
+        return gm(*[a.clone() for a in args])
+
+    return run
+
+
+_functional_backend.cache_key = "functional"
+
+
+class _SerializingBackend:
+    def __init__(self):
+        self.n_compiles = 0
+        self.n_loads = 0
+
+    def __call__(self, gm, example_inputs):
+        self.n_compiles += 1
+        return gm.forward
+
+    def serialize_compiled(self, compiled):
+        return "artifact"
+
+    def deserialize_compiled(self, gm, data):
+        assert data == "artifact"
+        self.n_loads += 1
+        return gm.forward
+
+
+@pytest.mark.skipif(
+    not ppe.requires("2.0.0") or sys.platform == "win32",
+    reason="torch.compile interface its only added in PyTorch>2.0 and linux",
+)
+@pytest.mark.parametrize(
+    "backend", [None, _functional_backend, _SerializingBackend()]
+)
+def test_compile_cache(monkeypatch, tmp_path, backend):
+    torch._dynamo.reset()
+    cache_dir = str(tmp_path)
+    torch_module = _Module()
+    initial_state = torch_module.state_dict()
+    opt = torch.optim.SGD(torch_module.parameters(), lr=0.5, momentum=0.1)
+
+    def eager_step(x, scale):
+        opt.zero_grad()
+        out = torch_module(x, scale)
+        # The joint graph computes the gradients of all the outputs
+        outs = list(out.values())
+        torch.autograd.backward(outs, [torch.ones_like(o) for o in outs])
+        opt.step()
+        return out
+
+    # Cold run: traces and stores the joint graph
+    module = _Module()
+    module.load_state_dict(initial_state)
+    compiled_opt = torch.optim.SGD(module.parameters(), lr=0.5, momentum=0.1)
+    compiled = ppe.compile(module, compiled_opt, backend, cache_dir=cache_dir)
+    x = torch.randn(10)
+    y = eager_step(x, 2.0)
+    compiled_y = compiled(x, 2.0)
+    assert torch.allclose(y["loss"], compiled_y["loss"])
+    assert len(_cache_files(cache_dir)) == 1
+    requires_grad = {k: v.requires_grad for k, v in compiled_y.items()}
+
+    # Warm run: a new process would load the graph without tracing
+    torch._dynamo.reset()
+
+    def fail(*args, **kwargs):
+        raise AssertionError("traced again")
+
+    monkeypatch.setattr(_optimizer, "_compile_optimizer", fail)
+    monkeypatch.setattr(torch, "compile", fail)
+    torch_module.load_state_dict(initial_state)
+    opt = torch.optim.SGD(torch_module.parameters(), lr=0.5, momentum=0.1)
+    module = _Module()
+    module.load_state_dict(initial_state)
+    compiled_opt = torch.optim.SGD(module.parameters(), lr=0.5, momentum=0.1)
+    compiled = ppe.compile(module, compiled_opt, backend, cache_dir=cache_dir)
+    for _ in range(3):
+        x = torch.randn(10)
+        y = eager_step(x, 2.0)
+        compiled_y = compiled(x, 2.0)
+        assert compiled_y.keys() == y.keys()
+        for k in y:
+            assert torch.allclose(y[k], compiled_y[k])
+            # Loaded graphs behave as the traced one
+            assert compiled_y[k].requires_grad == requires_grad[k]
+        assert testing._compare_states(
+            torch_module.state_dict(), module.state_dict()
+        )
+    monkeypatch.undo()
+    assert len(_cache_files(cache_dir)) == 1
+    if isinstance(backend, _SerializingBackend):
+        assert backend.n_compiles == 1
+        assert backend.n_loads == 1
+
+
+@pytest.mark.skipif(
+    not ppe.requires("2.0.0") or sys.platform == "win32",
+    reason="torch.compile interface its only added in PyTorch>2.0 and linux",
+)
+def test_compile_cache_key(tmp_path):
+    cache_dir = str(tmp_path)
+
+    def run(lr, weight_decay, shape, scale):
+        torch._dynamo.reset()
+        module = _Module()
+        opt = torch.optim.SGD(
+            module.parameters(), lr=lr, weight_decay=weight_decay
+        )
+        compiled = ppe.compile(module, opt, cache_dir=cache_dir)
+        compiled(torch.randn(shape), scale)
+        return _cache_files(cache_dir)
+
+    files = run(0.1, 0, (10,), 1.0)
+    assert len(files) == 1
+    # Same configuration, the learning rate is an input of the graph
+    assert run(0.1, 0, (10,), 1.0) == files
+    assert run(0.2, 0, (10,), 1.0) == files
+    # Constant hyperparameters, input shapes and constants are in the key
+    assert len(run(0.1, 0.1, (10,), 1.0)) == 2
+    assert len(run(0.1, 0, (4, 10), 1.0)) == 3
+    assert len(run(0.1, 0, (10,), 3.0)) == 4
+
+
+@pytest.mark.skipif(
+    not ppe.requires("2.0.0") or sys.platform == "win32",
+    reason="torch.compile interface its only added in PyTorch>2.0 and linux",
+)
+def test_compile_cache_hyperparameters(tmp_path):
+    torch._dynamo.reset()
+    cache_dir = str(tmp_path)
+    torch_module = _Module()
+    module = _Module()
+    module.load_state_dict(torch_module.state_dict())
+    opt = torch.optim.SGD(torch_module.parameters(), lr=0.1)
+    compiled_opt = torch.optim.SGD(module.parameters(), lr=0.1)
+    compiled = ppe.compile(module, compiled_opt, cache_dir=cache_dir)
+    for lr in (0.1, 0.1, 0.5, 0.5):
+        # Changed between the steps as a scheduler does
+        for o in (opt, compiled_opt):
+            o.param_groups[0]["lr"] = lr
+        x = torch.randn(10)
+        opt.zero_grad()
+        out = torch_module(x, 1.0)
+        outs = list(out.values())
+        torch.autograd.backward(outs, [torch.ones_like(o) for o in outs])
+        opt.step()
+        compiled(x, 1.0)
+        assert testing._compare_states(
+            torch_module.state_dict(), module.state_dict()
+        )
+    # The learning rate is passed to the graph, not traced as a constant
+    assert len(_cache_files(cache_dir)) == 1
+    assert compiled.recompiles == 1
+
+
+@pytest.mark.skipif(
+    not ppe.requires("2.0.0") or sys.platform == "win32",
+    reason="torch.compile interface its only added in PyTorch>2.0 and linux",
+)
+def test_compile_cache_prune(tmp_path):
+    from pytorch_pfn_extras._dynamo import _cache
+
+    cache_dir = str(tmp_path)
+    module = _Module()
+    opt = torch.optim.SGD(module.parameters(), lr=0.1)
+    cache = _cache._CompileCache(cache_dir, module, opt, None, max_entries=3)
+    paths = [cache.path(str(i)) for i in range(5)]
+    for i, path in enumerate(paths[:3]):
+        cache.save(path, {"i": i})
+        os.utime(path, (i, i))
+    # Loading marks the entry as recently used
+    assert cache.load(paths[0]) == {"i": 0}
+    for i, path in enumerate(paths[3:], 3):
+        cache.save(path, {"i": i})
+    assert _cache_files(cache_dir) == sorted(
+        os.path.basename(p) for p in (paths[0], paths[3], paths[4])
+    )
+    assert cache.load(paths[1]) is None
+
+
+@pytest.mark.skipif(
+    not ppe.requires("2.0.0") or sys.platform == "win32",
+    reason="torch.compile interface its only added in PyTorch>2.0 and linux",
+)
+def test_compile_cache_without_optimizer(tmp_path):
+    torch._dynamo.reset()
+    module = _Module()
+    compiled = ppe.compile(module, None, cache_dir=str(tmp_path))
+    compiled(torch.randn(10), 1.0)["loss"].backward()
+    assert module.linear.weight.grad is not None
+    assert not os.listdir(str(tmp_path))
@@ -106,7 +106,143 @@ def test_compile_with_optimizer_and_split_graph():
     opt.step()
 
     opt = torch.optim.SGD(compiled_module.parameters(), lr=0.5, momentum=0.01)
-    joint_module = ppe.compile(compiled_module, opt)
+    joint_module = ppe.compile(compiled_module, opt, fullgraph=True)
     # This executes forward+backward+optimizer step
     with pytest.raises(torch._dynamo.exc.Unsupported):
         joint_module(x)
+
+
+@pytest.mark.skipif(
+    not ppe.requires("2.0.0") or sys.platform == "win32",
+    reason="torch.compile interface its only added in PyTorch>2.0 and linux",
+)
+@pytest.mark.parametrize("backend", [None, lambda gm, inputs: gm.forward])
+@pytest.mark.parametrize("momentum", [0.0, 0.01])
+def test_compile_with_optimizer_and_graph_break(backend, momentum):
+    torch._dynamo.reset()
+    torch_module = _DummyModuleSplit()
+    module_initial_state = torch_module.state_dict()
+    compiled_module = _DummyModuleSplit()
+    compiled_module.load_state_dict(module_initial_state)
+
+    opt = torch.optim.SGD(torch_module.parameters(), lr=0.5, momentum=momentum)
+    compiled_opt = torch.optim.SGD(
+        compiled_module.parameters(), lr=0.5, momentum=momentum
+    )
+    joint_module = ppe.compile(compiled_module, compiled_opt, backend)
+    # Take both branches of the data-dependent control flow
+    for x in (torch.ones(10), -torch.ones(10), torch.randn(10)):
+        opt.zero_grad()
+        y = torch_module(x)
+        y.backward()
+        opt.step()
+        # This executes forward+backward+optimizer step
+        compiled_y = joint_module(x)
+        assert torch.allclose(y, compiled_y)
+        assert testing._compare_states(
+            torch_module.state_dict(), compiled_module.state_dict()
+        )
+    assert all(p.grad is None for p in compiled_module.parameters())
+
+
+def _functional_backend(gm, example_inputs):
+    # Leaves the inputs untouched and returns the updated values
+    def run(*args):
+        return gm(*[a.clone() for a in args])
+
+    return run
+
+
+def _donating_backend(gm, example_inputs):
+    aliases = gm.meta["input_output_aliases"]
+
+    def run(*args):
+        outs = gm(*args)
+        for out_idx, in_idx in aliases.items():
+            assert outs[out_idx] is args[in_idx]
+        return outs
+
+    return run
+
+
+_donating_backend.supports_inplace = True
+
+
+@pytest.mark.skipif(
+    not ppe.requires("2.0.0") or sys.platform == "win32",
+    reason="torch.compile interface its only added in PyTorch>2.0 and linux",
+)
+@pytest.mark.parametrize(
+    "backend, bytes_per_step",
+    [
+        # Parameters and momentum buffers of Linear(10, 10) in float32
+        (_functional_backend, 2 * 110 * 4),
+        # Outputs aliasing the inputs are not copied back
+        (lambda gm, inputs: gm.forward, 0),
+        (_donating_backend, 0),
+    ],
+)
+@pytest.mark.parametrize("module_cls", [_DummyModule, _DummyModuleSplit])
+def test_compile_bytes_written_back(
+    monkeypatch, backend, bytes_per_step, module_cls
+):
+    torch._dynamo.reset()
+    torch_module = module_cls()
+    compiled_module = module_cls()
+    compiled_module.load_state_dict(torch_module.state_dict())
+    opt = torch.optim.SGD(torch_module.parameters(), lr=0.5, momentum=0.1)
+    compiled_opt = torch.optim.SGD(
+        compiled_module.parameters(), lr=0.5, momentum=0.1
+    )
+    joint_module = ppe.compile(compiled_module, compiled_opt, backend)
+    # Compile before counting
+    x = torch.ones(10)
+    joint_module(x)
+    torch_module(x).backward()
+    opt.step()
+
+    copied = []
+    copy_ = torch.Tensor.copy_
+
+    def counting_copy_(self, src, *args, **kwargs):
+        copied.append(src.numel() * src.element_size())
+        return copy_(self, src, *args, **kwargs)
+
+    monkeypatch.setattr(torch.Tensor, "copy_", counting_copy_)
+    n_steps = 3
+    for _ in range(n_steps):
+        opt.zero_grad()
+        torch_module(x).backward()
+        opt.step()
+        joint_module(x)
+    monkeypatch.undo()
+
+    assert sum(copied) == n_steps * bytes_per_step
+    assert testing._compare_states(
+        torch_module.state_dict(), compiled_module.state_dict()
+    )
+
+
+@pytest.mark.skipif(
+    not ppe.requires("2.0.0") or sys.platform == "win32",
+    reason="torch.compile interface its only added in PyTorch>2.0 and linux",
+)
+@pytest.mark.parametrize("fullgraph", [False, True])
+def test_compile_capture_unmapped_inputs(fullgraph):
+    from pytorch_pfn_extras._dynamo._compile import _CompiledModule
+
+    module = _DummyModule()
+    opt = torch.optim.SGD(module.parameters(), lr=0.1)
+    compiled = _CompiledModule(
+        module, opt, None, fullgraph=fullgraph, max_variants=1
+    )
+    x = torch.ones(10)
+    # A graph input that is neither a module tensor nor an argument
+    compiled._traced = (None, None, False, [x.clone()], [], [])
+    if fullgraph:
+        with pytest.raises(RuntimeError, match="cannot be mapped"):
+            compiled._capture_graph("signature", (x,), {}, None)
+    else:
+        with pytest.warns(UserWarning, match="cannot be mapped"):
+            compiled._capture_graph("signature", (x,), {}, None)
+    assert not compiled._variants
@@ -0,0 +1,171 @@
+import sys
+
+import pytest
+import pytorch_pfn_extras as ppe
+import torch
+
+
+class _DummyModule(torch.nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.linear = torch.nn.Linear(10, 10)
+
+    def forward(self, x):
+        return (self.linear(x) ** 2).mean()
+
+
+class _DummyModuleSplit(_DummyModule):
+    def forward(self, x):
+        y = self.linear(x)
+        if y.sum() < 0:
+            y = -y
+        return (y**2).mean()
+
+
+class _Lamb(torch.optim.Optimizer):
+    def __init__(self, params, lr=1e-3, betas=(0.9, 0.999), eps=1e-6):
+        defaults = dict(lr=lr, betas=betas, eps=eps, weight_decay=0.01)
+        super().__init__(params, defaults)
+
+    @torch.no_grad()
+    def step(self):
+        for group in self.param_groups:
+            beta1, beta2 = group["betas"]
+            for p in group["params"]:
+                state = self.state[p]
+                if len(state) == 0:
+                    state.update(ppe._dynamo.init_adam_state(group, p))
+                state["step"] += 1
+                state["exp_avg"].mul_(beta1).add_(p.grad, alpha=1 - beta1)
+                state["exp_avg_sq"].mul_(beta2).addcmul_(
+                    p.grad, p.grad, value=1 - beta2
+                )
+                step = state["step"].item()
+                update = (state["exp_avg"] / (1 - beta1**step)) / (
+                    (state["exp_avg_sq"] / (1 - beta2**step)).sqrt()
+                    + group["eps"]
+                )
+                update += group["weight_decay"] * p
+                w_norm = p.norm().item()
+                u_norm = update.norm().item()
+                trust_ratio = w_norm / u_norm if w_norm and u_norm else 1.0
+                p.sub_(group["lr"] * trust_ratio * update)
+
+
+_optimizers = [
+    lambda params: torch.optim.Adam(params, lr=0.1),
+    lambda params: torch.optim.Adam(
+        params, lr=0.1, weight_decay=0.1, amsgrad=True
+    ),
+    lambda params: torch.optim.AdamW(params, lr=0.1),
+    lambda params: torch.optim.AdamW(params, lr=0.1, maximize=True),
+    lambda params: torch.optim.RMSprop(params, lr=0.01),
+    lambda params: torch.optim.RMSprop(
+        params, lr=0.01, momentum=0.5, centered=True
+    ),
+    lambda params: torch.optim.Adagrad(params, lr=0.1, lr_decay=0.1),
+    lambda params: torch.optim.Adagrad(params, initial_accumulator_value=1),
+    lambda params: _Lamb(params, lr=0.1),
+]
+
+
+@pytest.mark.skipif(
+    not ppe.requires("2.0.0") or sys.platform == "win32",
+    reason="torch.compile interface its only added in PyTorch>2.0 and linux",
+)
+@pytest.mark.parametrize("module_cls", [_DummyModule, _DummyModuleSplit])
+@pytest.mark.parametrize("make_optimizer", _optimizers)
+def test_compile_with_registered_optimizer(module_cls, make_optimizer):
+    torch._dynamo.reset()
+    ppe._dynamo.register_optimizer(
+        _Lamb, ppe._dynamo.lamb_step, ppe._dynamo.init_adam_state
+    )
+    torch_module = module_cls()
+    compiled_module = module_cls()
+    compiled_module.load_state_dict(torch_module.state_dict())
+    opt = make_optimizer(torch_module.parameters())
+    compiled_opt = make_optimizer(compiled_module.parameters())
+
+    joint_module = ppe.compile(compiled_module, compiled_opt)
+    for _ in range(3):
+        x = torch.randn(4, 10)
+        opt.zero_grad()
+        y = torch_module(x)
+        y.backward()
+        opt.step()
+        # This executes forward+backward+optimizer step
+        compiled_y = joint_module(x)
+        # The updates are computed with tensors instead of Python floats
+        assert torch.allclose(y, compiled_y, atol=1e-4)
+        for p, compiled_p in zip(
+            torch_module.parameters(), compiled_module.parameters()
+        ):
+            assert torch.allclose(p, compiled_p, atol=1e-4)
+    for state, compiled_state in zip(
+        opt.state_dict()["state"].values(),
+        compiled_opt.state_dict()["state"].values(),
+    ):
+        assert state.keys() == compiled_state.keys()
+        for key in ("exp_avg", "exp_avg_sq", "square_avg", "sum"):
+            if key in state:
+                assert torch.allclose(
+                    state[key], compiled_state[key], atol=1e-4
+                )
+
+
+@pytest.mark.skipif(
+    not ppe.requires("2.0.0"),
+    reason="torch.compile interface its only added in PyTorch>2.0",
+)
+# The compiled step bypasses ``optimizer.step`` that schedulers hook into
+@pytest.mark.filterwarnings("ignore:Detected call of `lr_scheduler.step")
+@pytest.mark.parametrize(
+    "make_optimizer",
+    [
+        lambda params: torch.optim.SGD(params, lr=0.1),
+        lambda params: torch.optim.SGD(
+            params, lr=0.1, momentum=0.9, nesterov=True, weight_decay=0.1
+        ),
+        lambda params: torch.optim.Adam(params, lr=0.1, weight_decay=0.1),
+        lambda params: torch.optim.AdamW(params, lr=0.1),
+        lambda params: torch.optim.RMSprop(
+            params, lr=0.01, momentum=0.5, centered=True
+        ),
+        lambda params: torch.optim.Adagrad(params, lr=0.1, lr_decay=0.1),
+    ],
+)
+def test_optimizer_step_scheduled_hyperparameters(make_optimizer):
+    from pytorch_pfn_extras._dynamo._compile import _compile_optimizer_step
+
+    def make_scheduler(optimizer):
+        defaults = optimizer.defaults
+        return torch.optim.lr_scheduler.OneCycleLR(
+            optimizer,
+            0.05,
+            total_steps=10,
+            cycle_momentum="betas" in defaults
+            or defaults.get("momentum", 0) > 0,
+        )
+
+    torch_module = _DummyModule()
+    compiled_module = _DummyModule()
+    compiled_module.load_state_dict(torch_module.state_dict())
+    opt = make_optimizer(torch_module.parameters())
+    compiled_opt = make_optimizer(compiled_module.parameters())
+    scheduler = make_scheduler(opt)
+    compiled_scheduler = make_scheduler(compiled_opt)
+    # Traced once, the learning rate and the momentum are inputs of the graph
+    step = _compile_optimizer_step(compiled_module, compiled_opt, None)
+    for _ in range(8):
+        x = torch.randn(4, 10)
+        opt.zero_grad()
+        torch_module(x).backward()
+        opt.step()
+        scheduler.step()
+        compiled_module(x).backward()
+        step()
+        compiled_scheduler.step()
+        for p, compiled_p in zip(
+            torch_module.parameters(), compiled_module.parameters()
+        ):
+            assert torch.allclose(p, compiled_p, atol=1e-5)
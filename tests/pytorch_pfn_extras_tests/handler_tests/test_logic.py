@@ -1,3 +1,4 @@
+import sys
 from typing import Any, Mapping
 from unittest import mock
 
@@ -137,3 +138,135 @@ def test_train_step_mode_with_evaluator(trigger):
     )
     trainer.run(data, data)
     assert backward_fn.call_count == epochs * iters_per_epoch
+
+
+_requires_compile = pytest.mark.skipif(
+    not ppe.requires("2.0.0")
+    or sys.platform == "win32"
+    or (sys.version_info >= (3, 11) and not ppe.requires("2.1.0")),
+    reason="torch.compile interface its only added in PyTorch>2.0 and linux",
+)
+
+
+class _LossModel(torch.nn.Module):
+    def __init__(self, split=False):
+        super().__init__()
+        self.linear = nn.Linear(4, 3)
+        self.split = split
+
+    def forward(self, x, t):
+        y = self.linear(x)
+        if self.split and y.sum() > 0:
+            y = y * 2
+        return {"loss": F.mse_loss(y, t), "y": y.detach()}
+
+
+def _run_logic_steps(logic, model, optimizer, batches):
+    models = {"main": model}
+    optimizers = {"main": optimizer}
+    outs = []
+    for i, batch in enumerate(batches):
+        outs.append(logic.train_step(models, optimizers, i, batch))
+        logic.train_step_optimizers(models, optimizers, i)
+    return outs
+
+
+@_requires_compile
+@pytest.mark.parametrize("split", [False, True])
+@pytest.mark.parametrize("fullgraph", [False, True])
+def test_logic_compile_step(split, fullgraph):
+    torch._dynamo.reset()
+    batches = [(torch.randn(n, 4), torch.randn(n, 3)) for n in (2, 2, 5, 2, 5)]
+    model = _LossModel(split)
+    compiled_model = _LossModel(split)
+    compiled_model.load_state_dict(model.state_dict())
+    optimizer = torch.optim.SGD(model.parameters(), lr=0.1, momentum=0.9)
+    compiled_optimizer = torch.optim.SGD(
+        compiled_model.parameters(), lr=0.1, momentum=0.9
+    )
+
+    expected = _run_logic_steps(ppe.handler.Logic(), model, optimizer, batches)
+    logic = ppe.handler.Logic(
+        options={"compile_step": {"fullgraph": fullgraph}}
+    )
+    # Graph breaks fall back to eager only when a single graph is required
+    eager = split and fullgraph
+    if eager:
+        with pytest.warns(UserWarning, match="runs eagerly"):
+            outs = _run_logic_steps(
+                logic, compiled_model, compiled_optimizer, batches
+            )
+    else:
+        outs = _run_logic_steps(
+            logic, compiled_model, compiled_optimizer, batches
+        )
+
+    # One entry for each input signature
+    assert len(logic._compiled_signatures) == 2
+    assert all(
+        compiled != eager for compiled in logic._compiled_signatures.values()
+    )
+    for out, expected_out in zip(outs, expected):
+        assert torch.allclose(out["loss"], expected_out["loss"])
+        assert torch.allclose(out["y"], expected_out["y"])
+    for p, expected_p in zip(model.parameters(), compiled_model.parameters()):
+        assert torch.allclose(p, expected_p)
+    # The optimizer state stays serializable
+    assert len(compiled_optimizer.state_dict()["state"]) == 2
+
+
+@_requires_compile
+def test_logic_compile_step_hyperparameters():
+    torch._dynamo.reset()
+    batches = [(torch.randn(2, 4), torch.randn(2, 3)) for _ in range(6)]
+    model = _LossModel()
+    compiled_model = _LossModel()
+    compiled_model.load_state_dict(model.state_dict())
+    optimizer = torch.optim.SGD(model.parameters(), lr=0.1, momentum=0.9)
+    compiled_optimizer = torch.optim.SGD(
+        compiled_model.parameters(), lr=0.1, momentum=0.9
+    )
+    scheduler = torch.optim.lr_scheduler.ExponentialLR(optimizer, 0.5)
+    compiled_scheduler = torch.optim.lr_scheduler.ExponentialLR(
+        compiled_optimizer, 0.5
+    )
+
+    logic = ppe.handler.Logic()
+    compiled_logic = ppe.handler.Logic(options={"compile_step": True})
+    for batch in batches[:4]:
+        _run_logic_steps(logic, model, optimizer, [batch])
+        scheduler.step()
+        # The learning rate is an input of the graph, which is not compiled
+        # again when a scheduler changes it at every step
+        _run_logic_steps(
+            compiled_logic, compiled_model, compiled_optimizer, [batch]
+        )
+        compiled_scheduler.step()
+        assert compiled_logic._compiled_step.recompiles == 1
+    for p, expected_p in zip(model.parameters(), compiled_model.parameters()):
+        assert torch.allclose(p, expected_p)
+
+    # Other hyperparameters are constants in the graph
+    for opt in (optimizer, compiled_optimizer):
+        opt.param_groups[0]["weight_decay"] = 0.1
+    _run_logic_steps(logic, model, optimizer, batches[4:])
+    with pytest.warns(UserWarning, match="hyperparameters changed"):
+        _run_logic_steps(
+            compiled_logic, compiled_model, compiled_optimizer, batches[4:]
+        )
+    for p, expected_p in zip(model.parameters(), compiled_model.parameters()):
+        assert torch.allclose(p, expected_p)
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {"backward_outputs": ["loss"]},
+        {"backward_function": lambda x: x.backward()},
+    ],
+)
+def test_logic_compile_step_invalid_options(options):
+    if not ppe.requires("2.0.0"):
+        pytest.skip("compile_step requires PyTorch 2.0")
+    with pytest.raises(ValueError):
+        ppe.handler.Logic(options={"compile_step": True, **options})
@@ -0,0 +1,87 @@
+import math
+
+import numpy
+import pytest
+from pytorch_pfn_extras.profiler import QuantileSketch
+
+
+def _sketch(values, **kwargs):
+    sketch = QuantileSketch(**kwargs)
+    for v in values:
+        sketch.add(float(v))
+    return sketch
+
+
+@pytest.mark.parametrize("q", [0.0, 0.01, 0.5, 0.9, 0.99, 1.0])
+def test_quantile(q):
+    values = numpy.random.RandomState(0).lognormal(-4, 2, size=10000)
+    sketch = _sketch(values)
+    expected = numpy.quantile(values, q, method="lower")
+    assert sketch.count == len(values)
+    assert abs(sketch.quantile(q) - expected) <= 0.011 * expected
+
+
+def test_quantile_zeros():
+    sketch = _sketch([0.0] * 3 + [1.0])
+    assert sketch.quantile(0.5) == 0.0
+    assert sketch.quantile(1.0) == 1.0
+
+
+def test_empty():
+    assert math.isnan(QuantileSketch().quantile(0.5))
+    assert QuantileSketch().histogram() == []
+
+
+def test_merge():
+    values = numpy.random.RandomState(1).exponential(size=2000)
+    sketch = _sketch(values[:500])
+    sketch.merge(_sketch(values[500:]))
+    expected = _sketch(values)
+    assert sketch.count == expected.count
+    assert sketch.histogram() == expected.histogram()
+    for q in (0.1, 0.5, 0.99):
+        assert sketch.quantile(q) == expected.quantile(q)
+    with pytest.raises(ValueError):
+        sketch.merge(QuantileSketch(relative_accuracy=0.05))
+
+
+def test_bounded_buckets():
+    values = numpy.logspace(-9, 3, 5000)
+    sketch = _sketch(values, max_buckets=64)
+    hist = sketch.histogram()
+    assert len(hist) == 64
+    assert sum(c for _, _, c in hist) == len(values)
+    # The highest quantiles keep their accuracy
+    assert abs(sketch.quantile(0.99) - numpy.quantile(values, 0.99)) <= (
+        0.02 * numpy.quantile(values, 0.99)
+    )
+
+
+def test_histogram():
+    sketch = _sketch([1.0, 1.0, 2.0, 0.0])
+    hist = sketch.histogram()
+    assert hist[0] == (0.0, 0.0, 1)
+    assert [c for _, _, c in hist[1:]] == [2, 1]
+    for lower, upper, _ in hist[1:]:
+        assert lower < upper
+
+
+@pytest.mark.parametrize(
+    "kwargs", [{"relative_accuracy": 0}, {"max_buckets": 0}]
+)
+def test_invalid_args(kwargs):
+    with pytest.raises(ValueError):
+        QuantileSketch(**kwargs)
+
+
+def test_add_values():
+    values = numpy.random.RandomState(2).exponential(size=1000)
+    values[:10] = 0
+    sketch = QuantileSketch()
+    sketch.add_values(values[:600])
+    sketch.add_values([])
+    sketch.add_values(values[600:])
+    expected = _sketch(values)
+    assert sketch.count == expected.count
+    assert sketch.histogram() == expected.histogram()
+    assert (sketch.min, sketch.max) == (expected.min, expected.max)
@@ -1,6 +1,7 @@
 import multiprocessing as mp
 import subprocess
 import sys
+import threading
 import time
 
 import pytest
@@ -110,3 +111,57 @@ def test_multiprocessing_start_method():
             ),
         ]
     )
+
+
+def test_report_from_threads():
+    summary = TimeSummary(buffer_size=16)
+    n_threads, n_reports = 4, 100
+
+    def report(i):
+        for _ in range(n_reports):
+            summary.complete_report(f"t{i % 2}", False, None, 0.0)
+
+    threads = [
+        threading.Thread(target=report, args=(i,)) for i in range(n_threads)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    with summary.summary(clear=True) as s:
+        assert s[0]._summaries["t0"]._n == 2 * n_reports
+        assert s[0]._summaries["t1"]._n == 2 * n_reports
+        assert set(s[1]) == {"t0.min", "t0.max", "t1.min", "t1.max"}
+    # Buffers of finished threads are released after being summarized
+    assert summary._buffers == []
+    summary.finalize()
+
+
+def test_buffer_overflow():
+    summary = TimeSummary(buffer_size=4)
+    begin = time.time()
+    for i in range(10):
+        summary.complete_report("foo", False, None, begin - i)
+    with summary.summary(clear=True) as s:
+        assert s[0]._summaries["foo"]._n == 10
+        assert 9 <= s[1]["foo.max"] < 10
+        assert 0 <= s[1]["foo.min"] < 1
+    summary.finalize()
+
+
+def test_percentiles():
+    summary = TimeSummary(buffer_size=8)
+    for i in range(1, 101):
+        summary.add("foo", float(i))
+        summary.complete_report("bar", False, None, time.time() - i)
+    with summary.summary(percentiles=(50, 99.9)) as s:
+        for name in ("foo", "bar"):
+            assert abs(s[1][f"{name}.p50"] - 50) <= 0.5
+            assert abs(s[1][f"{name}.p99.9"] - 99) <= 1
+    sketch = summary.sketch("foo")
+    assert sketch.count == 100
+    assert summary.sketch("baz") is None
+    with summary.summary(clear=True) as s:
+        assert "foo.p50" not in s[1]
+    assert summary.sketch("foo") is None
+    summary.finalize()
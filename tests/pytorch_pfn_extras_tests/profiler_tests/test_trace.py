@@ -0,0 +1,86 @@
+import json
+import os
+import threading
+
+import pytest
+import pytorch_pfn_extras as ppe
+import torch
+
+
+def _events(trace, ph="X"):
+    return [e for e in trace["traceEvents"] if e["ph"] == ph]
+
+
+def test_trace(tmp_path):
+    @ppe.profiler.record_function("func")
+    def func():
+        pass
+
+    with ppe.profiler.TraceRecorder() as recorder:
+        assert ppe.profiler.get_trace_recorder() is recorder
+        with ppe.profiler.record("outer"):
+            with ppe.profiler.record("inner"):
+                func()
+        for _ in ppe.profiler.record_iterable("iter", range(2)):
+            pass
+    assert ppe.profiler.get_trace_recorder() is None
+    with ppe.profiler.record("not-recorded"):
+        pass
+
+    writer = ppe.writing.SimpleWriter(out_dir=str(tmp_path))
+    recorder.flush(writer, "trace.json")
+    with open(os.path.join(str(tmp_path), "trace.json")) as f:
+        trace = json.load(f)
+    events = {e["name"]: e for e in _events(trace)}
+    assert set(events) == {"outer", "inner", "func", "iter-0", "iter-1"}
+    outer, inner = events["outer"], events["inner"]
+    assert outer["ts"] <= inner["ts"]
+    assert inner["ts"] + inner["dur"] <= outer["ts"] + outer["dur"]
+    assert events["iter-0"]["ts"] < events["iter-1"]["ts"]
+    assert {e["tid"] for e in events.values()} == {threading.get_ident()}
+    assert {e["pid"] for e in events.values()} == {os.getpid()}
+    # Flushed regions are discarded
+    assert _events(recorder.to_chrome_trace()) == []
+
+
+def test_trace_threads():
+    recorder = ppe.profiler.TraceRecorder()
+
+    def run():
+        with ppe.profiler.record("thread"):
+            pass
+
+    with recorder:
+        threads = [threading.Thread(target=run) for _ in range(3)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    events = _events(recorder.to_chrome_trace(clear=False))
+    assert len(events) == 3
+    assert len({e["tid"] for e in events}) == len(events)
+    assert len(_events(recorder.to_chrome_trace())) == 3
+
+
+def test_trace_max_events():
+    with ppe.profiler.TraceRecorder(max_events=3) as recorder:
+        for i in range(5):
+            with ppe.profiler.record(f"r{i}"):
+                pass
+    events = _events(recorder.to_chrome_trace())
+    assert [e["name"] for e in events] == ["r2", "r3", "r4"]
+
+
+@pytest.mark.gpu
+def test_trace_cuda():
+    x = torch.ones(1000, 1000, device="cuda")
+    with ppe.profiler.TraceRecorder() as recorder:
+        with ppe.profiler.record("matmul", use_cuda=True):
+            x @ x
+    trace = recorder.to_chrome_trace()
+    (cpu,) = [e for e in _events(trace) if e["cat"] == "cpu"]
+    (cuda,) = [e for e in _events(trace) if e["cat"] == "cuda"]
+    assert cpu["name"] == cuda["name"] == "matmul"
+    assert cuda["dur"] > 0
+    (meta,) = _events(trace, "M")
+    assert meta["tid"] == cuda["tid"]
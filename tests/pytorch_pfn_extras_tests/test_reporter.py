@@ -564,3 +564,35 @@ def test_dict_summary_add_operator():
             "f": [0.03, 0.04, 0.05],
         },
     )
+
+
+def test_dict_summary_to_tensor():
+    s1 = ppe.reporting.DictSummary()
+    s1.add({"a": 1.0, "b": torch.tensor(0.1), "c": 0.01})
+    s1.add({"a": 2.0, "b": torch.tensor(0.2), "c": lambda: 0.02})
+
+    s2 = ppe.reporting.DictSummary()
+    s2.add({"a": 3.0, "b": torch.tensor(0.3), "f": 0.03})
+    s2.add({"a": (4.0, 2), "b": torch.tensor(0.4), "f": 0.04})
+
+    assert s1.keys() == ["a", "b", "c"]
+    keys = sorted(set(s1.keys() + s2.keys()))
+    t1 = s1.to_tensor(keys)
+    assert t1.shape == (4, 3)
+    assert t1.dtype == torch.float64
+    assert t1[3].tolist() == [0.0, 0.0, 0.0]
+
+    s = ppe.reporting.DictSummary.from_tensor(keys, t1 + s2.to_tensor(keys))
+    expected = s1 + s2
+    assert s.keys() == expected.keys()
+    for key, value in expected.make_statistics().items():
+        numpy.testing.assert_allclose(
+            s.make_statistics()[key], value, rtol=1e-5
+        )
+
+
+def test_dict_summary_to_tensor_empty():
+    summary = ppe.reporting.DictSummary()
+    packed = summary.to_tensor()
+    assert packed.shape == (0, 3)
+    assert ppe.reporting.DictSummary.from_tensor([], packed).keys() == []
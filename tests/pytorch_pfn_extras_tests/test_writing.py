@@ -1,8 +1,13 @@
 import os
+import sys
 import tempfile
+import threading
+import time
+from unittest import mock
 
 import pytest
 import pytorch_pfn_extras as ppe
+import torch
 
 
 @pytest.mark.filterwarnings(
@@ -20,3 +25,89 @@ def test_tensorboard_writing():
         for snap in os.listdir(tempd):
             assert "_test" in snap
         writer.finalize()
+
+
+@pytest.mark.filterwarnings(
+    "ignore:`np.bool8` is a deprecated alias for `np.bool_`:DeprecationWarning"
+)
+def test_buffered_tensorboard_writing():
+    pytest.importorskip("tensorboard")
+    with tempfile.TemporaryDirectory() as tempd:
+        writer = ppe.writing.BufferedTensorBoardWriter(
+            out_dir=tempd, flush_interval=100
+        )
+        for i in range(3):
+            writer(None, None, {"my_metric": i, "iteration": i})
+        writer.finalize()
+        (tb_file,) = os.listdir(tempd)
+        with open(os.path.join(tempd, tb_file), "rb") as f:
+            assert b"my_metric" in f.read()
+
+
+class _SummaryWriter:
+    def __init__(self, **kwargs):
+        self.scalars = []
+        self.threads = set()
+        self.closed = False
+
+    def add_scalar(self, tag, value, step, walltime=None):
+        self.threads.add(threading.get_ident())
+        self.scalars.append((tag, value, step))
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def summary_writer():
+    tensorboard = mock.MagicMock()
+    tensorboard.SummaryWriter = _SummaryWriter
+    with mock.patch.dict(sys.modules, {"torch.utils.tensorboard": tensorboard}):
+        with mock.patch.object(
+            torch.utils, "tensorboard", tensorboard, create=True
+        ):
+            yield
+
+
+def test_buffered_tensorboard_writer(summary_writer):
+    writer = ppe.writing.BufferedTensorBoardWriter(flush_interval=100)
+    summary = writer._writer
+    writer(None, None, {"a": 1.0, "iteration": 1})
+    writer(None, None, [{"a": 0.0}, {"a": 2.0, "b": 3.0, "iteration": 2}])
+    writer(None, None, {"b": 4.0, "iteration": 3})
+    # Nothing is written by the calls
+    assert summary.scalars == []
+    writer.flush()
+    assert sorted(summary.scalars) == [
+        ("a", 1.0, 1),
+        ("a", 2.0, 2),
+        ("b", 3.0, 2),
+        ("b", 4.0, 3),
+        ("iteration", 1, 1),
+        ("iteration", 2, 2),
+        ("iteration", 3, 3),
+    ]
+    with pytest.raises(TypeError):
+        writer(None, None, 1)
+    writer(None, None, {"a": 5.0, "iteration": 4})
+    writer.finalize()
+    assert summary.scalars[-2:] == [("a", 5.0, 4), ("iteration", 4, 4)]
+    assert summary.closed
+
+
+def test_buffered_tensorboard_writer_background(summary_writer):
+    writer = ppe.writing.BufferedTensorBoardWriter(
+        flush_interval=0.01, stats=["a"]
+    )
+    summary = writer._writer
+    writer(None, None, {"a": 1.0, "b": 2.0, "iteration": 1})
+    flusher = writer._flusher
+    deadline = time.time() + 10
+    while not summary.scalars and time.time() < deadline:
+        time.sleep(0.01)
+    assert summary.scalars == [("a", 1.0, 1)]
+    assert summary.threads == {flusher.ident}
+    writer.finalize()
@@ -304,7 +304,31 @@ def test_ignite_evaluator_reporting_metrics():
     assert result["val/mse"] == 0.0
 
 
-def test_distributed_evaluation():
+def _simulated_all_reduce(worker_summaries):
+    # Emulates `torch.distributed.all_reduce` over the given summaries:
+    # the first call checks the keys, the second one sums the statistics.
+    calls = []
+
+    def all_reduce(tensor, *args, **kwargs):
+        if len(calls) == 0:
+            sigs = []
+            for s in worker_summaries:
+                sig = torch.tensor(
+                    ppe.training.extensions.evaluator._key_signature(s.keys()),
+                    dtype=torch.float64,
+                )
+                sigs.append(torch.cat([sig, sig * sig]))
+            tensor.copy_(sum(sigs))
+        else:
+            keys = sorted(set(k for s in worker_summaries for k in s.keys()))
+            tensor.copy_(sum(s.to_tensor(keys) for s in worker_summaries))
+        calls.append(tensor)
+
+    return all_reduce, calls
+
+
+@pytest.mark.parametrize("extra_key", [False, True])
+def test_distributed_evaluation(extra_key):
     dummy_data = []  # Note: has no effect to the evaluation
     data_loader = torch.utils.data.DataLoader(dummy_data)
     target = DummyModel()
@@ -324,17 +348,33 @@ def test_distributed_evaluation():
         for acc in accs:
             s.add({"target/score": acc})
         worker_summaries.append(s)
-
-    reporter = ppe.reporting.Reporter()
-    reporter.add_observer("target", target)
-    with reporter:
-        with mock.patch.object(
-            ppe.training.extensions.evaluator,
-            "_dist_gather",
-            return_value=worker_summaries,
-        ):
-            mean = evaluator.evaluate()
-        assert mean["target/score"] == 6.5
+    if extra_key:
+        worker_summaries[1].add({"target/extra": 3.0})
+
+    all_reduce, calls = _simulated_all_reduce(worker_summaries)
+    all_keys = [s.keys() for s in worker_summaries]
+
+    def all_gather_object(output, obj):
+        output[:] = all_keys
+
+    with mock.patch.multiple(
+        dist,
+        get_backend=mock.MagicMock(return_value="gloo"),
+        get_world_size=mock.MagicMock(return_value=4),
+        all_reduce=all_reduce,
+        all_gather_object=mock.MagicMock(side_effect=all_gather_object),
+    ):
+        # Evaluate as rank 0
+        summary = evaluator._gather_summaries(worker_summaries[0])
+        assert len(calls) == 2
+        assert dist.all_gather_object.called == extra_key
+
+    mean = summary.compute_mean()
+    assert mean["target/score"] == 6.5
+    if extra_key:
+        assert mean["target/extra"] == 3.0
+    else:
+        assert "target/extra" not in mean
 
 
 def test_distributed_evaluator_progress_bar():
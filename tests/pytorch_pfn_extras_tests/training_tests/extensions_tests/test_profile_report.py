@@ -5,6 +5,7 @@ import time
 
 import pytest
 import pytorch_pfn_extras as ppe
+import torch
 import yaml
 
 
@@ -53,3 +54,59 @@ def test_profile_report(format, append):
 
             for value in values:
                 assert abs(value["iter-time"] - 0.1) < 2e-2
+                # Percentiles are only written on request
+                assert "iter-time.p50" not in value
+
+
+def test_profile_report_percentiles():
+    ext = ppe.training.extensions.ProfileReport(
+        store_keys=["iter-time"], percentiles=(90,), filename=None
+    )
+    manager = ppe.training.ExtensionsManager(
+        {}, {}, max_epochs=1, iters_per_epoch=3
+    )
+    manager.extend(ext)
+    for _ in range(3):
+        with manager.run_iteration():
+            _body()
+    (log,) = ext._log
+    assert abs(log["iter-time.p90"] - 0.1) < 2e-2
+    assert set(log) == {
+        "iter-time",
+        "iter-time.std",
+        "iter-time.p90",
+        "epoch",
+        "iteration",
+        "elapsed_time",
+    }
+
+
+def test_profile_report_writer_io():
+    tag = "pytorch_pfn_extras.writing.ThreadWriter"
+    ext = ppe.training.extensions.ProfileReport(
+        report_keys=[f"{tag}:bytes", f"{tag}:write"],
+        trigger=(1, "iteration"),
+        filename=None,
+    )
+    with tempfile.TemporaryDirectory() as tmpdir:
+        manager = ppe.training.ExtensionsManager(
+            {}, {}, max_epochs=1, iters_per_epoch=2, out_dir=tmpdir
+        )
+        writer = ppe.writing.ThreadWriter(out_dir=tmpdir)
+        manager.extend(ext)
+        manager.extend(
+            ppe.training.extensions.snapshot_object(
+                torch.nn.Linear(2, 2), "obj_{.iteration}", writer=writer
+            ),
+            trigger=(1, "iteration"),
+        )
+        with manager.run_iteration():
+            pass
+        # Reported from the thread of the writer
+        writer._worker.join()
+        size = os.path.getsize(os.path.join(tmpdir, "obj_1"))
+        with manager.run_iteration():
+            pass
+        writer.finalize()
+    assert manager.observation[f"time.{tag}:bytes"] == size
+    assert manager.observation[f"time.{tag}:write"] >= 0
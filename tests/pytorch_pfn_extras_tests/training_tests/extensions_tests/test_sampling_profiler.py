@@ -0,0 +1,65 @@
+import os
+import tempfile
+import time
+
+import pytest
+import pytorch_pfn_extras as ppe
+
+
+def _busy_function():
+    end = time.perf_counter() + 0.05
+    while time.perf_counter() < end:
+        pass
+
+
+def test_sampling_profiler():
+    ext = ppe.training.extensions.SamplingProfiler(
+        interval=0.001, trigger=(2, "iteration")
+    )
+    with tempfile.TemporaryDirectory() as tmpdir:
+        manager = ppe.training.ExtensionsManager(
+            {}, {}, max_epochs=1, iters_per_epoch=4, out_dir=tmpdir
+        )
+        manager.extend(ext)
+        for _ in range(4):
+            with manager.run_iteration():
+                _busy_function()
+        manager.finalize()
+        for iteration in (2, 4):
+            path = os.path.join(tmpdir, f"stacks_iter_{iteration}.folded")
+            with open(path) as f:
+                lines = f.read().splitlines()
+            assert lines
+            counts = {}
+            for line in lines:
+                stack, count = line.rsplit(" ", 1)
+                counts[stack] = int(count)
+            busy = [s for s in counts if "_busy_function" in s]
+            assert busy
+            # Frames are written from the outermost one
+            assert busy[0].split(";")[-1].startswith("_busy_function (")
+    assert ext._thread is None
+
+
+def test_sampling_profiler_stacks(tmp_path):
+    # Not triggered, so that the samples are not written and cleared
+    ext = ppe.training.extensions.SamplingProfiler(
+        interval=0.001, trigger=(2, "epoch")
+    )
+    manager = ppe.training.ExtensionsManager(
+        {}, {}, max_epochs=1, iters_per_epoch=1, out_dir=str(tmp_path)
+    )
+    manager.extend(ext)
+    with manager.run_iteration():
+        _busy_function()
+    # Stops sampling
+    ext.finalize(manager)
+    stacks = ext.stacks(clear=True)
+    assert sum(stacks.values()) > 0
+    assert ext.stacks() == {}
+    assert os.listdir(tmp_path) == []
+
+
+def test_sampling_profiler_invalid_interval():
+    with pytest.raises(ValueError):
+        ppe.training.extensions.SamplingProfiler(interval=0)
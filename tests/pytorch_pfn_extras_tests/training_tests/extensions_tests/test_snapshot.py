@@ -1,5 +1,6 @@
 import glob
 import itertools
+import json
 import os
 import tempfile
 import time
@@ -503,3 +504,161 @@ def test_snapshot_autoload_with_writer(path, snapshot_path):
     assert trainer2.state_dict() != trainer.state_dict()
     assert snapshot2.initialize(trainer2) == snapshot_filename
     assert trainer2.state_dict() == trainer.state_dict()
+
+
+def test_snapshot_manifest(path):
+    fmt = "snapshot_iter_{.iteration}"
+    # Written before the manifest exists
+    old = os.path.join(path, "snapshot_iter_0")
+    open(old, "w").close()
+    os.utime(old, (0, 0))
+    writer = writing.SimpleWriter(out_dir=path)
+    trainer = get_trainer(out_dir=path)
+    trainer.extend(extensions.LogReport(writer=writer))
+    trainer.extend(
+        extensions.snapshot(filename=fmt, writer=writer, n_retains=2),
+        trigger=(1, "iteration"),
+    )
+    with trainer.run_iteration():
+        pass
+    # Only the snapshots are recorded
+    assert writer._read_manifest(fmt).keys() == {
+        "snapshot_iter_0",
+        "snapshot_iter_1",
+    }
+    assert writer._read_manifest("log") is None
+
+    # The directory is not listed once the manifest exists
+    with mock.patch.object(writer.fs, "list", side_effect=AssertionError):
+        for _ in range(3):
+            with trainer.run_iteration():
+                pass
+        assert list(writer._read_manifest(fmt)) == [
+            "snapshot_iter_3",
+            "snapshot_iter_4",
+        ]
+        assert sorted(glob.glob(os.path.join(path, "snapshot_iter_*"))) == [
+            os.path.join(path, "snapshot_iter_3"),
+            os.path.join(path, "snapshot_iter_4"),
+        ]
+
+        trainer2 = get_trainer(out_dir=path)
+        snapshot2 = extensions.snapshot(
+            filename=fmt,
+            writer=writing.SimpleWriter(out_dir=path),
+            autoload=True,
+        )
+        assert snapshot2.initialize(trainer2) == "snapshot_iter_4"
+
+
+def test_snapshot_manifest_append(path):
+    fmt = "snapshot_iter_{}"
+    writer = writing.SimpleWriter(out_dir=path)
+    writer._track_snapshots(fmt)
+    manifest = os.path.join(path, ".ppe_snapshots.jsonl")
+    for i in range(3):
+        writer(fmt.format(i), path, {})
+        writer("log", path, {})
+    # The format, and a line per snapshot, each followed by the state of
+    # the directory, which is also updated by the other files
+    with open(manifest) as f:
+        lines = [line for line in f.read().splitlines() if line]
+    assert len(lines) == 2 + 2 * 3 + 3
+    assert all("dir_mtime" in json.loads(line) for line in lines[1::3])
+
+    # Only appended, and only the new lines are read
+    with mock.patch.object(writer.fs, "list", side_effect=AssertionError):
+        for i in range(3, 10):
+            with open(manifest, "rb") as f:
+                data = f.read()
+            writer(fmt.format(i), path, {})
+            writer._forget_files([fmt.format(i - 1)])
+            with open(manifest, "rb") as f:
+                assert f.read().startswith(data)
+            assert list(writer._read_manifest(fmt)) == [
+                fmt.format(j) for j in (0, 1, i)
+            ]
+            assert writer._manifest.offset == os.path.getsize(manifest)
+
+        # Lines of other writers are kept
+        writer2 = writing.SimpleWriter(out_dir=path)
+        writer2._track_snapshots(fmt)
+        writer2(fmt.format(10), path, {})
+        writer(fmt.format(11), path, {})
+        assert list(writer._read_manifest(fmt)) == [
+            fmt.format(i) for i in (0, 1, 9, 10, 11)
+        ]
+        assert list(writer2._read_manifest(fmt)) == [
+            fmt.format(i) for i in (0, 1, 9, 10, 11)
+        ]
+
+
+def test_snapshot_manifest_untracked(path):
+    fmt = "snapshot_iter_{}"
+    writer = writing.SimpleWriter(out_dir=path)
+    writer._track_snapshots(fmt)
+    for i in range(2):
+        writer(fmt.format(i), path, {})
+    # Written without updating the manifest, e.g., by another process or by
+    # a process terminated before recording it
+    with open(os.path.join(path, fmt.format(2)), "w"):
+        pass
+    assert list(writer._read_manifest(fmt)) == [fmt.format(i) for i in range(3)]
+    # Written by a writer that does not track the snapshots
+    trainer = get_trainer(out_dir=path)
+    writing.SimpleWriter(out_dir=path)(
+        fmt.format(3), path, trainer.state_dict()
+    )
+    os.remove(os.path.join(path, fmt.format(0)))
+
+    trainer2 = get_trainer(out_dir=path)
+    snapshot = extensions.snapshot(
+        filename=fmt, writer=writing.SimpleWriter(out_dir=path), autoload=True
+    )
+    assert snapshot.initialize(trainer2) == fmt.format(3)
+    assert trainer2.state_dict() == trainer.state_dict()
+    manifest = writer._read_manifest(fmt)
+    assert list(manifest) == [fmt.format(i) for i in (1, 2, 3)]
+    assert _find_latest_snapshot(fmt, path, writer.fs, manifest) == fmt.format(
+        3
+    )
+
+    # The directory is listed only once
+    with mock.patch.object(writer.fs, "list", side_effect=AssertionError):
+        assert list(writer._read_manifest(fmt)) == [
+            fmt.format(i) for i in (1, 2, 3)
+        ]
+
+
+def test_snapshot_manifest_inconsistent(path):
+    fmt = "snapshot_iter_{}"
+    writer = writing.SimpleWriter(out_dir=path)
+    writer._track_snapshots(fmt)
+    for i in range(3):
+        writer(fmt.format(i), path, {})
+    manifest = writer._read_manifest(fmt)
+    assert list(manifest) == [fmt.format(i) for i in range(3)]
+    assert _find_latest_snapshot(fmt, path, writer.fs, manifest) == fmt.format(
+        2
+    )
+
+    # Removed without updating the manifest
+    os.remove(os.path.join(path, fmt.format(2)))
+    assert _find_latest_snapshot(fmt, path, writer.fs, manifest) == fmt.format(
+        1
+    )
+
+    # Lines partially written are skipped, and the removal is found
+    with open(os.path.join(path, ".ppe_snapshots.jsonl"), "a") as f:
+        f.write('{"add": "snapshot_iter_')
+    assert list(writer._read_manifest(fmt)) == [fmt.format(i) for i in range(2)]
+
+    # Seeded from the directory again without the manifest
+    os.remove(os.path.join(path, ".ppe_snapshots.jsonl"))
+    writer = writing.SimpleWriter(out_dir=path)
+    assert writer._read_manifest(fmt) is None
+    writer._track_snapshots(fmt)
+    writer(fmt.format(3), path, {})
+    assert list(writer._read_manifest(fmt)) == [
+        fmt.format(i) for i in (0, 1, 3)
+    ]
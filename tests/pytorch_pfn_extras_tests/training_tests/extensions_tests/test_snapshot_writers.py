@@ -1,9 +1,16 @@
+import asyncio
+import collections
+import gzip
 import multiprocessing
+import os
 import tempfile
 import threading
+import time
 from unittest import mock
 
 import pytest
+import pytorch_pfn_extras as ppe
+import torch
 from pytorch_pfn_extras import writing
 
 spshot_writers_path = "pytorch_pfn_extras.writing"
@@ -11,9 +18,9 @@ spshot_writers_path = "pytorch_pfn_extras.writing"
 
 def test_simple_writer():
     target = mock.MagicMock()
-    w = writing.SimpleWriter(foo=True)
     savefun = mock.MagicMock()
     with tempfile.TemporaryDirectory() as tempd:
+        w = writing.SimpleWriter(foo=True, out_dir=tempd)
         w("myfile.dat", tempd, target, savefun=savefun)
     assert savefun.call_count == 1
     assert savefun.call_args[0][0] == target
@@ -38,8 +45,8 @@ def test_standard_writer():
 
 def test_thread_writer_create_worker():
     target = mock.MagicMock()
-    w = writing.ThreadWriter()
     with tempfile.TemporaryDirectory() as tempd:
+        w = writing.ThreadWriter(out_dir=tempd)
         worker = w.create_worker("myfile.dat", tempd, target, append=False)
         assert isinstance(worker, threading.Thread)
         w("myfile2.dat", tempd, "test")
@@ -56,8 +63,8 @@ def test_thread_writer_fail():
 
 def test_process_writer_create_worker():
     target = mock.MagicMock()
-    w = writing.ProcessWriter()
     with tempfile.TemporaryDirectory() as tempd:
+        w = writing.ProcessWriter(out_dir=tempd)
         worker = w.create_worker("myfile.dat", tempd, target, append=False)
         assert isinstance(worker, multiprocessing.Process)
         w("myfile2.dat", tempd, "test")
@@ -111,3 +118,809 @@ def test_queue_writer_consume():
             assert q.get.call_count == 3
             assert task[0].call_count == 2
             assert q.task_done.call_count == 3
+
+
+class _SlowSave:
+    def __init__(self):
+        self.event = threading.Event()
+        self.saved = []
+
+    def __call__(self, target, f):
+        self.event.wait()
+        self.saved.append(target)
+
+
+def _wait_busy(w):
+    # Waits until the consumer takes the first snapshot
+    with w._cond:
+        w._cond.wait_for(lambda: w._busy)
+
+
+def test_bounded_queue_writer():
+    with tempfile.TemporaryDirectory() as tempd:
+        w = writing.BoundedQueueWriter(out_dir=tempd, max_pending=2)
+        w("myfile.dat", tempd, {"a": 1})
+        w("myfile2.dat", tempd, {"b": 2})
+        w.finalize()
+        assert sorted(os.listdir(tempd)) == [
+            "myfile.dat",
+            "myfile2.dat",
+        ]
+
+
+@pytest.mark.parametrize(
+    "policy,expected,dropped",
+    [
+        ("drop_oldest", [0, 2, 3], 1),
+        ("coalesce", [0, 3], 2),
+    ],
+)
+def test_bounded_queue_writer_policy(policy, expected, dropped):
+    savefun = _SlowSave()
+    with tempfile.TemporaryDirectory() as tempd:
+        w = writing.BoundedQueueWriter(
+            savefun=savefun, out_dir=tempd, max_pending=2, policy=policy
+        )
+        w("a", tempd, 0)
+        _wait_busy(w)
+        for i in range(1, 4):
+            w("b" if policy == "coalesce" else f"b{i}", tempd, i)
+        assert w.dropped == dropped
+        savefun.event.set()
+        w.finalize()
+    assert savefun.saved == expected
+
+
+def test_bounded_queue_writer_block():
+    savefun = _SlowSave()
+    with tempfile.TemporaryDirectory() as tempd:
+        w = writing.BoundedQueueWriter(
+            savefun=savefun, out_dir=tempd, max_pending=1, policy="block"
+        )
+        packed = []
+        pack = w._pool.pack
+
+        def counting_pack(target):
+            packed.append(target)
+            return pack(target)
+
+        w._pool.pack = counting_pack
+        w("a", tempd, 0)
+        _wait_busy(w)
+        w("b", tempd, 1)
+        blocked = threading.Thread(target=w, args=("c", tempd, 2))
+        blocked.start()
+        blocked.join(timeout=0.1)
+        assert blocked.is_alive()
+        # The blocked call copies its target once a slot is free
+        assert packed == [0, 1]
+        savefun.event.set()
+        blocked.join()
+        w.synchronize()
+        assert w.queue_depth == 0
+        w.finalize()
+    assert savefun.saved == [0, 1, 2]
+    assert w.dropped == 0
+
+
+@pytest.mark.parametrize("copy_target", [True, False])
+def test_bounded_queue_writer_copy_target(copy_target):
+    savefun = _SlowSave()
+    x = torch.zeros(3)
+    with tempfile.TemporaryDirectory() as tempd:
+        w = writing.BoundedQueueWriter(
+            savefun=savefun, out_dir=tempd, copy_target=copy_target
+        )
+        w("a", tempd, {"x": x})
+        _wait_busy(w)
+        w("b", tempd, {"x": x})
+        # Updated by the training loop while the snapshots wait
+        x += 1
+        savefun.event.set()
+        w.finalize()
+    expected = 0 if copy_target else 1
+    for target in savefun.saved:
+        assert torch.equal(target["x"], torch.full((3,), float(expected)))
+
+
+def test_bounded_queue_writer_report():
+    with tempfile.TemporaryDirectory() as tempd:
+        w = writing.BoundedQueueWriter(out_dir=tempd, report_prefix="snap")
+        reporter = ppe.reporting.Reporter()
+        observation = {}
+        with reporter.scope(observation):
+            w("myfile.dat", tempd, {"a": 1})
+        w.finalize()
+    assert observation["snap/dropped"] == 0
+    assert "snap/queue_depth" in observation
+
+
+def test_bounded_queue_writer_fail():
+    with tempfile.TemporaryDirectory() as tempd:
+        w = writing.BoundedQueueWriter(savefun=None, out_dir=tempd)
+        w("myfile2.dat", tempd, "test")
+        with pytest.raises(RuntimeError):
+            w.finalize()
+
+
+def test_bounded_queue_writer_invalid_policy():
+    with pytest.raises(ValueError):
+        writing.BoundedQueueWriter(policy="unknown")
+
+
+def test_shared_memory_pool():
+    pool = writing.SharedMemoryPool()
+    weight = torch.nn.Parameter(torch.arange(6.0).reshape(2, 3))
+    target = {
+        "model": collections.OrderedDict(
+            [("weight", weight), ("tied", weight), ("t", weight.t())]
+        ),
+        "optimizer": {"state": [torch.ones(2, dtype=torch.int64)], "lr": 0.1},
+    }
+    packed, lease = pool.pack(target)
+    assert len(lease) == 3
+    model = packed["model"]
+    assert isinstance(model, collections.OrderedDict)
+    assert isinstance(model["weight"], torch.nn.Parameter)
+    assert model["weight"] is model["tied"]
+    assert model["weight"].is_shared()
+    assert torch.equal(model["t"], weight.t())
+    assert packed["optimizer"]["lr"] == 0.1
+    assert torch.equal(packed["optimizer"]["state"][0], torch.ones(2))
+
+    # The packed target is a copy
+    with torch.no_grad():
+        weight.add_(1)
+    assert torch.equal(model["weight"], torch.arange(6.0).reshape(2, 3))
+
+    buffers = list(lease)
+    pool.release(lease)
+    assert lease == []
+    _, lease = pool.pack(target)
+    assert {id(b) for b in lease} == {id(b) for b in buffers}
+
+
+def _load(path):
+    return torch.load(path)
+
+
+@pytest.mark.parametrize(
+    "writer_cls", [writing.ProcessWriter, writing.ProcessQueueWriter]
+)
+def test_process_writer_shared_memory(writer_cls):
+    tensor = torch.zeros(4)
+    with tempfile.TemporaryDirectory() as tempd:
+        if writer_cls is writing.ProcessQueueWriter:
+            task = writing.SimpleWriter(out_dir=tempd)
+            w = writer_cls(task=task, shared_memory=True)
+        else:
+            w = writer_cls(out_dir=tempd, shared_memory=True)
+        for i in range(3):
+            tensor.fill_(i)
+            w(f"snapshot_{i}", tempd, {"tensor": tensor})
+        w.finalize()
+        for i in range(3):
+            loaded = _load(os.path.join(tempd, f"snapshot_{i}"))
+            assert torch.equal(loaded["tensor"], torch.full((4,), float(i)))
+    # All the buffers are back in the pool
+    assert len(w._pool._free[16]) >= 1
+
+
+def test_sharded_writer():
+    weight = torch.nn.Parameter(torch.randn(4, 3))
+    target = {
+        "model": collections.OrderedDict(
+            [
+                ("weight", weight),
+                ("tied", weight),
+                ("bias", torch.randn(3).bfloat16()),
+                ("step", torch.tensor(5)),
+                ("empty", torch.zeros(0, 2)),
+            ]
+        ),
+        "optimizer": {"state": [torch.arange(10), torch.ones(2, 2).t()]},
+        "epoch": 3,
+    }
+    with tempfile.TemporaryDirectory() as tempd:
+        w = writing.ShardedWriter(num_shards=3, out_dir=tempd)
+        w("snapshot", tempd, target)
+        shard_dir = os.path.join(tempd, ".ppe_shards")
+        assert sorted(os.listdir(tempd)) == [
+            ".ppe_shards",
+            "snapshot",
+        ]
+        files = sorted(os.listdir(shard_dir))
+        assert len(files) == 3
+        # The index does not pickle classes of the writer
+        index = torch.load(os.path.join(tempd, "snapshot"), weights_only=True)
+        assert index["shards"] == [
+            os.path.join(".ppe_shards", f) for f in files
+        ]
+
+        loaded = writing.load_sharded(os.path.join(tempd, "snapshot"))
+        model = loaded["model"]
+        assert isinstance(model, collections.OrderedDict)
+        assert list(model) == list(target["model"])
+        assert isinstance(model["weight"], torch.nn.Parameter)
+        assert model["weight"] is model["tied"]
+        for k, v in target["model"].items():
+            assert model[k].dtype == v.dtype
+            assert torch.equal(model[k], v)
+        for x, y in zip(
+            loaded["optimizer"]["state"], target["optimizer"]["state"]
+        ):
+            assert torch.equal(x, y)
+        assert loaded["epoch"] == 3
+
+        # The shards are tracked without listing the directory again
+        listed = []
+        list_ = w.fs.list
+        w.fs.list = lambda path: listed.append(path) or list_(path)
+
+        # Overwriting the snapshot replaces the shards
+        w("snapshot", tempd, target)
+        assert len(os.listdir(shard_dir)) == 3
+        assert sorted(os.listdir(shard_dir)) != files
+
+        # Shards of removed snapshots are removed
+        os.remove(os.path.join(tempd, "snapshot"))
+        w("snapshot2", tempd, {"a": torch.ones(1)})
+        assert len(os.listdir(shard_dir)) == 1
+        assert listed == []
+
+
+def test_sharded_writer_snapshot_extension():
+    model = torch.nn.Linear(3, 2)
+    with tempfile.TemporaryDirectory() as tempd:
+        writer = writing.ShardedWriter(num_shards=2, out_dir=tempd)
+        manager = ppe.training.ExtensionsManager(
+            {"main": model}, {}, max_epochs=3, iters_per_epoch=1
+        )
+        manager.extend(
+            ppe.training.extensions.snapshot(writer=writer, n_retains=2),
+            trigger=(1, "iteration"),
+        )
+        for _ in range(3):
+            with manager.run_iteration():
+                pass
+        assert sorted(os.listdir(tempd)) == [
+            ".ppe_shards",
+            ".ppe_snapshots.jsonl",
+            "snapshot_iter_2",
+            "snapshot_iter_3",
+        ]
+        assert len(os.listdir(os.path.join(tempd, ".ppe_shards"))) == 4
+        state = writing.load_sharded(os.path.join(tempd, "snapshot_iter_3"))
+        assert torch.equal(state["models"]["main"]["weight"], model.weight)
+        expected = model.weight.detach().clone()
+
+        # Resumed by another writer
+        new_model = torch.nn.Linear(3, 2)
+        writer = writing.ShardedWriter(num_shards=2, out_dir=tempd)
+        manager = ppe.training.ExtensionsManager(
+            {"main": new_model}, {}, max_epochs=5, iters_per_epoch=1
+        )
+        ext = ppe.training.extensions.snapshot(
+            writer=writer, n_retains=1, autoload=True
+        )
+        manager.extend(ext, trigger=(1, "iteration"))
+        assert ext.initialize(manager) == "snapshot_iter_3"
+        assert torch.equal(new_model.weight, expected)
+        assert manager.iteration == 3
+        while not manager.stop_trigger:
+            with manager.run_iteration():
+                pass
+        assert sorted(os.listdir(tempd)) == [
+            ".ppe_shards",
+            ".ppe_snapshots.jsonl",
+            "snapshot_iter_5",
+        ]
+        # Shards of the snapshots written before the restart are removed
+        assert len(os.listdir(os.path.join(tempd, ".ppe_shards"))) == 2
+
+
+@pytest.mark.parametrize("max_ratio", [0.9, 1.0])
+def test_compressed_save_func(max_ratio):
+    target = {
+        "zeros": torch.zeros(100000),
+        "random": torch.randn(100000),
+        "step": 1,
+    }
+    savefun = writing.CompressedSaveFunc(
+        block_size=128 * 1024, num_threads=2, max_ratio=max_ratio
+    )
+    with tempfile.TemporaryDirectory() as tempd:
+        w = writing.SimpleWriter(savefun=savefun, out_dir=tempd)
+        reporter = ppe.reporting.Reporter()
+        observation = {}
+        with reporter.scope(observation):
+            w("snapshot", tempd, target)
+        path = os.path.join(tempd, "snapshot")
+        with open(path, "rb") as f:
+            loaded = writing.load_compressed(f)
+        # The output is a regular gzip stream
+        with gzip.open(path) as f:
+            raw = f.read()
+    assert torch.equal(loaded["zeros"], target["zeros"])
+    assert torch.equal(loaded["random"], target["random"])
+    assert loaded["step"] == 1
+    stats = savefun.stats
+    assert stats["raw_bytes"] == len(raw)
+    assert stats["ratio"] < 0.6
+    assert observation["compression/ratio"] == stats["ratio"]
+    assert observation["compression/throughput"] > 0
+
+
+def test_compressed_save_func_incompressible():
+    savefun = writing.CompressedSaveFunc(block_size=128 * 1024)
+    with tempfile.TemporaryDirectory() as tempd:
+        w = writing.ThreadWriter(savefun=savefun, out_dir=tempd)
+        w("snapshot", tempd, {"random": torch.randn(100000)})
+        w.finalize()
+        with open(os.path.join(tempd, "snapshot"), "rb") as f:
+            loaded = writing.load_compressed(f, map_location="cpu")
+    assert loaded["random"].shape == (100000,)
+    # Random floats are stored instead of being compressed
+    assert savefun.stats["ratio"] > 0.99
+
+
+def test_load_compressed_stream():
+    from pytorch_pfn_extras.writing import _compression
+
+    raw = os.urandom(3 * _compression._TAIL_SIZE)
+    with tempfile.TemporaryDirectory() as tempd:
+        path = os.path.join(tempd, "file")
+        with gzip.open(path, "wb") as f:
+            f.write(raw)
+        with open(path, "rb") as f:
+            reader = _compression._GzipReader(f)
+            assert reader.read(10) == raw[:10]
+            assert reader.seek(-10, os.SEEK_END) == len(raw) - 10
+            assert reader.read() == raw[-10:]
+            # Reads in the tail are served without decompressing again
+            with mock.patch.object(reader._gzip, "seek") as seek:
+                reader.seek(-100, os.SEEK_END)
+                assert reader.read(50) == raw[-100:-50]
+            seek.assert_not_called()
+            reader.seek(5)
+            assert reader.read(100) == raw[5:105]
+            reader.seek(-(2 * _compression._TAIL_SIZE), os.SEEK_END)
+            assert reader.read() == raw[-(2 * _compression._TAIL_SIZE) :]
+
+
+@pytest.mark.parametrize(
+    "writer_cls", [writing.ThreadWriter, writing.ProcessQueueWriter]
+)
+def test_compressed_save_func_snapshot(writer_cls):
+    _io_stats("")
+    model = torch.nn.Linear(3, 2)
+    with tempfile.TemporaryDirectory() as tempd:
+        savefun = writing.CompressedSaveFunc()
+        w = writer_cls(savefun=savefun, out_dir=tempd)
+        manager = ppe.training.ExtensionsManager(
+            {"main": model}, {}, max_epochs=1, iters_per_epoch=1
+        )
+        manager.extend(
+            ppe.training.extensions.snapshot(writer=w),
+            trigger=(1, "iteration"),
+        )
+        with manager.run_iteration():
+            pass
+        w.finalize()
+        # Reported from the thread or the process of the writer
+        stats = _io_stats("CompressedSaveFunc")
+        assert stats["ratio"] > 0
+        assert stats["throughput"] > 0
+
+        new_model = torch.nn.Linear(3, 2)
+        manager = ppe.training.ExtensionsManager(
+            {"main": new_model}, {}, max_epochs=1, iters_per_epoch=1
+        )
+        ext = ppe.training.extensions.snapshot(
+            writer=writing.SimpleWriter(out_dir=tempd), autoload=True
+        )
+        assert ext.initialize(manager) == "snapshot_iter_1"
+        assert torch.equal(new_model.weight, model.weight)
+
+
+def test_tiered_writer():
+    with tempfile.TemporaryDirectory() as local_dir:
+        with tempfile.TemporaryDirectory() as durable_dir:
+            w = writing.TieredWriter(local_dir, out_dir=durable_dir)
+            w("a", durable_dir, {"x": torch.ones(2)})
+            w("b", durable_dir, {"x": torch.zeros(2)})
+            w.synchronize()
+            assert sorted(os.listdir(durable_dir)) == [
+                "a",
+                "b",
+            ]
+            assert os.listdir(local_dir) == []
+            with w.fs.open(os.path.join(durable_dir, "a"), "rb") as f:
+                assert torch.equal(torch.load(f)["x"], torch.ones(2))
+            w.finalize()
+
+
+def test_tiered_writer_fs():
+    with tempfile.TemporaryDirectory() as local_dir:
+        with tempfile.TemporaryDirectory() as durable_dir:
+            w = writing.TieredWriter(
+                local_dir, out_dir=durable_dir, max_bandwidth=1e5
+            )
+            w("a", durable_dir, {"x": torch.zeros(10)})
+            w.synchronize()
+            w("b", durable_dir, {"x": torch.zeros(100000)})
+            # `b` is slowly migrated and found in the local directory
+            assert os.listdir(local_dir) == ["b"]
+            assert list(w.fs.list(durable_dir)) == [
+                "a",
+                "b",
+            ]
+            a = os.path.join(durable_dir, "a")
+            b = os.path.join(durable_dir, "b")
+            assert w.fs.exists(b)
+            assert w.fs.stat(a).last_modified <= w.fs.stat(b).last_modified
+
+            # Removing a snapshot being migrated cancels the migration
+            w.fs.remove(b)
+            assert not w.fs.exists(b)
+            w.finalize()
+            assert sorted(os.listdir(durable_dir)) == [
+                "a",
+            ]
+            assert os.listdir(local_dir) == []
+
+
+def test_tiered_writer_bandwidth():
+    with tempfile.TemporaryDirectory() as local_dir:
+        with tempfile.TemporaryDirectory() as durable_dir:
+            w = writing.TieredWriter(
+                local_dir, out_dir=durable_dir, max_bandwidth=1e6
+            )
+            begin = time.perf_counter()
+            w("a", durable_dir, {"x": torch.zeros(100000)})
+            w.finalize()
+            assert time.perf_counter() - begin >= 0.4
+
+
+def test_tiered_writer_snapshot():
+    model = torch.nn.Linear(3, 2)
+    with tempfile.TemporaryDirectory() as local_dir:
+        with tempfile.TemporaryDirectory() as durable_dir:
+            w = writing.TieredWriter(
+                local_dir, out_dir=durable_dir, keep_local=True
+            )
+            manager = ppe.training.ExtensionsManager(
+                {"main": model}, {}, max_epochs=3, iters_per_epoch=1
+            )
+            manager.extend(
+                ppe.training.extensions.snapshot(writer=w, n_retains=1),
+                trigger=(1, "iteration"),
+            )
+            for _ in range(3):
+                with manager.run_iteration():
+                    pass
+            w.finalize()
+            assert os.listdir(local_dir) == ["snapshot_iter_3"]
+            assert sorted(os.listdir(durable_dir)) == [
+                ".ppe_snapshots.jsonl",
+                "snapshot_iter_3",
+            ]
+
+            # Snapshots are found in the local directory
+            os.remove(os.path.join(durable_dir, "snapshot_iter_3"))
+            w = writing.TieredWriter(local_dir, out_dir=durable_dir)
+            manager = ppe.training.ExtensionsManager(
+                {"main": model}, {}, max_epochs=3, iters_per_epoch=1
+            )
+            ext = ppe.training.extensions.snapshot(writer=w, autoload=True)
+            assert ext.initialize(manager) == "snapshot_iter_3"
+            w.finalize()
+
+
+def test_tiered_writer_recover():
+    with tempfile.TemporaryDirectory() as local_dir:
+        with tempfile.TemporaryDirectory() as durable_dir:
+            # Staged by a run that stopped before migrating `a`, and
+            # before removing the local copy of the migrated `b`
+            for name in ("a", "b"):
+                torch.save({"name": name}, os.path.join(local_dir, name))
+            os.utime(os.path.join(local_dir, "b"), (0, 0))
+            torch.save({"name": "b"}, os.path.join(durable_dir, "b"))
+            torch.save({"name": "old"}, os.path.join(durable_dir, "a"))
+            os.utime(os.path.join(durable_dir, "a"), (0, 0))
+            w = writing.TieredWriter(local_dir, out_dir=durable_dir)
+            w.finalize()
+            assert os.listdir(local_dir) == []
+            assert sorted(os.listdir(durable_dir)) == ["a", "b"]
+            state = torch.load(os.path.join(durable_dir, "a"))
+            assert state["name"] == "a"
+
+
+class _SlowRenameFileSystem(writing._writer_base._PosixFileSystem):
+    def __init__(self):
+        super().__init__()
+        self.event = threading.Event()
+        self.renaming = threading.Event()
+
+    def rename(self, src, dst):
+        if os.path.exists(dst):
+            raise FileExistsError(dst)
+        if not os.path.basename(src).startswith("tmp_"):
+            # Moving the durable copy out of the way
+            self.renaming.set()
+            assert self.event.wait(timeout=10)
+        super().rename(src, dst)
+
+
+@pytest.mark.parametrize("remove", [False, True])
+def test_tiered_writer_replace(remove):
+    fs = _SlowRenameFileSystem()
+    with tempfile.TemporaryDirectory() as local_dir:
+        with tempfile.TemporaryDirectory() as durable_dir:
+            w = writing.TieredWriter(local_dir, fs=fs, out_dir=durable_dir)
+            w("a", durable_dir, {"x": torch.zeros(2)})
+            w.synchronize()
+            w("a", durable_dir, {"x": torch.ones(2)})
+            # The durable copy is kept until the new one is in place
+            assert fs.renaming.wait(timeout=10)
+            assert sorted(os.listdir(durable_dir)) == ["a", "tmp_a"]
+            # Saving does not wait for the durable tier
+            w("b", durable_dir, {"x": torch.ones(2)})
+            if remove:
+                # Removed by the migration thread once it is replaced
+                w.fs.remove(os.path.join(durable_dir, "a"))
+            fs.event.set()
+            w.finalize()
+            if remove:
+                assert os.listdir(durable_dir) == ["b"]
+                return
+            assert sorted(os.listdir(durable_dir)) == ["a", "b"]
+            state = torch.load(os.path.join(durable_dir, "a"))
+            assert torch.equal(state["x"], torch.ones(2))
+
+
+def test_throttled_file_system_bandwidth():
+    fs = writing.ThrottledFileSystem(max_bandwidth=1e6)
+    target = {"x": torch.zeros(125000, dtype=torch.float32)}
+    with tempfile.TemporaryDirectory() as tempd:
+        path = os.path.join(tempd, "f")
+        with fs.open(path, "wb") as f:
+            # Uses the burst
+            assert f.write(bytes(1000000)) == 1000000
+        begin = time.perf_counter()
+        w = writing.SimpleWriter(fs=fs, out_dir=tempd)
+        w("target", tempd, target)
+        assert time.perf_counter() - begin >= 0.4
+        with fs.open(os.path.join(tempd, "target"), "rb") as f:
+            assert torch.equal(torch.load(f)["x"], target["x"])
+
+
+def test_throttled_file_system_iops():
+    fs = writing.ThrottledFileSystem(max_iops=20)
+    with tempfile.TemporaryDirectory() as tempd:
+        begin = time.perf_counter()
+        with fs.open(os.path.join(tempd, "f"), "wb") as f:
+            for _ in range(30):
+                f.write(b"x")
+        assert time.perf_counter() - begin >= 0.4
+
+
+def test_throttled_file_system_invalid():
+    with pytest.raises(ValueError):
+        writing.ThrottledFileSystem(max_bandwidth=0)
+
+
+def _write_byte(target, f):
+    f.write(b"x")
+
+
+def test_throttled_file_system_adaptive():
+    tag = "test_throttled_file_system_adaptive"
+    time_summary = ppe.profiler.get_time_summary()
+    with time_summary.summary(clear=True):
+        pass
+    fs = writing.ThrottledFileSystem(
+        max_bandwidth=1e6, adaptive=True, latency_tag=tag, interval=0
+    )
+
+    def wait_for_data(latency, n=4):
+        for _ in range(n):
+            time_summary.add(tag, latency)
+        # Writes from another thread see the times of this thread
+        w = writing.ThreadWriter(savefun=_write_byte, fs=fs, out_dir=tempd)
+        w("f", tempd, None)
+        w.finalize()
+
+    with tempfile.TemporaryDirectory() as tempd:
+        wait_for_data(0.01)
+        assert fs.bandwidth == 1e6
+        wait_for_data(0.1)
+        assert fs.bandwidth == 5e5
+        wait_for_data(0.1)
+        assert fs.bandwidth == 2.5e5
+        for _ in range(5):
+            wait_for_data(0.1)
+        assert fs.bandwidth == 1e5
+        # Recovers while the latency is back to normal
+        wait_for_data(0.01)
+        assert fs.bandwidth == 2e5
+        with time_summary.summary(clear=True):
+            pass
+        wait_for_data(0.01)
+        assert fs.bandwidth == 3e5
+        wait_for_data(0.1)
+        assert fs.bandwidth == 1.5e5
+        # More samples than before the clear are not taken as new ones
+        with time_summary.summary(clear=True):
+            pass
+        wait_for_data(0.01, n=12)
+        assert fs.bandwidth == 2.5e5
+
+
+def _io_stats(tag):
+    time_summary = ppe.profiler.get_time_summary()
+    time_summary.synchronize()
+    with time_summary.summary(clear=True) as (summary, _):
+        stats = summary.compute_mean()
+    prefix = f"pytorch_pfn_extras.writing.{tag}:"
+    return {
+        k[len(prefix) :]: float(v)
+        for k, v in stats.items()
+        if k.startswith(prefix)
+    }
+
+
+@pytest.mark.parametrize(
+    "writer_cls",
+    [
+        writing.SimpleWriter,
+        writing.ThreadWriter,
+        writing.ProcessWriter,
+        writing.ThreadQueueWriter,
+        writing.ProcessQueueWriter,
+    ],
+)
+def test_writer_io_stats(writer_cls):
+    _io_stats("")
+    target = {"x": torch.zeros(1000)}
+    with tempfile.TemporaryDirectory() as tempd:
+        w = writer_cls(out_dir=tempd)
+        w("snapshot", tempd, target)
+        w.finalize()
+        nbytes = os.path.getsize(os.path.join(tempd, "snapshot"))
+    stats = _io_stats(writer_cls.__name__)
+    assert stats["bytes"] == nbytes
+    for key in ("serialize", "write", "throughput", "rename"):
+        assert stats[key] >= 0
+    assert ("queue_wait" in stats) == ("Queue" in writer_cls.__name__)
+
+
+def test_writer_io_stats_not_profiling():
+    time_summary = ppe.profiler.TimeSummary(auto_init=False)
+    with tempfile.TemporaryDirectory() as tempd:
+        with mock.patch.object(
+            writing._writer_base,
+            "get_time_summary",
+            return_value=time_summary,
+        ):
+            w = writing.SimpleWriter(out_dir=tempd)
+        w("snapshot", tempd, {"x": torch.zeros(10)})
+    with time_summary.summary() as (summary, _):
+        assert summary.compute_mean() == {}
+
+
+def test_async_writer():
+    with tempfile.TemporaryDirectory() as tempd:
+        w = writing.AsyncWriter(out_dir=tempd, max_concurrency=4)
+        for i in range(16):
+            w(f"file{i}", tempd, {"x": torch.full((10,), i)})
+        w.finalize()
+        for i in range(16):
+            loaded = torch.load(os.path.join(tempd, f"file{i}"))
+            assert torch.equal(loaded["x"], torch.full((10,), i))
+        assert not [f for f in os.listdir(tempd) if f.startswith("tmp_")]
+
+
+def _write_text(target, f):
+    f.write(target.encode())
+
+
+def test_async_writer_same_file():
+    with tempfile.TemporaryDirectory() as tempd:
+        w = writing.AsyncWriter(savefun=_write_text, out_dir=tempd)
+        for i in range(10):
+            w("log", tempd, str(i), append=True)
+            w("last", tempd, str(i))
+        w.finalize()
+        with open(os.path.join(tempd, "log")) as f:
+            assert f.read() == "0123456789"
+        with open(os.path.join(tempd, "last")) as f:
+            assert f.read() == "9"
+
+
+class _NoOverwriteFileSystem(writing._writer_base._PosixFileSystem):
+    # Like HDFS, renaming over an existing file fails
+    def rename(self, src, dst):
+        if os.path.exists(dst):
+            raise FileExistsError(dst)
+        super().rename(src, dst)
+
+
+@pytest.mark.parametrize(
+    "writer_cls", [writing.SimpleWriter, writing.AsyncWriter]
+)
+def test_writer_no_overwrite(writer_cls):
+    with tempfile.TemporaryDirectory() as tempd:
+        w = writer_cls(
+            savefun=_write_text, fs=_NoOverwriteFileSystem(), out_dir=tempd
+        )
+        for i in range(3):
+            w("last", tempd, str(i))
+        w.finalize()
+        assert os.listdir(tempd) == ["last"]
+        with open(os.path.join(tempd, "last")) as f:
+            assert f.read() == "2"
+
+
+def test_async_writer_snapshot():
+    model = torch.nn.Linear(3, 2)
+    with tempfile.TemporaryDirectory() as tempd:
+        w = writing.AsyncWriter(out_dir=tempd)
+        manager = ppe.training.ExtensionsManager(
+            {"main": model}, {}, max_epochs=5, iters_per_epoch=1
+        )
+        manager.extend(
+            ppe.training.extensions.snapshot(writer=w, n_retains=2),
+            trigger=(1, "iteration"),
+        )
+        for _ in range(5):
+            with manager.run_iteration():
+                pass
+        w.finalize()
+        assert sorted(os.listdir(tempd)) == [
+            ".ppe_snapshots.jsonl",
+            "snapshot_iter_4",
+            "snapshot_iter_5",
+        ]
+
+        w = writing.AsyncWriter(out_dir=tempd)
+        manager = ppe.training.ExtensionsManager(
+            {"main": model}, {}, max_epochs=5, iters_per_epoch=1
+        )
+        ext = ppe.training.extensions.snapshot(writer=w, autoload=True)
+        assert ext.initialize(manager) == "snapshot_iter_5"
+        w.finalize()
+
+
+def test_async_writer_fail():
+    with tempfile.TemporaryDirectory() as tempd:
+        w = writing.AsyncWriter(savefun=None, out_dir=tempd)
+        w("snapshot", tempd, {"x": 1})
+        with pytest.raises(RuntimeError):
+            w.finalize()
+
+
+def test_async_writer_invalid():
+    with pytest.raises(ValueError):
+        writing.AsyncWriter(max_concurrency=0)
+
+
+def test_async_file_system():
+    async def run(afs, tempd):
+        await afs.makedirs(os.path.join(tempd, "sub"), exist_ok=True)
+        path = os.path.join(tempd, "sub", "a")
+        async with await afs.open(path, "wb") as f:
+            await f.write(b"abc")
+        async with await afs.open(path, "rb") as f:
+            assert await f.read() == b"abc"
+        assert (await afs.stat(path)).size == 3
+        await afs.rename(path, os.path.join(tempd, "sub", "b"))
+        assert not await afs.exists(path)
+        assert await afs.list(os.path.join(tempd, "sub")) == ["b"]
+        await afs.remove(os.path.join(tempd, "sub"), recursive=True)
+        assert not await afs.exists(os.path.join(tempd, "sub"))
+
+    afs = writing.AsyncFileSystem()
+    with tempfile.TemporaryDirectory() as tempd:
+        asyncio.run(run(afs, tempd))
+    afs.close()
@@ -0,0 +1,100 @@
+import os
+import sys
+import tempfile
+import urllib.request
+
+import pytest
+import pytorch_pfn_extras as ppe
+from torch import distributed as dist
+from torch import multiprocessing as mp
+
+_world_size = 4
+
+
+def _report(summary, name, values):
+    for value in values:
+        summary.add(name, value)
+
+
+def test_straggler_report_single_process():
+    summary = ppe.profiler.get_time_summary()
+    with summary.summary(clear=True):
+        pass
+    ext = ppe.training.extensions.StragglerReport(
+        keys=["data"], trigger=(1, "iteration"), clear=True
+    )
+    manager = ppe.training.ExtensionsManager(
+        {}, {}, max_epochs=1, iters_per_epoch=2
+    )
+    manager.extend(ext)
+    with manager.run_iteration():
+        _report(summary, "data", [0.1, 0.3])
+        _report(summary, "other", [1.0])
+    assert manager.observation["straggler/data.skew"] == 1.0
+    assert manager.observation["straggler/data.slowest_rank"] == 0
+    assert manager.observation["straggler/data.max"] == pytest.approx(0.2)
+    assert "straggler/other.skew" not in manager.observation
+    with manager.run_iteration():
+        pass
+    assert "straggler/data.skew" not in manager.observation
+
+
+def test_straggler_report_percentile():
+    summary = ppe.profiler.get_time_summary()
+    with summary.summary(clear=True):
+        pass
+    _report(summary, "data", [0.1] * 99 + [10.0])
+    ext = ppe.training.extensions.StragglerReport(percentile=100, clear=True)
+    stats = ext.compute()
+    assert stats["straggler/data.max"] == 10.0
+
+
+def test_straggler_report_invalid_percentile():
+    with pytest.raises(ValueError):
+        ppe.training.extensions.StragglerReport(percentile=101)
+
+
+def _run(init_file, rank, hierarchical):
+    init_method = "file://{}".format(urllib.request.pathname2url(init_file))
+    dist.init_process_group(
+        backend="gloo",
+        init_method=init_method,
+        world_size=_world_size,
+        rank=rank,
+    )
+    summary = ppe.profiler.get_time_summary()
+    summary.initialize()
+    # Rank 2 is slow to load data
+    _report(summary, "data", [0.4 if rank == 2 else 0.1] * 3)
+    if rank != 0:
+        _report(summary, "reduce", [0.2])
+    if hierarchical:
+        hierarchical = ppe.distributed.HierarchicalGroups(local_size=2)
+    ext = ppe.training.extensions.StragglerReport(hierarchical=hierarchical)
+    return ext.compute()
+
+
+@pytest.mark.skipif(
+    sys.platform == "win32", reason="DDP not fully supported on Windows"
+)
+@pytest.mark.parametrize("hierarchical", [False, True])
+def test_straggler_report_distributed(hierarchical):
+    context = mp.get_context("spawn")
+    with tempfile.TemporaryDirectory() as tmpdir, context.Pool(
+        _world_size
+    ) as pool:
+        init_file = os.path.join(tmpdir, "init")
+        procs = [
+            pool.apply_async(_run, args=(init_file, rank, hierarchical))
+            for rank in range(_world_size)
+        ]
+        results = [p.get() for p in procs]
+
+    for stats in results:
+        assert stats == results[0]
+    stats = results[0]
+    assert stats["straggler/data.skew"] == pytest.approx(4.0)
+    assert stats["straggler/data.slowest_rank"] == 2
+    assert stats["straggler/data.max"] == pytest.approx(0.4)
+    assert stats["straggler/data.median"] == pytest.approx(0.1)
+    assert stats["straggler/reduce.skew"] == pytest.approx(1.0)
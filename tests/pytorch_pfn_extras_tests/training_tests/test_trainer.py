@@ -477,6 +477,94 @@ class TestTrainerState:
             strict=True,
         )
 
+    def test_trainer_autoload_mid_epoch(self, path):
+        class RecordingModel(MyModelWithLossFn):
+            def __init__(self):
+                super().__init__(MyModel())
+                self.seen = []
+
+            def forward(self, x, t):
+                self.seen.extend(x[:, 0].tolist())
+                return super().forward(x, t)
+
+        dataset = [
+            (torch.full((20,), float(i)), torch.zeros(10)) for i in range(12)
+        ]
+
+        def run(out_dir, stop_iteration):
+            model = RecordingModel()
+            ppe.to(model, "cpu")
+            optimizer = torch.optim.SGD(model.parameters(), lr=0.1)
+            trainer = engine.create_trainer(
+                model,
+                optimizer,
+                3,
+                out_dir=out_dir,
+                stop_trigger=(stop_iteration, "iteration"),
+            )
+            trainer.extend(
+                ppe.training.extensions.snapshot(autoload=True),
+                trigger=(1, "iteration"),
+            )
+            sampler = ppe.distributed.DistributedSubsetSampler(
+                dataset, num_replicas=1, rank=0
+            )
+            loader = torch.utils.data.DataLoader(
+                dataset, batch_size=2, sampler=sampler
+            )
+            trainer.run(loader)
+            return trainer, model.seen
+
+        with tempfile.TemporaryDirectory() as expected_path:
+            _, expected = run(expected_path, 18)
+        # Interrupted in the middle of the 2nd epoch
+        trainer, seen = run(path, 8)
+        assert trainer.manager.state_dict()["data_iterator"] == {
+            "epoch": 1,
+            "iteration": 2,
+        }
+        trainer, resumed = run(path, 18)
+        assert trainer.iteration == 18
+        assert seen + resumed == expected
+
+    def test_trainer_sampler_set_epoch(self, path):
+        class ResumableBatchSampler(torch.utils.data.BatchSampler):
+            def set_epoch(self, epoch):
+                self.sampler.set_epoch(epoch)
+
+            def set_start(self, start):
+                self.sampler.set_start(start * self.batch_size)
+
+        class RecordingModel(MyModelWithLossFn):
+            def __init__(self):
+                super().__init__(MyModel())
+                self.seen = []
+
+            def forward(self, x, t):
+                self.seen.extend(x[:, 0].tolist())
+                return super().forward(x, t)
+
+        dataset = [
+            (torch.full((20,), float(i)), torch.zeros(10)) for i in range(12)
+        ]
+        model = RecordingModel()
+        ppe.to(model, "cpu")
+        optimizer = torch.optim.SGD(model.parameters(), lr=0.1)
+        trainer = engine.create_trainer(model, optimizer, 2, out_dir=path)
+        sampler = ppe.distributed.DistributedSubsetSampler(
+            dataset, num_replicas=1, rank=0
+        )
+        loader = torch.utils.data.DataLoader(
+            dataset,
+            batch_sampler=ResumableBatchSampler(sampler, 2, False),
+        )
+        trainer.run(loader)
+        first, second = model.seen[:12], model.seen[12:]
+        assert sorted(first) == sorted(second) == list(range(12))
+        # Shuffled differently in every epoch
+        assert first != second
+        assert sampler.epoch == 1
+
     @pytest.mark.gpu
     def test_trainer_autoload_training_results_consistency_with_gpu(self, path):
         if not torch.cuda.is_available():